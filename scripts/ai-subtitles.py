@@ -0,0 +1,51 @@
+import os
+import sys
+
+# Subcommand -> (script run for it, description). Scripts are only loaded when
+# their subcommand is used, so "fix" never imports yt_dlp, assemblyai or anthropic.
+COMMANDS = {
+    "download": ("download-audio.py", "Download the audio of a YouTube video into content/"),
+    "transcribe": ("transcriebe.py", "Transcribe a media file (or a YouTube URL) to an English SRT"),
+    "translate": ("translate-srt.py", "Translate an SRT file from lang/en"),
+    "fix": ("fix-srt.py", "Fix the line breaks of an SRT file in place"),
+    "pipeline": ("translate-yt.py", "Download, transcribe and translate videos, playlists or channels"),
+    "update": ("update-translations.py", "Re-translate only the cues changed in an edited English SRT"),
+    "backlog": ("translate-backlog.py", "Translate every missing SRT with the Message Batches API"),
+    "check-glossary": ("check-glossary.py", "Report translated cues that miss a translation_mapping term"),
+}
+
+def print_usage():
+    print("Usage: python ai-subtitles.py <command> [arguments]\n\nCommands:")
+    for name, (_, description) in COMMANDS.items():
+        print(f"  {name:<16}{description}")
+    print("\nRun 'python ai-subtitles.py <command> --help' for the arguments of a command.")
+
+def script_for(command, arguments):
+    script = COMMANDS[command][0]
+    # A URL is downloaded first, then transcribed
+    if command == "transcribe" and arguments and arguments[0].startswith(("http://", "https://")):
+        script = "transcribe-yt.py"
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), script)
+
+def main():
+    # python ai-subtitles.py <command> [arguments]
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
+        print_usage()
+        return 0
+    command, arguments = sys.argv[1], sys.argv[2:]
+    if command not in COMMANDS:
+        print(f"Unknown command: {command}\n")
+        print_usage()
+        return 2
+
+    script = script_for(command, arguments)
+    # The script sees the same argv and globals as when it is run on its own.
+    # Executed directly rather than with runpy, which imports pkgutil and typing.
+    sys.argv = [script] + arguments
+    with open(script, 'r', encoding='utf-8') as file:
+        code = compile(file.read(), script, 'exec')
+    exec(code, {"__name__": "__main__", "__file__": script, "__builtins__": __builtins__})
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import os
+import re
+import shutil
+import hashlib
+import subprocess
+
+# Compressed uploads, keyed by the hash of the source file and settings
+AUDIO_CACHE_DIR = os.path.join(".cache", "audio")
+
+# Speech recognition works on 16 kHz mono; Opus at this bitrate keeps speech intelligible
+SAMPLE_RATE = 16000
+BITRATE = "24k"
+
+# Largest duration difference (seconds) accepted between source and compressed audio
+MAX_DURATION_DRIFT = 0.25
+
+# "silence_start: 12.34" / "silence_end: 13.02 | silence_duration: 0.68" lines of silencedetect
+SILENCE_PATTERN = re.compile(r'silence_(start|end): (-?[\d.]+)')
+
+def file_hash(path, settings=""):
+    digest = hashlib.sha256(settings.encode('utf-8'))
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def media_duration(path):
+    """
+    Return the duration of a media file in seconds using ffprobe, or None
+    """
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
+            capture_output=True, text=True, check=True,
+        )
+        return float(result.stdout.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+def compress_audio(media_file, cache_dir):
+    """
+    Downmix media_file to mono 16 kHz Opus for a faster upload
+
+    The whole stream is re-encoded from its first sample without trimming,
+    so transcript timestamps still line up with the original media. The
+    result is rejected when its duration differs from the source.
+
+    Args:
+        media_file (str): Downloaded audio or video file
+        cache_dir (str): Directory of compressed files
+
+    Returns:
+        str: Path to the compressed file, or media_file when ffmpeg is
+             missing, fails or the durations do not match
+    """
+    if not shutil.which('ffmpeg'):
+        print("ffmpeg not found, uploading the original file")
+        return media_file
+
+    settings = f"mono {SAMPLE_RATE} opus {BITRATE}"
+    compressed_file = os.path.join(cache_dir, f"{file_hash(media_file, settings)}.ogg")
+    if os.path.exists(compressed_file):
+        print(f"Using compressed audio: {compressed_file}")
+        return compressed_file
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temporary_path = f"{compressed_file}.tmp.ogg"
+    print(f"Compressing {media_file}...")
+    try:
+        subprocess.run(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-i', media_file,
+             '-map', '0:a:0', '-vn', '-ac', '1', '-ar', str(SAMPLE_RATE),
+             '-c:a', 'libopus', '-b:a', BITRATE, '-application', 'voip', temporary_path],
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Error compressing audio, uploading the original file: {e}")
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        return media_file
+
+    source_duration = media_duration(media_file)
+    compressed_duration = media_duration(temporary_path)
+    if source_duration is not None and compressed_duration is not None and \
+            abs(source_duration - compressed_duration) > MAX_DURATION_DRIFT:
+        print(f"Compressed audio is {compressed_duration:.2f}s long instead of {source_duration:.2f}s, "
+              "uploading the original file")
+        os.remove(temporary_path)
+        return media_file
+
+    os.replace(temporary_path, compressed_file)
+    source_size = os.path.getsize(media_file)
+    compressed_size = os.path.getsize(compressed_file)
+    print(f"Compressed {source_size / 1e6:.1f} MB to {compressed_size / 1e6:.1f} MB "
+          f"({(1 - compressed_size / max(source_size, 1)) * 100:.0f}% saved)")
+    return compressed_file
+
+def detect_silences(media_file, noise="-35dB", min_silence=0.4):
+    """
+    Find the silent stretches of media_file with ffmpeg's silencedetect filter
+
+    Returns:
+        list: (start, end) pairs in seconds, in order
+    """
+    result = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-nostats', '-i', media_file, '-map', '0:a:0',
+         '-af', f'silencedetect=noise={noise}:d={min_silence}', '-f', 'null', '-'],
+        capture_output=True, text=True, check=True,
+    )
+    silences = []
+    start = None
+    for kind, value in SILENCE_PATTERN.findall(result.stderr):
+        if kind == 'start':
+            start = max(float(value), 0.0)
+        elif start is not None:
+            silences.append((start, float(value)))
+            start = None
+    return silences
+
+def plan_chunks(duration, silences, chunk_seconds, search_seconds=None):
+    """
+    Choose where to cut a recording into chunks of about chunk_seconds
+
+    Each cut is placed in the middle of the silence nearest to the target
+    length, within search_seconds of it; without a silence nearby the cut
+    falls at the target length.
+
+    Args:
+        duration (float): Recording length in seconds
+        silences (list): (start, end) silent stretches in seconds
+        chunk_seconds (float): Target chunk length in seconds
+        search_seconds (float): How far from the target a cut may move
+                                (default: a fifth of chunk_seconds)
+
+    Returns:
+        list: (start, end) of every chunk in seconds, covering the recording
+    """
+    if search_seconds is None:
+        search_seconds = chunk_seconds / 5
+    midpoints = [(start + end) / 2 for start, end in silences]
+
+    chunks = []
+    start = 0.0
+    # The last chunk may run up to search_seconds over instead of leaving a sliver
+    while duration - start > chunk_seconds + search_seconds:
+        target = start + chunk_seconds
+        candidates = [point for point in midpoints if abs(point - target) <= search_seconds]
+        cut = min(candidates, key=lambda point: abs(point - target)) if candidates else target
+        chunks.append((start, cut))
+        start = cut
+    chunks.append((start, duration))
+    return chunks
+
+def cut_audio(media_file, start, end, path):
+    """
+    Write start..end seconds of media_file to path as mono 16 kHz Opus
+
+    The chunk is re-encoded rather than stream-copied so the cut is sample
+    accurate and its timestamps map back to the original by adding start.
+    An existing chunk file is reused.
+
+    Returns:
+        str: path
+    """
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f"{path}.tmp.ogg"
+    subprocess.run(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-ss', f"{start:.3f}", '-i', media_file,
+         '-t', f"{end - start:.3f}", '-map', '0:a:0', '-vn', '-ac', '1', '-ar', str(SAMPLE_RATE),
+         '-c:a', 'libopus', '-b:a', BITRATE, '-application', 'voip', temporary_path],
+        check=True,
+    )
+    os.replace(temporary_path, path)
+    return path
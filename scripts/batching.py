@@ -0,0 +1,103 @@
+import re
+from subtitles import format_srt, format_timestamp
+
+# Output tokens we aim to fill per request; leaves headroom below MAX_TOKENS
+DEFAULT_OUTPUT_BUDGET = 6000
+
+# How many more tokens a translation takes than the English source.
+# Rough figures for our target languages; unknown languages use the default.
+EXPANSION_FACTORS = {
+    "Croatian": 1.6,
+    "Serbian": 1.6,
+    "Bosnian": 1.6,
+    "Slovenian": 1.6,
+    "Macedonian": 2.2,
+    "Bulgarian": 2.2,
+    "Russian": 2.2,
+    "Ukrainian": 2.2,
+    "German": 1.4,
+    "Spanish": 1.3,
+    "Portuguese": 1.3,
+    "French": 1.3,
+    "Italian": 1.3,
+    "Hungarian": 1.7,
+    "Romanian": 1.5,
+}
+DEFAULT_EXPANSION = 1.6
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text):
+    """
+    Approximate the number of model tokens in text without a tokenizer
+
+    Every word or punctuation mark counts as one token and long words count
+    one extra token per 8 characters, which tracks BPE tokenizers closely
+    enough for English subtitles.
+    """
+    return sum(1 + len(piece) // 8 for piece in TOKEN_PATTERN.findall(text))
+
+def expansion_factor(language):
+    return EXPANSION_FACTORS.get(language, DEFAULT_EXPANSION)
+
+def cue_overhead_tokens(cue, text_only=False):
+    if text_only:
+        # JSON key and quotes, e.g. '"12": "",'
+        return estimate_tokens(f'"{cue.index}": "",')
+    # Cue number and timing line, which the model echoes back unchanged
+    return estimate_tokens(f"{cue.index}\n{format_timestamp(cue.start)} --> {format_timestamp(cue.end)}\n")
+
+class PackedBatch:
+    __slots__ = ('cues', 'input_tokens', 'output_tokens')
+
+    def __init__(self):
+        self.cues = []
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    @property
+    def text(self):
+        return format_srt(self.cues)
+
+def pack_cues(cues, language, output_budget=DEFAULT_OUTPUT_BUDGET, text_only=False):
+    """
+    Group cues into batches whose expected output fits output_budget tokens
+
+    Args:
+        cues (list): Cue objects in source order
+        language (str): Target language name from config.yaml
+        output_budget (int): Expected output tokens per batch
+        text_only (bool): Estimate for text-only payloads without timings
+
+    Returns:
+        list: PackedBatch objects in source order; a cue larger than the
+              budget gets a batch of its own
+    """
+    factor = expansion_factor(language)
+    batches = []
+    batch = PackedBatch()
+    for cue in cues:
+        overhead = cue_overhead_tokens(cue, text_only)
+        text_tokens = estimate_tokens(cue.text)
+        input_tokens = overhead + text_tokens
+        output_tokens = overhead + int(text_tokens * factor + 0.5)
+        if batch.cues and batch.output_tokens + output_tokens > output_budget:
+            batches.append(batch)
+            batch = PackedBatch()
+        batch.cues.append(cue)
+        batch.input_tokens += input_tokens
+        batch.output_tokens += output_tokens
+    if batch.cues:
+        batches.append(batch)
+    return batches
+
+def print_batch_plan(batches, output_budget, label=""):
+    prefix = f"[{label}] " if label else ""
+    total_input = sum(batch.input_tokens for batch in batches)
+    total_output = sum(batch.output_tokens for batch in batches)
+    print(f"{prefix}Batch plan: {len(batches)} batch(es), output budget {output_budget} tokens per batch")
+    for number, batch in enumerate(batches, 1):
+        first, last = batch.cues[0], batch.cues[-1]
+        print(f"{prefix}  batch {number}: cues {first.index}-{last.index} ({len(batch.cues)} cues), "
+              f"~{batch.input_tokens} input / ~{batch.output_tokens} output tokens")
+    print(f"{prefix}Estimated total: ~{total_input} input / ~{total_output} output tokens (excluding system prompt)")
@@ -0,0 +1,69 @@
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from subtitles import normalize_srt, write_srt
+from translator import split_srt_into_batches
+from fake_services import synthetic_srt
+
+# Regex based implementations the cue parser replaced, kept here for comparison
+
+def regex_normalize(content):
+    fixed_content = re.sub(r'\n{2,}(?=\d+\n\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3})', '\n', content.strip()) + '\n'
+    return re.sub(r'([^\n])\n(\d+\n\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3})', r'\1\n\n\2', fixed_content)
+
+def regex_split(srt_content, batch_size=200):
+    srt_content = srt_content.strip()
+    subtitles = re.split(r'\n(?=\d+\n\d{2}:\d{2}:\d{2},\d{3} -->)', srt_content)
+    batches = [subtitles[i:i + batch_size] for i in range(0, len(subtitles), batch_size)]
+    return ["\n".join(batch) + "\n" for batch in batches]
+
+def regex_write(srt_path, content):
+    # Write the model output, then read it back and normalize it on disk
+    with open(srt_path, 'w', encoding='utf-8') as file:
+        file.write(content)
+    with open(srt_path, 'r', encoding='utf-8') as file:
+        content = file.read()
+    with open(srt_path, 'w', encoding='utf-8') as file:
+        file.write(regex_normalize(content))
+
+def measure(function, argument, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(argument)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    function(argument)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    # python benchmark-srt.py [cue-count ...]
+    cue_counts = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]
+    repeat = 5
+
+    srt_path = os.path.join(tempfile.mkdtemp(), "benchmark.srt")
+
+    print(f"{'cues':>8}  {'operation':<10}  {'regex ms':>9}  {'cues ms':>9}  {'regex peak KiB':>14}  {'cues peak KiB':>13}")
+    for cue_count in cue_counts:
+        content = synthetic_srt(cue_count)
+        # Mangle the blank lines the way model output does
+        messy = content.replace("\n\n", "\n", cue_count // 3)
+        assert regex_normalize(messy) == normalize_srt(messy)
+
+        for name, old, new, argument in (
+            ("normalize", regex_normalize, normalize_srt, messy),
+            ("split", regex_split, split_srt_into_batches, content),
+            ("write", lambda text: regex_write(srt_path, text), lambda text: write_srt(srt_path, text), messy),
+        ):
+            old_time, old_peak = measure(old, argument, repeat)
+            new_time, new_peak = measure(new, argument, repeat)
+            print(f"{cue_count:>8}  {name:<10}  {old_time * 1000:>9.1f}  {new_time * 1000:>9.1f}  "
+                  f"{old_peak / 1024:>14.0f}  {new_peak / 1024:>13.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import statistics
+import subprocess
+
+# Modules that must only be imported by the commands that need them
+HEAVY_MODULES = ("yt_dlp", "assemblyai", "anthropic", "yaml")
+
+SAMPLE_SRT = "1\n00:00:01,000 --> 00:00:03,000\nIn the beginning was the Word.\n\n" \
+             "2\n00:00:03,500 --> 00:00:06,000\nAnd the Word was with God.\n"
+
+# Name -> arguments of ai-subtitles.py; the translate run finds its output in place and stops
+COMMANDS = [
+    ("interpreter", None),
+    ("help", []),
+    ("fix", ["fix", os.path.join("lang", "en", "benchmark.srt")]),
+    ("translate (no-op)", ["translate", "benchmark.srt", "hr"]),
+]
+
+def setup_tree(root_dir):
+    # A copy of scripts/ next to its own lang/, so nothing in the checkout is touched
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    shutil.copytree(source_dir, os.path.join(root_dir, "scripts"), ignore=shutil.ignore_patterns("__pycache__"))
+    os.makedirs(os.path.join(root_dir, "lang", "en"))
+    os.makedirs(os.path.join(root_dir, "lang", "hr"))
+    for path in (os.path.join("lang", "en", "benchmark.srt"), os.path.join("lang", "hr", "benchmark_HR.srt")):
+        with open(os.path.join(root_dir, path), 'w', encoding='utf-8') as file:
+            file.write(SAMPLE_SRT)
+    with open(os.path.join(root_dir, "lang", "hr", "config.yaml"), 'w', encoding='utf-8') as file:
+        file.write('language: "Croatian"\nbible_verse_translation: "Šarić"\n')
+
+def command_line(root_dir, arguments, options=()):
+    if arguments is None:
+        return [sys.executable, *options, "-c", "pass"]
+    return [sys.executable, *options, os.path.join(root_dir, "scripts", "ai-subtitles.py"), *arguments]
+
+def imported_modules(root_dir, arguments):
+    """
+    Run the command once with -X importtime
+
+    Returns:
+        tuple: (set of top-level package names imported, error line or None)
+    """
+    result = subprocess.run(command_line(root_dir, arguments, ("-X", "importtime")), cwd=root_dir,
+                            capture_output=True, text=True)
+    modules = set()
+    errors = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:"):
+            name = line.rsplit("|", 1)[-1].strip()
+            modules.add(name.split(".")[0])
+        elif line.strip():
+            errors.append(line.strip())
+    error = errors[-1] if result.returncode != 0 and errors else None
+    return modules, error
+
+def measure(root_dir, arguments, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(command_line(root_dir, arguments), cwd=root_dir, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), min(times)
+
+def main():
+    # python benchmark-startup.py [repeat]
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    root_dir = tempfile.mkdtemp()
+    try:
+        setup_tree(root_dir)
+        print(f"Cold start of ai-subtitles.py, {repeat} run(s) each\n")
+        print(f"{'command':<20}  {'median ms':>9}  {'best ms':>8}  {'modules':>7}  heavy modules imported")
+        for name, arguments in COMMANDS:
+            # The first run writes __pycache__, like any run after an update
+            modules, error = imported_modules(root_dir, arguments)
+            if error:
+                print(f"{name:<20}  failed: {error}")
+                continue
+            median, best = measure(root_dir, arguments, repeat)
+            heavy = ", ".join(module for module in HEAVY_MODULES if module in modules) or "none"
+            print(f"{name:<20}  {median * 1000:>9.1f}  {best * 1000:>8.1f}  {len(modules):>7}  {heavy}")
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import contextlib
+import importlib.util
+from subtitles import normalize_line_breaks
+from translation_config import TranslationConfig
+from fake_services import FakeMessagesServer, FakeAssemblyAIServer, synthetic_srt
+
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+RESULTS_FILE = "benchmark-results.json"
+
+def missing_modules(*names):
+    return [name for name in names if importlib.util.find_spec(name) is None]
+
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def result(name, cues, seconds, **extra):
+    return {"name": name, "cues": cues, "seconds": round(seconds, 4),
+            "cues_per_second": round(cues / seconds) if seconds else None, **extra}
+
+def skipped(name, reason, cues=None):
+    return {"name": name, "cues": cues, "skipped": reason}
+
+def benchmark_split(sizes, repeat):
+    from translator import split_srt_into_batches
+    results = []
+    for cue_count in sizes:
+        content = synthetic_srt(cue_count)
+        results.append(result("split_srt_into_batches", cue_count,
+                              best_time(lambda: split_srt_into_batches(content), repeat)))
+    return results
+
+def benchmark_normalize(sizes, repeat, work_dir):
+    results = []
+    for cue_count in sizes:
+        # Mangle the blank lines the way model output does; every run starts from the mangled file
+        messy = synthetic_srt(cue_count).replace("\n\n", "\n", cue_count // 3)
+        srt_path = os.path.join(work_dir, f"normalize-{cue_count}.srt")
+
+        def run():
+            with open(srt_path, 'w', encoding='utf-8') as file:
+                file.write(messy)
+            with contextlib.redirect_stdout(io.StringIO()):
+                normalize_line_breaks(srt_path)
+
+        results.append(result("normalize_line_breaks", cue_count, best_time(run, repeat)))
+    return results
+
+def messages_server(args):
+    return FakeMessagesServer(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                              rate_limit_every=args.rate_limit_every, overload_every=args.overload_every,
+                              truncate_every=args.truncate_every, requests_per_minute=args.requests_per_minute,
+                              input_tokens_per_minute=args.input_tokens_per_minute,
+                              output_tokens_per_minute=args.output_tokens_per_minute)
+
+def benchmark_translate(sizes, args, work_dir):
+    name = "translate_srt"
+    missing = missing_modules("anthropic")
+    if missing:
+        return [skipped(name, f"missing module(s): {', '.join(missing)}", cue_count) for cue_count in sizes]
+
+    from translator import translate_srt, create_client
+    config = TranslationConfig(path=None, language="Croatian", bible_verse_translation="Šarić")
+    results = []
+    for cue_count in sizes:
+        if cue_count > args.translate_max_cues:
+            results.append(skipped(name, f"above --translate-max-cues {args.translate_max_cues}", cue_count))
+            continue
+        content = synthetic_srt(cue_count)
+        with messages_server(args) as server:
+            os.environ["CLAUDE_API_KEY"] = "fake"
+            os.environ["CLAUDE_BASE_URL"] = server.url
+            client = create_client()
+            log = io.StringIO()
+            started = time.perf_counter()
+            stream_path = os.path.join(work_dir, f"translate-{cue_count}.partial.srt") if args.stream else None
+            try:
+                with contextlib.redirect_stdout(log):
+                    translated = translate_srt(content, config, workers=args.workers, client=client,
+                                               text_only=args.text_only, stream_path=stream_path)
+            except Exception as e:
+                results.append(skipped(name, f"failed: {e}", cue_count))
+                continue
+            seconds = time.perf_counter() - started
+            results.append(result(name, cue_count, seconds, complete=translated == content, workers=args.workers,
+                                  text_only=args.text_only, stream=args.stream, server=server.counters(),
+                                  scheduler=client.scheduler.summary()))
+    return results
+
+def benchmark_rate_limits(args):
+    # Concurrent jobs sharing one client against a server that enforces per-minute limits
+    name = "rate_limited_jobs"
+    cue_count = args.jobs * args.job_cues
+    missing = missing_modules("anthropic")
+    if missing:
+        return [skipped(name, f"missing module(s): {', '.join(missing)}", cue_count)]
+
+    from translator import translate_srt, create_client
+    config = TranslationConfig(path=None, language="Croatian", bible_verse_translation="Šarić")
+    contents = [synthetic_srt(args.job_cues, seed=job) for job in range(args.jobs)]
+    failures = []
+    with messages_server(args) as server:
+        os.environ["CLAUDE_API_KEY"] = "fake"
+        os.environ["CLAUDE_BASE_URL"] = server.url
+        client = create_client()
+
+        def run(content):
+            try:
+                if translate_srt(content, config, workers=args.workers, client=client) != content:
+                    failures.append("incomplete translation")
+            except Exception as e:
+                failures.append(str(e))
+
+        threads = [threading.Thread(target=run, args=(content,)) for content in contents]
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        seconds = time.perf_counter() - started
+        counters = server.counters()
+    # Share of the input token limit used over the run; the budget of the first minute is there from the start
+    utilisation = None
+    if args.input_tokens_per_minute:
+        budget = args.input_tokens_per_minute * (1 + seconds / 60)
+        utilisation = round(counters["input_tokens"] / budget, 3)
+    return [result(name, cue_count, seconds, jobs=args.jobs, failed_jobs=len(failures),
+                   errors=sorted(set(failures)), input_token_utilisation=utilisation, server=counters,
+                   scheduler=client.scheduler.summary())]
+
+def setup_pipeline_tree(root_dir, videos, media_bytes):
+    # A copy of scripts/ with already downloaded media, so the run needs neither YouTube nor yt_dlp
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    shutil.copytree(source_dir, os.path.join(root_dir, "scripts"), ignore=shutil.ignore_patterns("__pycache__"))
+    os.makedirs(os.path.join(root_dir, "lang", "hr"))
+    with open(os.path.join(root_dir, "lang", "hr", "config.yaml"), 'w', encoding='utf-8') as file:
+        file.write('language: "Croatian"\nbible_verse_translation: "Šarić"\n')
+
+    os.makedirs(os.path.join(root_dir, "content"))
+    index = {}
+    urls = []
+    for number in range(1, videos + 1):
+        video_id = f"fakevideo{number:02d}"
+        media_file = os.path.join("content", f"Benchmark video {number}.webm")
+        with open(os.path.join(root_dir, media_file), 'wb') as file:
+            file.write(os.urandom(media_bytes))
+        index[video_id] = {"file": media_file, "title": f"Benchmark video {number}", "duration": None,
+                           "url": None, "transcripts": {}}
+        urls.append(f"https://www.youtube.com/watch?v={video_id}")
+    with open(os.path.join(root_dir, "content", "index.json"), 'w', encoding='utf-8') as file:
+        json.dump(index, file)
+    urls_file = os.path.join(root_dir, "urls.txt")
+    with open(urls_file, 'w', encoding='utf-8') as file:
+        file.write("\n".join(urls) + "\n")
+    return urls_file
+
+def benchmark_pipeline(args):
+    name = "translate-yt.py"
+    missing = missing_modules("anthropic", "assemblyai", "dotenv", "yaml")
+    if missing:
+        return [skipped(name, f"missing module(s): {', '.join(missing)}")]
+
+    root_dir = tempfile.mkdtemp()
+    try:
+        urls_file = setup_pipeline_tree(root_dir, args.videos, args.media_bytes)
+        with messages_server(args) as messages, \
+                FakeAssemblyAIServer(args.transcription_seconds, args.pipeline_cues) as assemblyai:
+            env = dict(os.environ, CLAUDE_API_KEY="fake", CLAUDE_BASE_URL=messages.url,
+                       ASSEMBLY_AI_API_KEY="fake", ASSEMBLY_AI_BASE_URL=f"{assemblyai.url}/v2")
+            started = time.perf_counter()
+            process = subprocess.run([sys.executable, os.path.join(root_dir, "scripts", "translate-yt.py"),
+                                      urls_file, "hr"], cwd=root_dir, env=env, capture_output=True, text=True)
+            seconds = time.perf_counter() - started
+            outputs = [file_name for file_name in os.listdir(os.path.join(root_dir, "lang", "hr"))
+                       if file_name.endswith("_HR.srt")]
+            if process.returncode != 0 or len(outputs) != args.videos:
+                lines = (process.stderr or process.stdout).strip().splitlines()
+                return [skipped(name, f"failed: {lines[-1] if lines else process.returncode}")]
+            return [result(name, args.videos * args.pipeline_cues, seconds, videos=args.videos,
+                           videos_per_hour=round(args.videos / seconds * 3600),
+                           server=messages.counters(), transcription=assemblyai.counters())]
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results, previous=None):
+    # Earlier results by benchmark and size, to show the change between versions
+    baseline = {(entry["name"], entry["cues"]): entry for entry in (previous or {}).get("results", [])}
+    for entry in results:
+        label = f"{entry['name']:<24} {entry['cues'] or '':>8}"
+        if "skipped" in entry:
+            print(f"{label}  skipped: {entry['skipped']}")
+            continue
+        line = f"{label}  {entry['seconds'] * 1000:>10.1f} ms  {entry['cues_per_second'] or 0:>10} cues/s"
+        old = baseline.get((entry["name"], entry["cues"]))
+        if old and old.get("seconds"):
+            line += f"  ({(entry['seconds'] / old['seconds'] - 1) * 100:+.1f}% vs {previous.get('commit')})"
+        print(line)
+
+def main():
+    # python benchmark-suite.py [--sizes N ...] [--output results.json] [--compare earlier.json]
+    parser = argparse.ArgumentParser(description="Benchmark SRT handling, translation and the full pipeline "
+                                                 "against local fake API servers")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help=f"Synthetic SRT sizes in cues (default: {' '.join(map(str, DEFAULT_SIZES))})")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of the local benchmarks; the best counts")
+    parser.add_argument("--output", default=RESULTS_FILE, help=f"JSON results file (default: {RESULTS_FILE})")
+    parser.add_argument("--compare", help="Earlier JSON results file to compare against")
+    parser.add_argument("--only", nargs="+", choices=["split", "normalize", "translate", "ratelimit", "pipeline"],
+                        help="Run only these benchmarks")
+    group = parser.add_argument_group("fake Messages server")
+    group.add_argument("--latency", type=float, default=0.2, help="Seconds before each response (default: 0.2)")
+    group.add_argument("--tokens-per-second", type=float, default=2000,
+                       help="Output tokens per second of each response (default: 2000)")
+    group.add_argument("--rate-limit-every", type=int, default=0, help="Answer every Nth request with a 429")
+    group.add_argument("--overload-every", type=int, default=0, help="Answer every Nth request with a 529")
+    group.add_argument("--truncate-every", type=int, default=0,
+                       help="Cut every Nth response in half with stop_reason max_tokens")
+    group.add_argument("--requests-per-minute", type=int, default=0, help="Request limit enforced with 429s")
+    group.add_argument("--input-tokens-per-minute", type=int, default=0,
+                       help="Input token limit enforced with 429s")
+    group.add_argument("--output-tokens-per-minute", type=int, default=0,
+                       help="Output token limit enforced with 429s")
+    group = parser.add_argument_group("translation")
+    group.add_argument("--workers", type=int, default=4, help="Batches translated concurrently (default: 4)")
+    group.add_argument("--text-only", action="store_true", help="Use the text-only payload")
+    group.add_argument("--stream", action="store_true", help="Stream the responses")
+    group.add_argument("--translate-max-cues", type=int, default=10000,
+                       help="Largest size translated end to end (default: 10000)")
+    group = parser.add_argument_group("rate limits",
+                                      "ratelimit runs concurrent jobs; without the limit options above it uses "
+                                      "50 requests and 40000 input tokens per minute")
+    group.add_argument("--jobs", type=int, default=8, help="Jobs translated concurrently (default: 8)")
+    group.add_argument("--job-cues", type=int, default=300, help="Cues per job (default: 300)")
+    group = parser.add_argument_group("pipeline")
+    group.add_argument("--videos", type=int, default=4, help="Videos run through translate-yt.py (default: 4)")
+    group.add_argument("--pipeline-cues", type=int, default=500, help="Cues per fake transcript (default: 500)")
+    group.add_argument("--media-bytes", type=int, default=1_000_000, help="Size of each fake media file")
+    group.add_argument("--transcription-seconds", type=float, default=2.0,
+                       help="Processing time of each fake transcript (default: 2)")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            previous = json.load(file)
+
+    only = set(args.only or ["split", "normalize", "translate", "ratelimit", "pipeline"])
+    sizes = sorted(args.sizes)
+    results = []
+    work_dir = tempfile.mkdtemp()
+    try:
+        if "split" in only:
+            results += benchmark_split(sizes, args.repeat)
+        if "normalize" in only:
+            results += benchmark_normalize(sizes, args.repeat, work_dir)
+        if "translate" in only:
+            results += benchmark_translate(sizes, args, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    if "ratelimit" in only:
+        limited = argparse.Namespace(**vars(args))
+        if not (args.requests_per_minute or args.input_tokens_per_minute or args.output_tokens_per_minute):
+            limited.requests_per_minute, limited.input_tokens_per_minute = 50, 40000
+        results += benchmark_rate_limits(limited)
+    if "pipeline" in only:
+        results += benchmark_pipeline(args)
+
+    report = {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": results,
+    }
+    print_results(results, previous)
+    temporary_path = f"{args.output}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    os.replace(temporary_path, args.output)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
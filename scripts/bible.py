@@ -0,0 +1,238 @@
+import os
+import re
+from functools import lru_cache
+from difflib import SequenceMatcher
+from translation_memory import complete_sentences, normalize_segment
+
+# Bible text of a language: one verse per line, "book<TAB>chapter<TAB>verse<TAB>text",
+# with the OSIS book codes below (e.g. "John	3	16	For God so loved the world...")
+BIBLE_FILE = "bible.tsv"
+
+# OSIS code and the English names and abbreviations it is quoted by
+BOOKS = [
+    ("Gen", ["Genesis", "Gen"]), ("Exod", ["Exodus", "Exod", "Ex"]), ("Lev", ["Leviticus", "Lev"]),
+    ("Num", ["Numbers", "Num"]), ("Deut", ["Deuteronomy", "Deut"]), ("Josh", ["Joshua", "Josh"]),
+    ("Judg", ["Judges", "Judg"]), ("Ruth", ["Ruth"]), ("1Sam", ["1 Samuel", "1 Sam"]), ("2Sam", ["2 Samuel", "2 Sam"]),
+    ("1Kgs", ["1 Kings", "1 Kgs"]), ("2Kgs", ["2 Kings", "2 Kgs"]), ("1Chr", ["1 Chronicles", "1 Chron"]),
+    ("2Chr", ["2 Chronicles", "2 Chron"]), ("Ezra", ["Ezra"]), ("Neh", ["Nehemiah", "Neh"]),
+    ("Esth", ["Esther", "Esth"]), ("Job", ["Job"]), ("Ps", ["Psalms", "Psalm", "Ps"]), ("Prov", ["Proverbs", "Prov"]),
+    ("Eccl", ["Ecclesiastes", "Eccl"]), ("Song", ["Song of Solomon", "Song of Songs"]), ("Isa", ["Isaiah", "Isa"]),
+    ("Jer", ["Jeremiah", "Jer"]), ("Lam", ["Lamentations", "Lam"]), ("Ezek", ["Ezekiel", "Ezek"]),
+    ("Dan", ["Daniel", "Dan"]), ("Hos", ["Hosea", "Hos"]), ("Joel", ["Joel"]), ("Amos", ["Amos"]),
+    ("Obad", ["Obadiah", "Obad"]), ("Jonah", ["Jonah"]), ("Mic", ["Micah", "Mic"]), ("Nah", ["Nahum", "Nah"]),
+    ("Hab", ["Habakkuk", "Hab"]), ("Zeph", ["Zephaniah", "Zeph"]), ("Hag", ["Haggai", "Hag"]),
+    ("Zech", ["Zechariah", "Zech"]), ("Mal", ["Malachi", "Mal"]), ("Matt", ["Matthew", "Matt"]),
+    ("Mark", ["Mark"]), ("Luke", ["Luke"]), ("John", ["John"]), ("Acts", ["Acts"]), ("Rom", ["Romans", "Rom"]),
+    ("1Cor", ["1 Corinthians", "1 Cor"]), ("2Cor", ["2 Corinthians", "2 Cor"]), ("Gal", ["Galatians", "Gal"]),
+    ("Eph", ["Ephesians", "Eph"]), ("Phil", ["Philippians", "Phil"]), ("Col", ["Colossians", "Col"]),
+    ("1Thess", ["1 Thessalonians", "1 Thess"]), ("2Thess", ["2 Thessalonians", "2 Thess"]),
+    ("1Tim", ["1 Timothy", "1 Tim"]), ("2Tim", ["2 Timothy", "2 Tim"]), ("Titus", ["Titus"]),
+    ("Phlm", ["Philemon", "Philem"]), ("Heb", ["Hebrews", "Heb"]), ("Jas", ["James", "Jas"]),
+    ("1Pet", ["1 Peter", "1 Pet"]), ("2Pet", ["2 Peter", "2 Pet"]), ("1John", ["1 John"]), ("2John", ["2 John"]),
+    ("3John", ["3 John"]), ("Jude", ["Jude"]), ("Rev", ["Revelation", "Rev"]),
+]
+
+ORDINALS = {"1": ("1", "I", "First", "1st"), "2": ("2", "II", "Second", "2nd"), "3": ("3", "III", "Third", "3rd")}
+
+def _book_names():
+    names = {}
+    for code, book_names in BOOKS:
+        for name in book_names:
+            number, _, rest = name.partition(" ")
+            if number in ORDINALS and rest:
+                for ordinal in ORDINALS[number]:
+                    names[f"{ordinal} {rest}"] = code
+            else:
+                names[name] = code
+    return names
+
+BOOK_NAMES = _book_names()
+
+@lru_cache(maxsize=None)
+def reference_pattern():
+    """
+    "John 3:16", "1 Cor. 13:4-7", "Romans chapter 8, verse 28", "Psalm 23 verses 1 to 3".
+    Book names are matched case-sensitively so that "mark" or "acts" in a sentence are not references.
+
+    Compiled on first use: the pattern has hundreds of alternatives and runs that
+    never look up a verse should not pay for it at startup.
+    """
+    alternatives = "|".join(re.escape(name).replace(r"\ ", r"\s*")
+                            for name in sorted(BOOK_NAMES, key=len, reverse=True))
+    return re.compile(
+        rf"\b(?P<book>{alternatives})\.?\s+(?:chapter\s+)?(?P<chapter>\d{{1,3}})"
+        rf"(?::|,?\s+verses?\s+)(?P<verse>\d{{1,3}})(?:\s*(?:-|–|to|through)\s*(?P<end>\d{{1,3}}))?"
+    )
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Longest passage (in verses) a single reference may pull in
+MAX_REFERENCED_VERSES = 6
+# Fewest words for a cue to be matched against verse text
+MIN_QUOTE_WORDS = 5
+# Share of a cue's word triples that must appear in one verse for the cue to count as a quote
+MIN_QUOTE_COVERAGE = 0.8
+# Similarity above which a cue is the whole verse and is filled in without the model
+MIN_WHOLE_VERSE_SIMILARITY = 0.92
+# Word triples found in more verses than this ("and it came") are too common to narrow the search
+MAX_POSTINGS = 500
+
+def find_references(text):
+    """
+    Find verse references in text
+
+    Returns:
+        list: (book code, chapter, first verse, last verse) tuples
+    """
+    references = []
+    for match in reference_pattern().finditer(text):
+        name = " ".join(match.group("book").split())
+        # "1Cor" is written without the space
+        book = BOOK_NAMES.get(name) or BOOK_NAMES.get(re.sub(r"^(\d)(?=\D)", r"\1 ", name))
+        if book is None:
+            continue
+        first = int(match.group("verse"))
+        last = int(match.group("end") or first)
+        if last < first:
+            last = first
+        references.append((book, int(match.group("chapter")), first, min(last, first + MAX_REFERENCED_VERSES - 1)))
+    return references
+
+def format_reference(book, chapter, first, last):
+    return f"{book} {chapter}:{first}" + (f"-{last}" if last != first else "")
+
+def load_bible(path):
+    """
+    Load a bible.tsv file
+
+    Returns:
+        dict: (book code, chapter, verse) -> verse text
+    """
+    verses = {}
+    with open(path, 'r', encoding='utf-8-sig') as file:
+        for line in file:
+            parts = line.rstrip("\n").split("\t", 3)
+            if len(parts) != 4 or not parts[1].isdigit() or not parts[2].isdigit():
+                continue
+            verses[(parts[0], int(parts[1]), int(parts[2]))] = parts[3].strip()
+    return verses
+
+def _triples(normalized):
+    words = WORD_PATTERN.findall(normalized)
+    return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+class BibleIndex:
+    """
+    English and target-language Bible texts with an index of English verse wording
+
+    Detects quoted or referenced verses in English cues and supplies the
+    canonical target text for them.
+    """
+
+    def __init__(self, english, target, translation_name):
+        self.english = english
+        self.target = target
+        self.translation_name = translation_name
+        self._normalized = {}
+        self._postings = {}
+        for key, text in english.items():
+            if key not in target:
+                continue
+            normalized = normalize_segment(text)
+            self._normalized[key] = normalized
+            for triple in _triples(normalized):
+                self._postings.setdefault(triple, []).append(key)
+
+    def __len__(self):
+        return len(self._normalized)
+
+    def quoted_verse(self, text):
+        """
+        Return the verse text is quoted from and how similar they are
+
+        Returns:
+            tuple: (verse key, similarity) or (None, 0)
+        """
+        normalized = normalize_segment(text)
+        triples = _triples(normalized)
+        if len(WORD_PATTERN.findall(normalized)) < MIN_QUOTE_WORDS or not triples:
+            return None, 0
+        counts = {}
+        for triple in triples:
+            postings = self._postings.get(triple)
+            if not postings or len(postings) > MAX_POSTINGS:
+                continue
+            for key in postings:
+                counts[key] = counts.get(key, 0) + 1
+        if not counts:
+            return None, 0
+        key = max(counts, key=counts.get)
+        if counts[key] / len(triples) < MIN_QUOTE_COVERAGE:
+            return None, 0
+        return key, SequenceMatcher(None, normalized, self._normalized[key], autojunk=False).ratio()
+
+    def passage(self, book, chapter, first, last):
+        verses = [self.target.get((book, chapter, verse)) for verse in range(first, last + 1)]
+        return " ".join(verse for verse in verses if verse)
+
+    def lookup(self, cues):
+        """
+        Find the cues that quote or reference verses
+
+        Returns:
+            tuple: (dict cue index -> target verse text for cues that are a
+                    whole verse, dict cue index -> list of (reference, target
+                    text) the model must use as fixed text)
+        """
+        filled = {}
+        fixed = {}
+        for cue, complete in zip(cues, complete_sentences(cues)):
+            passages = []
+            for book, chapter, first, last in find_references(cue.text):
+                text = self.passage(book, chapter, first, last)
+                if text:
+                    passages.append((format_reference(book, chapter, first, last), text))
+
+            key, similarity = self.quoted_verse(cue.text)
+            if key is not None:
+                if complete and not passages and similarity >= MIN_WHOLE_VERSE_SIMILARITY:
+                    filled[cue.index] = self.target[key]
+                    continue
+                reference = format_reference(key[0], key[1], key[2], key[2])
+                if all(existing != reference for existing, _ in passages):
+                    passages.append((reference, self.target[key]))
+            if passages:
+                fixed[cue.index] = passages
+        return filled, fixed
+
+    def format_note(self, cues, fixed):
+        """
+        Render the verses of a batch as fixed text for the model, or None
+        """
+        # Each verse is listed once with every subtitle that quotes it
+        passages = {}
+        for cue in cues:
+            for reference, text in fixed.get(cue.index, []):
+                passages.setdefault((reference, text), []).append(str(cue.index))
+        lines = [f'{", ".join(numbers)}: {reference} "{text}"' for (reference, text), numbers in passages.items()]
+        if not lines:
+            return None
+        return (f"These subtitles quote or cite Bible verses, by subtitle number. Use exactly this "
+                f"{self.translation_name} text for them, divided over the subtitles the way the English is:\n"
+                + "\n".join(lines))
+
+@lru_cache(maxsize=None)
+def load_bible_index(root_dir, target_lang, translation_name):
+    """
+    Load lang/en/bible.tsv and lang/<target_lang>/bible.tsv if both exist
+
+    Loaded once per language and process, so every video of a run shares it.
+
+    Returns:
+        BibleIndex or None
+    """
+    english_file = os.path.join(root_dir, "lang", "en", BIBLE_FILE)
+    target_file = os.path.join(root_dir, "lang", target_lang, BIBLE_FILE)
+    if not os.path.exists(english_file) or not os.path.exists(target_file):
+        return None
+    return BibleIndex(load_bible(english_file), load_bible(target_file), translation_name)
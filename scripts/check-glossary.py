@@ -0,0 +1,42 @@
+import os
+import sys
+import argparse
+from subtitles import read_cues
+from glossary import Glossary, ComplianceStats
+from translation_config import load_translation_config
+
+def main():
+    # python check-glossary.py [origin-srt] [target-lang]
+    parser = argparse.ArgumentParser(
+        description="Report translated cues that miss a translation_mapping term, without calling any API")
+    parser.add_argument("origin_srt", help="SRT file name inside lang/en")
+    parser.add_argument("target_lang", help="Target language code, e.g. hr")
+    args = parser.parse_args()
+
+    origin_srt_file = args.origin_srt
+    if not origin_srt_file.endswith('.srt'):
+        origin_srt_file += '.srt'
+    media_name = os.path.splitext(origin_srt_file)[0]
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    root_dir = os.path.abspath(os.path.join(script_dir, ".."))
+
+    source_file = os.path.join(root_dir, "lang", "en", origin_srt_file)
+    target_file = os.path.join(root_dir, "lang", args.target_lang, f"{media_name}_{args.target_lang.upper()}.srt")
+    for path in (source_file, target_file):
+        if not os.path.exists(path):
+            print(f"File {path} not found")
+            return 1
+
+    translation_config = load_translation_config(os.path.join(root_dir, "lang", args.target_lang, "config.yaml"))
+    if not translation_config.translation_mapping:
+        print("No translation_mapping in config.yaml, nothing to check")
+        return 0
+
+    glossary = Glossary(translation_config.translation_mapping, translation_config.glossary_stems)
+    checked, flagged = glossary.check(read_cues(source_file), read_cues(target_file))
+    print(ComplianceStats(checked, flagged, 0, flagged).summary(glossary))
+    return 1 if flagged else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,415 @@
+import re
+import json
+import time
+import random
+import math
+import threading
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from subtitles import Cue, format_srt, parse_srt
+from batching import estimate_tokens
+from scheduler import TokenBucket
+
+# Local stand-ins for the Anthropic Messages API and AssemblyAI, so throughput can be measured without
+# spending money. Point the scripts at them with CLAUDE_BASE_URL and ASSEMBLY_AI_BASE_URL.
+
+WORDS = "the lord spirit church truth faith god people doctrine pioneers message".split()
+
+def synthetic_cues(cue_count, seed=0):
+    rng = random.Random(seed)
+    cues = []
+    start = 0
+    for index in range(1, cue_count + 1):
+        duration = rng.randint(1500, 4000)
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+        # Most subtitles end a sentence, as in real transcripts
+        cues.append(Cue(index, start, start + duration, text + ("." if rng.random() < 0.7 else "")))
+        start += duration + rng.randint(0, 200)
+    return cues
+
+def synthetic_srt(cue_count, seed=0):
+    return format_srt(synthetic_cues(cue_count, seed))
+
+class FakeServer(ABC):
+    """
+    ThreadingHTTPServer on a free local port, run in a background thread
+
+    Use as a context manager; url is set once the server listens.
+    Subclasses answer every GET and POST request in handle().
+    """
+
+    def __init__(self):
+        self.url = None
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def handle(self, handler):
+        """
+        Answer one request; handler is the BaseHTTPRequestHandler of the connection
+        """
+
+    def __enter__(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                service.handle(self)
+
+            def do_POST(self):
+                service.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+def read_body(handler):
+    length = int(handler.headers.get("content-length") or 0)
+    return handler.rfile.read(length) if length else b""
+
+def send(handler, status, body, content_type="application/json", headers=None):
+    if not isinstance(body, bytes):
+        body = (body if isinstance(body, str) else json.dumps(body)).encode("utf-8")
+    handler.send_response(status)
+    handler.send_header("content-type", content_type)
+    handler.send_header("content-length", str(len(body)))
+    for name, value in (headers or {}).items():
+        handler.send_header(name, str(value))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+def fake_translation(payload):
+    """
+    Answer a batch with its own cues, in the format it was sent in
+    """
+    cues = parse_srt(payload)
+    if cues:
+        return format_srt(cues)
+    try:
+        texts = json.loads(payload)
+    except json.JSONDecodeError:
+        return payload
+    return json.dumps(texts, ensure_ascii=False, indent=0)
+
+def request_payload(request):
+    # A note is sent as a separate block before the batch
+    content = request["messages"][-1]["content"]
+    return content if isinstance(content, str) else content[-1]["text"]
+
+class FakeMessagesServer(FakeServer):
+    """
+    Fake Anthropic Messages endpoint (POST /v1/messages, plain and streamed)
+    and Message Batches endpoints (create, retrieve and results)
+
+    Answers every batch with its own cues after latency plus the output
+    tokens at tokens_per_second. Every rate_limit_every-th request gets a
+    429 and every overload_every-th a 529, both with retry-after. Every
+    truncate_every-th response is cut in half with stop_reason
+    "max_tokens". The per-minute limits are token buckets like the real
+    API's: a request that does not fit gets a 429 with the seconds until
+    it would, and every response carries the anthropic-ratelimit-*
+    headers of the remaining budget.
+
+    A Message Batch job ends batch_seconds after it was created. Its
+    requests are answered like single requests, with every
+    truncate_every-th of them cut off, and are neither paced nor rate
+    limited.
+    """
+
+    def __init__(self, latency=0.2, tokens_per_second=2000, rate_limit_every=0, overload_every=0,
+                 truncate_every=0, retry_after=1, requests_per_minute=0, input_tokens_per_minute=0,
+                 output_tokens_per_minute=0, batch_seconds=0.0):
+        super().__init__()
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_every = rate_limit_every
+        self.overload_every = overload_every
+        self.truncate_every = truncate_every
+        self.retry_after = retry_after
+        self.batch_seconds = batch_seconds
+        self.buckets = {"requests": TokenBucket(requests_per_minute or None),
+                        "input-tokens": TokenBucket(input_tokens_per_minute or None),
+                        "output-tokens": TokenBucket(output_tokens_per_minute or None)}
+        self.requests = 0
+        self.completed = 0
+        self.rate_limited = 0
+        self.overloaded = 0
+        self.truncated = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._cached_prompts = set()
+        # Message Batch jobs by ID: (created, results), and submissions and truncated results per custom_id
+        self.batch_jobs = {}
+        self.batch_requests = 0
+        # Cues sent in batch requests, and cues of cut-off results that are lost or incomplete
+        self.batch_cues = 0
+        self.cut_cues = 0
+        self.submissions = {}
+        self.truncated_results = {}
+
+    def counters(self):
+        with self._lock:
+            return {"requests": self.requests, "completed": self.completed, "rate_limited": self.rate_limited,
+                    "overloaded": self.overloaded, "truncated": self.truncated,
+                    "input_tokens": self.input_tokens, "output_tokens": self.output_tokens,
+                    "batch_jobs": len(self.batch_jobs), "batch_requests": self.batch_requests,
+                    "batch_cues": self.batch_cues, "cut_cues": self.cut_cues}
+
+    def _headers(self, now):
+        headers = {}
+        for name, bucket in self.buckets.items():
+            if bucket.limit:
+                full_at = time.time() + (bucket.limit - bucket.tokens) * 60 / bucket.limit
+                headers[f"anthropic-ratelimit-{name}-limit"] = bucket.limit
+                headers[f"anthropic-ratelimit-{name}-remaining"] = max(0, int(bucket.tokens))
+                headers[f"anthropic-ratelimit-{name}-reset"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(full_at))
+        return headers
+
+    def _error(self, handler, status, error_type, retry_after, headers):
+        send(handler, status, {"type": "error", "error": {"type": error_type, "message": f"Fake {error_type}"}},
+             headers={**headers, "retry-after": retry_after})
+
+    def handle(self, handler):
+        path = handler.path.split("?")[0]
+        if path.startswith("/v1/messages/batches"):
+            self._handle_batches(handler, path)
+            return
+        if handler.command != "POST" or path != "/v1/messages":
+            self._not_found(handler)
+            return
+        request = json.loads(read_body(handler))
+        payload = request_payload(request)
+        system_text = "".join(block["text"] for block in request.get("system") or [])
+        input_tokens = estimate_tokens(json.dumps(request["messages"]))
+        system_tokens = estimate_tokens(system_text)
+
+        now = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            number = self.requests
+            for bucket in self.buckets.values():
+                bucket.refill(now)
+            # Cache reads do not count towards the input token limit
+            cached = system_text in self._cached_prompts
+            counted_tokens = input_tokens + (0 if cached else system_tokens)
+            # Output tokens are only known afterwards, so a request needs some output budget left
+            wait = max(self.buckets["requests"].wait_time(1),
+                       self.buckets["input-tokens"].wait_time(counted_tokens),
+                       self.buckets["output-tokens"].wait_time(1))
+            headers = self._headers(now)
+            if wait > 0 or (self.rate_limit_every and number % self.rate_limit_every == 0):
+                self.rate_limited += 1
+                error = ("rate_limit_error", 429, math.ceil(wait) if wait > 0 else self.retry_after)
+            elif self.overload_every and number % self.overload_every == 0:
+                self.overloaded += 1
+                error = ("overloaded_error", 529, self.retry_after)
+            else:
+                error = None
+                self.buckets["requests"].take(1)
+                self.buckets["input-tokens"].take(counted_tokens)
+                self._cached_prompts.add(system_text)
+                truncate = bool(self.truncate_every and number % self.truncate_every == 0)
+        if error:
+            self._error(handler, error[1], error[0], error[2], headers)
+            return
+
+        text = fake_translation(payload)
+        stop_reason = "end_turn"
+        if truncate:
+            text = text[:len(text) // 2]
+            stop_reason = "max_tokens"
+        output_tokens = estimate_tokens(text)
+        usage = {"input_tokens": input_tokens,
+                 "cache_creation_input_tokens": 0 if cached else system_tokens,
+                 "cache_read_input_tokens": system_tokens if cached else 0}
+        with self._lock:
+            self.buckets["output-tokens"].take(output_tokens)
+            headers = self._headers(now)
+
+        message = {"id": f"msg_fake_{number}", "type": "message", "role": "assistant", "model": request["model"],
+                   "content": [], "stop_reason": None, "stop_sequence": None, "usage": {**usage, "output_tokens": 0}}
+        if request.get("stream"):
+            self._stream(handler, message, text, stop_reason, output_tokens, headers)
+        else:
+            time.sleep(self.latency + output_tokens / self.tokens_per_second)
+            message.update(content=[{"type": "text", "text": text}], stop_reason=stop_reason,
+                           usage={**usage, "output_tokens": output_tokens})
+            send(handler, 200, message, headers=headers)
+
+        with self._lock:
+            self.completed += 1
+            self.truncated += truncate
+            self.input_tokens += input_tokens + system_tokens
+            self.output_tokens += output_tokens
+
+    def _not_found(self, handler):
+        send(handler, 404, {"type": "error", "error": {"type": "not_found_error", "message": handler.path}})
+
+    def _handle_batches(self, handler, path):
+        parts = path[len("/v1/messages/batches"):].strip("/").split("/")
+        if handler.command == "POST" and parts == [""]:
+            send(handler, 200, self._create_batch(json.loads(read_body(handler))["requests"]))
+            return
+        with self._lock:
+            job = self.batch_jobs.get(parts[0])
+        if handler.command != "GET" or job is None or len(parts) > 2 or (len(parts) == 2 and parts[1] != "results"):
+            self._not_found(handler)
+            return
+        if len(parts) == 1:
+            send(handler, 200, self._batch_status(parts[0], job))
+        elif not self._batch_ended(job):
+            send(handler, 400, {"type": "error", "error": {"type": "invalid_request_error",
+                                                          "message": "Batch is still processing"}})
+        else:
+            send(handler, 200, "".join(json.dumps(result) + "\n" for result in job[1]),
+                 content_type="application/binary")
+
+    def _create_batch(self, requests):
+        # Every result is decided on submission; the job only reports it after batch_seconds
+        results = []
+        with self._lock:
+            batch_id = f"msgbatch_fake_{len(self.batch_jobs) + 1:04d}"
+            for entry in requests:
+                self.batch_requests += 1
+                custom_id, params = entry["custom_id"], entry["params"]
+                self.submissions[custom_id] = self.submissions.get(custom_id, 0) + 1
+                text = fake_translation(request_payload(params))
+                cue_count = len(parse_srt(request_payload(params)))
+                self.batch_cues += cue_count
+                stop_reason = "end_turn"
+                if self.truncate_every and self.batch_requests % self.truncate_every == 0:
+                    self.truncated_results[custom_id] = self.truncated_results.get(custom_id, 0) + 1
+                    text = text[:len(text) // 2]
+                    stop_reason = "max_tokens"
+                    # The last cue of a cut-off response may be incomplete, so it is lost too
+                    self.cut_cues += cue_count - max(0, len(parse_srt(text)) - 1)
+                message = {"id": f"msg_fake_batch_{self.batch_requests}", "type": "message", "role": "assistant",
+                           "model": params["model"], "content": [{"type": "text", "text": text}],
+                           "stop_reason": stop_reason, "stop_sequence": None,
+                           "usage": {"input_tokens": estimate_tokens(json.dumps(params["messages"])),
+                                     "output_tokens": estimate_tokens(text)}}
+                results.append({"custom_id": custom_id, "result": {"type": "succeeded", "message": message}})
+            job = (time.time(), results)
+            self.batch_jobs[batch_id] = job
+        return self._batch_status(batch_id, job)
+
+    def _batch_ended(self, job):
+        return time.time() - job[0] >= self.batch_seconds
+
+    def _batch_status(self, batch_id, job):
+        created, results = job
+        ended = self._batch_ended(job)
+        timestamp = lambda seconds: time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds))
+        return {"id": batch_id, "type": "message_batch", "processing_status": "ended" if ended else "in_progress",
+                "request_counts": {"processing": 0 if ended else len(results), "succeeded": len(results) if ended else 0,
+                                   "errored": 0, "canceled": 0, "expired": 0},
+                "created_at": timestamp(created), "expires_at": timestamp(created + 86400),
+                "ended_at": timestamp(created + self.batch_seconds) if ended else None,
+                "cancel_initiated_at": None, "archived_at": None,
+                "results_url": f"{self.url}/v1/messages/batches/{batch_id}/results" if ended else None}
+
+    def _stream(self, handler, message, text, stop_reason, output_tokens, headers):
+        handler.send_response(200)
+        handler.send_header("content-type", "text/event-stream")
+        handler.send_header("connection", "close")
+        for name, value in headers.items():
+            handler.send_header(name, str(value))
+        handler.end_headers()
+        handler.close_connection = True
+
+        def event(name, data):
+            handler.wfile.write(f"event: {name}\ndata: {json.dumps({'type': name, **data})}\n\n".encode("utf-8"))
+            handler.wfile.flush()
+
+        time.sleep(self.latency)
+        event("message_start", {"message": message})
+        event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+        # One delta per line, paced at tokens_per_second
+        for line in re.findall(r"[^\n]*\n|[^\n]+$", text):
+            time.sleep(estimate_tokens(line) / self.tokens_per_second)
+            event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": line}})
+        event("content_block_stop", {"index": 0})
+        event("message_delta", {"delta": {"stop_reason": stop_reason, "stop_sequence": None},
+                                "usage": {"output_tokens": output_tokens}})
+        event("message_stop", {})
+
+class FakeAssemblyAIServer(FakeServer):
+    """
+    Fake AssemblyAI v2 API: upload, transcript submission, polling and SRT export
+
+    Transcripts complete processing_seconds after submission with
+    cue_count synthetic cues. upload_bytes_per_second throttles uploads
+    (0 for no limit).
+    """
+
+    def __init__(self, processing_seconds=2.0, cue_count=500, upload_bytes_per_second=0):
+        super().__init__()
+        self.processing_seconds = processing_seconds
+        self.cue_count = cue_count
+        self.upload_bytes_per_second = upload_bytes_per_second
+        self.uploads = 0
+        self.uploaded_bytes = 0
+        self.transcripts = {}
+
+    def counters(self):
+        with self._lock:
+            return {"uploads": self.uploads, "uploaded_bytes": self.uploaded_bytes,
+                    "transcripts": len(self.transcripts)}
+
+    def _transcript(self, transcript_id):
+        with self._lock:
+            audio_url, submitted, seed = self.transcripts[transcript_id]
+        done = time.monotonic() - submitted >= self.processing_seconds
+        cues = synthetic_cues(self.cue_count, seed) if done else []
+        return {
+            "id": transcript_id, "audio_url": audio_url, "status": "completed" if done else "processing",
+            "text": " ".join(cue.text for cue in cues) if done else None, "words": [] if done else None,
+            "error": None, "language_code": "en", "language_model": "assemblyai_default",
+            "acoustic_model": "assemblyai_default", "speech_model": None, "webhook_auth": False,
+            "auto_highlights": False, "redact_pii": False, "summarization": False,
+            "audio_duration": cues[-1].end // 1000 if cues else None,
+        }
+
+    def handle(self, handler):
+        path = handler.path.split("?")[0].rstrip("/")
+        if handler.command == "POST" and path == "/v2/upload":
+            started = time.monotonic()
+            size = len(read_body(handler))
+            if self.upload_bytes_per_second:
+                time.sleep(max(0, size / self.upload_bytes_per_second - (time.monotonic() - started)))
+            with self._lock:
+                self.uploads += 1
+                self.uploaded_bytes += size
+                number = self.uploads
+            send(handler, 200, {"upload_url": f"{self.url}/uploads/{number}"})
+        elif handler.command == "POST" and path == "/v2/transcript":
+            request = json.loads(read_body(handler))
+            with self._lock:
+                transcript_id = f"fake-{len(self.transcripts) + 1}"
+                self.transcripts[transcript_id] = (request.get("audio_url"), time.monotonic(), len(self.transcripts))
+            send(handler, 200, self._transcript(transcript_id))
+        elif handler.command == "GET" and path.startswith("/v2/transcript/"):
+            parts = path.split("/")
+            if parts[3] not in self.transcripts:
+                send(handler, 404, {"error": f"Transcript {parts[3]} not found"})
+            elif len(parts) == 5 and parts[4] == "srt":
+                with self._lock:
+                    seed = self.transcripts[parts[3]][2]
+                send(handler, 200, format_srt(synthetic_cues(self.cue_count, seed)), "text/plain")
+            else:
+                send(handler, 200, self._transcript(parts[3]))
+        else:
+            send(handler, 404, {"error": f"Unknown endpoint {handler.command} {path}"})
@@ -0,0 +1,193 @@
+import re
+from collections import deque
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+WORD_PATTERN = re.compile(r"\w+")
+
+# Trailing vowels dropped to get the default stem of a target word ("Golgota" -> "golgot")
+VOWELS = "aeiouyаеиоуыэюяё"
+# Shortest default stem; shorter words must match in full
+MIN_STEM_LENGTH = 3
+
+def _fold(text):
+    # Lower-cases and turns every run of whitespace (line breaks, double spaces) into one space,
+    # the way terms are stored. Characters whose lower case is longer, like "İ", are kept as they are.
+    folded = text.lower()
+    if len(folded) != len(text):
+        folded = "".join(char.lower() if len(char.lower()) == 1 else char for char in text)
+    return WHITESPACE_PATTERN.sub(" ", folded)
+
+def _is_word_char(char):
+    return char.isalnum() or char == "_"
+
+def default_stems(phrase):
+    """
+    Stems that an inflected form of phrase starts with, one per word
+    """
+    stems = []
+    for word in WORD_PATTERN.findall(_fold(phrase)):
+        stem = word.rstrip(VOWELS)
+        stems.append(stem if len(stem) >= MIN_STEM_LENGTH else word)
+    return stems
+
+class Glossary:
+    """
+    translation_mapping compiled into an Aho-Corasick automaton
+
+    Finds every source term of the mapping in a text in one pass,
+    case-insensitively and only where the term starts and ends on a word
+    boundary ("Lord" does not match inside "Lordship").
+    """
+
+    def __init__(self, mapping, stems=None):
+        self.mapping = mapping
+        # Every stem of a rendering must start a word of the translation for it to count as used
+        stems = stems or {}
+        self.stems = {
+            term: [_fold(stem) for stem in stems[target]] if target in stems else default_stems(target)
+            for term, target in mapping.items()
+        }
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for term in mapping:
+            folded = _fold(term).strip()
+            if folded:
+                self._add(folded, term)
+        self._link()
+
+    def __len__(self):
+        return len(self.mapping)
+
+    def _add(self, folded, term):
+        state = 0
+        for char in folded:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(folded), term))
+
+    def _link(self):
+        # Breadth-first, so every failure link points to an already linked state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """
+        Return the mapping terms that occur in text as whole words
+
+        Returns:
+            set: Source terms as written in the mapping
+        """
+        folded = _fold(text)
+        found = set()
+        state = 0
+        for end, char in enumerate(folded, 1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, term in self._output[state]:
+                start = end - length
+                if term in found:
+                    continue
+                if _is_word_char(folded[start]) and start > 0 and _is_word_char(folded[start - 1]):
+                    continue
+                if _is_word_char(folded[end - 1]) and end < len(folded) and _is_word_char(folded[end]):
+                    continue
+                found.add(term)
+        return found
+
+    def format_note(self, terms):
+        """
+        Render the mapping entries of terms as a note for the model, or None
+        """
+        if not terms:
+            return None
+        # Mapping order keeps the note identical for batches with the same terms
+        lines = [f'   - "{src}" → "{tgt}"' for src, tgt in self.mapping.items() if src in terms]
+        return "For the following words or phrases in these subtitles, use the provided translations:\n" + \
+            "\n".join(lines)
+
+    def missing(self, terms, target_text):
+        """
+        Return the terms whose required rendering is not in target_text
+
+        Args:
+            terms (set): Source terms found in the source text
+            target_text (str): Translation of the source text
+
+        Returns:
+            list: Source terms in mapping order
+        """
+        words = WORD_PATTERN.findall(_fold(target_text))
+        missing = []
+        for term in self.mapping:
+            if term in terms and not all(any(word.startswith(stem) for word in words) for stem in self.stems[term]):
+                missing.append(term)
+        return missing
+
+    def check(self, source_cues, target_cues):
+        """
+        Align cues by number and flag translations that miss a mapped term
+
+        Returns:
+            tuple: (number of cues containing a mapped term,
+                    dict cue index -> list of missing source terms)
+        """
+        targets = {cue.index: cue.text for cue in target_cues}
+        checked = 0
+        flagged = {}
+        for cue in source_cues:
+            if cue.index not in targets:
+                continue
+            terms = self.find(cue.text)
+            if not terms:
+                continue
+            checked += 1
+            missing = self.missing(terms, targets[cue.index])
+            if missing:
+                flagged[cue.index] = missing
+        return checked, flagged
+
+    def format_instruction(self, flagged):
+        """
+        Render a focused instruction for re-translating flagged cues
+        """
+        lines = [f'{index}: "{term}" must be translated as "{self.mapping[term]}" (inflected as needed)'
+                 for index, terms in sorted(flagged.items()) for term in terms]
+        return ("An earlier translation of these subtitles ignored the required translation of some terms. "
+                "Translate them again and use these translations:\n" + "\n".join(lines))
+
+class ComplianceStats:
+    """
+    Result of the glossary check of one translated file
+    """
+
+    def __init__(self, checked, flagged, fixed, remaining):
+        self.checked = checked
+        self.flagged = flagged
+        self.fixed = fixed
+        self.remaining = remaining
+
+    def summary(self, glossary):
+        lines = [f"Glossary compliance: {self.checked} cue(s) with mapped terms, {len(self.flagged)} flagged, "
+                 f"{self.fixed} fixed by re-translation, {len(self.remaining)} still missing a term"]
+        for index, terms in sorted(self.remaining.items()):
+            renderings = ", ".join(f'"{term}" → "{glossary.mapping[term]}"' for term in terms)
+            lines.append(f"  cue {index}: {renderings}")
+        return "\n".join(lines)
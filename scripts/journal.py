@@ -0,0 +1,53 @@
+import os
+import json
+
+class BatchJournal:
+    """
+    Append-only record of finished batches for one translation job
+
+    The journal lives next to the target SRT as "<target>.journal". Every
+    finished batch is appended as one JSON line keyed by its cache_key, so a
+    re-run after a crash only translates the batches that are missing. Lines
+    whose key no longer matches a batch (the source or prompt changed) are
+    simply not used.
+    """
+
+    def __init__(self, target_srt_file):
+        self.path = f"{target_srt_file}.journal"
+
+    def load(self):
+        """
+        Returns:
+            dict: cache key -> translation for every recorded batch
+        """
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, 'r', encoding='utf-8') as file:
+            content = file.read()
+
+        if content and not content.endswith("\n"):
+            # The process died while writing the last line; drop it so the
+            # next record starts on a line of its own
+            content = content[:content.rfind("\n") + 1]
+            with open(self.path, 'w', encoding='utf-8') as file:
+                file.write(content)
+
+        for line in content.splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry["key"]] = entry["translation"]
+        return entries
+
+    def record(self, batch_number, key, translation):
+        line = json.dumps({"batch": batch_number, "key": key, "translation": translation}, ensure_ascii=False)
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(line + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
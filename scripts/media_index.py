@@ -0,0 +1,161 @@
+import os
+import json
+import threading
+from urllib.parse import urlparse, parse_qs
+
+# Downloaded media by YouTube video ID, next to the media files
+INDEX_FILE = os.path.join("content", "index.json")
+
+def video_id_from_url(url):
+    """
+    Read the YouTube video ID from a video URL without a network request
+
+    Args:
+        url (str): watch, youtu.be, shorts, live or embed URL
+
+    Returns:
+        str or None: Video ID, or None when url has no recognisable ID
+    """
+    parsed = urlparse(url)
+    if parsed.netloc.endswith('youtu.be'):
+        return parsed.path.strip('/').split('/')[0] or None
+    video_ids = parse_qs(parsed.query).get('v')
+    if video_ids:
+        return video_ids[0]
+    parts = parsed.path.strip('/').split('/')
+    if len(parts) >= 2 and parts[0] in ('shorts', 'live', 'embed', 'v'):
+        return parts[1]
+    return None
+
+class MediaIndex:
+    """
+    JSON manifest of downloaded videos keyed by YouTube video ID
+
+    Each entry records the media file, title, duration and the SRT file of
+    every language, with paths relative to the repository root so the index
+    survives moving the checkout. Safe to share between threads.
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.path = os.path.join(root_dir, INDEX_FILE)
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self._entries = json.load(file)
+
+    def _absolute(self, path):
+        return os.path.join(self.root_dir, path) if path else None
+
+    def _relative(self, path):
+        return os.path.relpath(path, self.root_dir)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(self._entries, file, indent=2, ensure_ascii=False, sort_keys=True)
+        os.replace(temporary_path, self.path)
+
+    def media_file(self, video_id):
+        """
+        Return the indexed media file of video_id if it still exists
+        """
+        with self._lock:
+            entry = self._entries.get(video_id)
+        media_file = self._absolute(entry and entry.get("file"))
+        return media_file if media_file and os.path.exists(media_file) else None
+
+    def transcript(self, video_id, lang):
+        """
+        Return the indexed SRT file of video_id in lang if it still exists
+        """
+        with self._lock:
+            entry = self._entries.get(video_id) or {}
+        srt_file = self._absolute(entry.get("transcripts", {}).get(lang))
+        return srt_file if srt_file and os.path.exists(srt_file) else None
+
+    def add_media(self, video_id, media_file, info):
+        with self._lock:
+            entry = self._entries.setdefault(video_id, {"transcripts": {}})
+            entry.update({
+                "file": self._relative(media_file),
+                "title": info.get("title"),
+                "duration": info.get("duration"),
+                "url": info.get("webpage_url"),
+            })
+            self._save()
+
+    def add_transcript(self, video_id, lang, srt_file):
+        with self._lock:
+            entry = self._entries.setdefault(video_id, {"transcripts": {}})
+            entry.setdefault("transcripts", {})[lang] = self._relative(srt_file)
+            self._save()
+
+def download_audio(url, output_dir, index=None):
+    """
+    Download audio from a YouTube URL if it doesn't already exist
+
+    A video already in the index is returned without any network request.
+    Otherwise the metadata is fetched once and reused for the download.
+
+    Args:
+        url (str): YouTube URL to download audio from
+        output_dir (str): Directory to save the audio file
+        index (MediaIndex): Optional index of downloaded videos
+
+    Returns:
+        tuple: (video ID, path to the file), or (None, None) if an error occurred
+    """
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+
+    video_id = video_id_from_url(url)
+    if index is not None and video_id:
+        media_file = index.media_file(video_id)
+        if media_file:
+            print(f"File already downloaded: {media_file}")
+            print("Skipping download...")
+            return video_id, media_file
+
+    # Imported only when YouTube has to be asked, which keeps re-runs fast to start
+    import yt_dlp
+
+    output_template = os.path.join(output_dir, '%(title)s.%(ext)s')
+
+    # Configure yt-dlp options for WebM download without conversion
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'outtmpl': output_template,
+        'noplaylist': True,
+        'quiet': False,
+        'no_warnings': False
+    }
+
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            video_id = info.get('id') or video_id
+            filename = ydl.prepare_filename(info)
+
+            # Files downloaded before the index existed are matched by title
+            base_filename = os.path.splitext(filename)[0]
+            for media_file in (filename, f"{base_filename}.mp3", f"{base_filename}.webm"):
+                if os.path.exists(media_file):
+                    print(f"File already exists: {media_file}")
+                    print("Skipping download...")
+                    break
+            else:
+                print(f"Downloading audio from: {url}")
+                # Download with the info already fetched instead of extracting it again
+                info = ydl.process_ie_result(info, download=True)
+                media_file = ydl.prepare_filename(info)
+                print(f"Audio downloaded successfully: {media_file}")
+    except Exception as e:
+        print(f"Error downloading audio: {str(e)}")
+        return None, None
+
+    if index is not None and video_id:
+        index.add_media(video_id, media_file, info)
+    return video_id, media_file
@@ -0,0 +1,108 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class Stage:
+    """
+    One step of a pipeline with its own bounded worker pool
+
+    function(item) returns the item handed to the next stage, or None when
+    the item should not continue (e.g. the step failed).
+    """
+
+    def __init__(self, name, function, workers):
+        self.name = name
+        self.function = function
+        self.workers = max(1, workers)
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+
+class Pipeline:
+    """
+    Run items through stages so different items occupy different stages at
+    the same time: item 2 downloads while item 1 transcribes and item 0
+    translates.
+
+    With a telemetry, every stage run is recorded as a "stage" event with
+    the number of the item in the input.
+    """
+
+    def __init__(self, stages, telemetry=None):
+        self.stages = stages
+        self.telemetry = telemetry
+        self.finished = []
+        self.elapsed = 0.0
+        self._executors = [ThreadPoolExecutor(max_workers=stage.workers, thread_name_prefix=stage.name)
+                           for stage in stages]
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def run(self, items):
+        """
+        Push items through every stage and wait until all are done
+
+        Returns:
+            list: Results of the last stage for the items that made it through
+        """
+        started = time.monotonic()
+        for number, item in enumerate(items, 1):
+            self._submit(0, item, number)
+
+        with self._idle:
+            while self._in_flight:
+                self._idle.wait()
+
+        for executor in self._executors:
+            executor.shutdown()
+        self.elapsed = time.monotonic() - started
+        return self.finished
+
+    def _submit(self, stage_index, item, number):
+        with self._lock:
+            self._in_flight += 1
+        self._executors[stage_index].submit(self._run_stage, stage_index, item, number)
+
+    def _run_stage(self, stage_index, item, number):
+        stage = self.stages[stage_index]
+        started = time.monotonic()
+        try:
+            result = stage.function(item)
+        except (Exception, SystemExit) as e:
+            print(f"[{stage.name}] Failed for {item}: {e}")
+            result = None
+
+        seconds = time.monotonic() - started
+        if self.telemetry is not None:
+            self.telemetry.record("stage", stage=stage.name, item=number, seconds=round(seconds, 3),
+                                  status="failed" if result is None else "ok")
+
+        with self._lock:
+            stage.busy_seconds += seconds
+            if result is None:
+                stage.failed += 1
+            else:
+                stage.completed += 1
+                if stage_index == len(self.stages) - 1:
+                    self.finished.append(result)
+
+        if result is not None and stage_index + 1 < len(self.stages):
+            self._submit(stage_index + 1, result, number)
+
+        with self._idle:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self._idle.notify_all()
+
+    def summary(self, item_count):
+        lines = [f"Pipeline finished {len(self.finished)} of {item_count} item(s) in {self.elapsed:.1f}s"]
+        for stage in self.stages:
+            done = stage.completed + stage.failed
+            average = stage.busy_seconds / done if done else 0
+            utilisation = stage.busy_seconds / (self.elapsed * stage.workers) * 100 if self.elapsed else 0
+            lines.append(f"  {stage.name:<11} {stage.completed} done, {stage.failed} failed, "
+                         f"{average:.1f}s average, {stage.workers} worker(s) {utilisation:.0f}% busy")
+        if self.elapsed and self.finished:
+            lines.append(f"  throughput  {len(self.finished) / self.elapsed * 3600:.1f} item(s)/hour")
+        return "\n".join(lines)
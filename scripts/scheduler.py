@@ -0,0 +1,342 @@
+import os
+import time
+import random
+import threading
+import contextlib
+from email.utils import parsedate_to_datetime
+from batching import estimate_tokens
+
+# Responses that are retried: rate limited, overloaded and transient server errors
+RETRY_STATUSES = (408, 409, 429, 500, 502, 503, 504, 529)
+# Errors without a status that are retried: the SDK's network errors, and the httpx
+# errors it lets through when a response body breaks off while it is being read
+RETRY_ERRORS = ("APIConnectionError", "APITimeoutError", "TransportError")
+# Attempts of one request before its error is raised
+MAX_ATTEMPTS = 8
+# Exponential backoff without retry-after: 1s, 2s, 4s ... up to MAX_BACKOFF, with full jitter
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+# Header prefix and environment variable of each limit, e.g. anthropic-ratelimit-input-tokens-remaining.
+# The environment variables give the limits to use before the first response reports them.
+LIMITS = {
+    "requests": "CLAUDE_REQUESTS_PER_MINUTE",
+    "input-tokens": "CLAUDE_INPUT_TOKENS_PER_MINUTE",
+    "output-tokens": "CLAUDE_OUTPUT_TOKENS_PER_MINUTE",
+}
+
+class TokenBucket:
+    """
+    Budget of one per-minute limit, refilled continuously
+
+    The bucket holds at most limit tokens and refills limit / 60 per
+    second, like the API's own token bucket. Without a known limit it
+    never holds anything back.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.tokens = float(limit or 0)
+        self._updated = time.monotonic()
+
+    def refill(self, now):
+        if self.limit:
+            self.tokens = min(self.limit, self.tokens + (now - self._updated) * self.limit / 60)
+        self._updated = now
+
+    def wait_time(self, amount):
+        # A request larger than the whole budget waits for a full bucket
+        if not self.limit:
+            return 0.0
+        amount = min(amount, self.limit)
+        return max(0.0, (amount - self.tokens) * 60 / self.limit)
+
+    def take(self, amount):
+        if self.limit:
+            self.tokens -= amount
+
+    def set_limit(self, limit, remaining, now):
+        self.refill(now)
+        if limit and limit != self.limit:
+            self.tokens = self.tokens if self.limit else float(limit)
+            self.limit = limit
+        if remaining is not None and self.limit:
+            # Other processes on the same account use the same budget
+            self.tokens = min(self.tokens, remaining)
+
+def _header_number(headers, name):
+    value = headers.get(name) if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def retry_after(headers):
+    """
+    Seconds to wait from a retry-after-ms or retry-after header, or None
+    """
+    milliseconds = _header_number(headers, "retry-after-ms")
+    if milliseconds is not None:
+        return milliseconds / 1000
+    value = headers.get("retry-after") if headers is not None else None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def estimate_request(params):
+    """
+    Estimate the input and output tokens of a Messages request
+
+    The output of a translation is about as long as its input batch.
+    """
+    system_text = "".join(block["text"] for block in params.get("system") or [])
+    content = params["messages"][-1]["content"]
+    payload = content if isinstance(content, str) else content[-1]["text"]
+    input_tokens = estimate_tokens(system_text) + sum(
+        estimate_tokens(message["content"] if isinstance(message["content"], str)
+                        else "".join(block.get("text", "") for block in message["content"]))
+        for message in params["messages"])
+    return input_tokens, min(estimate_tokens(payload), params.get("max_tokens") or estimate_tokens(payload))
+
+def is_retryable(error):
+    """
+    Whether error is temporary: rate limited, overloaded, a server error or a network problem
+    """
+    if getattr(error, "status_code", None) in RETRY_STATUSES or isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in RETRY_ERRORS for cls in type(error).__mro__)
+
+class RequestScheduler:
+    """
+    Paces Messages requests to the account's per-minute limits
+
+    Every request first takes its estimated input and output tokens and one
+    request from token buckets shared by all threads, and waits while any
+    bucket is short. The limits and remaining budgets are updated from the
+    anthropic-ratelimit-* headers of each response, and the estimate is
+    replaced by the actual usage. A 429 or 529 pauses every request for the
+    retry-after time plus jitter before the request is tried again.
+    """
+
+    def __init__(self, requests_per_minute=None, input_tokens_per_minute=None, output_tokens_per_minute=None):
+        self.buckets = {
+            "requests": TokenBucket(requests_per_minute),
+            "input-tokens": TokenBucket(input_tokens_per_minute),
+            "output-tokens": TokenBucket(output_tokens_per_minute),
+        }
+        self.requests = 0
+        self.waited_seconds = 0.0
+        self.retries = {}
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls):
+        limits = [os.environ.get(variable) for variable in LIMITS.values()]
+        return cls(*(int(limit) if limit else None for limit in limits))
+
+    def acquire(self, input_tokens, output_tokens):
+        """
+        Wait until the request fits all budgets and take it from them
+        """
+        amounts = {"requests": 1, "input-tokens": input_tokens, "output-tokens": output_tokens}
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                for bucket in self.buckets.values():
+                    bucket.refill(now)
+                wait = max([self._paused_until - now] +
+                           [bucket.wait_time(amounts[name]) for name, bucket in self.buckets.items()])
+                if wait <= 0:
+                    for name, bucket in self.buckets.items():
+                        bucket.take(amounts[name])
+                    self.requests += 1
+                    self.waited_seconds += now - started
+                    return
+            # Re-checked after sleeping, as other threads may have taken the budget meanwhile
+            time.sleep(min(wait, 5.0) + random.uniform(0, 0.05))
+
+    def release(self, input_tokens, output_tokens):
+        # A rejected request used no budget
+        with self._lock:
+            for name, amount in (("requests", 1), ("input-tokens", input_tokens), ("output-tokens", output_tokens)):
+                bucket = self.buckets[name]
+                if bucket.limit:
+                    bucket.tokens = min(bucket.limit, bucket.tokens + amount)
+
+    def settle(self, estimate, usage, output_only=False):
+        """
+        Replace the estimated tokens of a finished request by its actual usage
+
+        Args:
+            estimate (tuple): (input, output) tokens taken by acquire()
+            usage: Usage of the response, or None
+            output_only (bool): Settle only the output tokens, when response
+                headers have already reported the input tokens charged
+        """
+        if usage is None:
+            return
+        actual = ((getattr(usage, "input_tokens", None) or 0) + (getattr(usage, "cache_creation_input_tokens", None) or 0),
+                  getattr(usage, "output_tokens", None) or 0)
+        settled = list(zip(("input-tokens", "output-tokens"), estimate, actual))
+        with self._lock:
+            for name, estimated, used in settled[1:] if output_only else settled:
+                self.buckets[name].take(used - estimated)
+
+    def update(self, headers):
+        """
+        Adopt the limits and remaining budgets reported by the API
+
+        Returns:
+            bool: Whether headers reported any remaining budget
+        """
+        if headers is None:
+            return False
+        reported = False
+        with self._lock:
+            now = time.monotonic()
+            for name, bucket in self.buckets.items():
+                limit = _header_number(headers, f"anthropic-ratelimit-{name}-limit")
+                remaining = _header_number(headers, f"anthropic-ratelimit-{name}-remaining")
+                bucket.set_limit(int(limit) if limit else None, remaining, now)
+                reported = reported or remaining is not None
+        return reported
+
+    def backoff(self, error, attempt):
+        """
+        Return the seconds to wait before retrying after error, or None if it is not retried
+
+        Rate limit and overload errors pause every request of the scheduler.
+        """
+        if not is_retryable(error):
+            return None
+        status = getattr(error, "status_code", None)
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        self.update(headers)
+        delay = retry_after(headers)
+        if delay is None:
+            delay = random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (attempt - 1)))
+        else:
+            # Spread the retries of waiting threads instead of sending them at the same moment
+            delay += random.uniform(0, max(1.0, delay * 0.25))
+        with self._lock:
+            key = str(status or type(error).__name__)
+            self.retries[key] = self.retries.get(key, 0) + 1
+            if status in (429, 529):
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    def call(self, function, estimate):
+        """
+        Run function (one Messages request) within the budgets, retrying it on rate limit and server errors
+
+        Returns:
+            The result of function
+        """
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self.acquire(*estimate)
+            try:
+                return function()
+            except Exception as e:
+                self.release(*estimate)
+                delay = self.backoff(e, attempt)
+                if delay is None or attempt == MAX_ATTEMPTS:
+                    raise
+                print(f"Request failed ({getattr(e, 'status_code', None) or type(e).__name__}), "
+                      f"retrying in {delay:.1f}s (attempt {attempt + 1} of {MAX_ATTEMPTS})")
+                time.sleep(delay)
+
+    def summary(self):
+        retries = ", ".join(f"{count} after {reason}" for reason, count in sorted(self.retries.items())) or "none"
+        limits = ", ".join(f"{bucket.limit} {name}/min" for name, bucket in self.buckets.items() if bucket.limit)
+        return (f"Rate limits: {self.requests} request(s) scheduled, {self.waited_seconds:.1f}s spent waiting for "
+                f"budget, retries: {retries}" + (f" (limits {limits})" if limits else ""))
+
+class _ScheduledStream:
+    # Settles the reserved tokens with the usage of the finished stream
+    def __init__(self, stream, scheduler, estimate, output_only=False):
+        self._stream = stream
+        self._scheduler = scheduler
+        self._estimate = estimate
+        self._output_only = output_only
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def get_final_message(self):
+        message = self._stream.get_final_message()
+        self._scheduler.settle(self._estimate, getattr(message, "usage", None), self._output_only)
+        return message
+
+class ScheduledMessages:
+    """
+    client.messages with create() and stream() passed through a RequestScheduler
+
+    Everything else (e.g. the Message Batches API) is used unchanged.
+    """
+
+    def __init__(self, messages, scheduled_messages, scheduler):
+        self._messages = messages
+        self._scheduled = scheduled_messages
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+        return getattr(self._messages, name)
+
+    def create(self, **params):
+        estimate = estimate_request(params)
+
+        def send():
+            raw_messages = getattr(self._scheduled, "with_raw_response", None)
+            if raw_messages is None:
+                return self._scheduled.create(**params), None
+            response = raw_messages.create(**params)
+            return response.parse(), response.headers
+
+        message, headers = self.scheduler.call(send, estimate)
+        # Settled first: the remaining budgets in the headers already include this request's usage
+        self.scheduler.settle(estimate, getattr(message, "usage", None))
+        self.scheduler.update(headers)
+        return message
+
+    @contextlib.contextmanager
+    def stream(self, **params):
+        estimate = estimate_request(params)
+
+        def start():
+            manager = self._scheduled.stream(**params)
+            return manager, manager.__enter__()
+
+        # Only opening the stream is retried; a stream that breaks later is handled by the caller
+        manager, stream = self.scheduler.call(start, estimate)
+        # Headers arrive before the output is generated, so they only cover the input tokens
+        reported = self.scheduler.update(getattr(getattr(stream, "response", None), "headers", None))
+        with contextlib.ExitStack() as stack:
+            stack.push(manager)
+            yield _ScheduledStream(stream, self.scheduler, estimate, output_only=reported)
+
+class ScheduledClient:
+    """
+    Anthropic client whose Messages requests share one RequestScheduler
+
+    The scheduler does the retrying of create() and stream(), so those use
+    a copy of the client with the SDK's own retries turned off.
+    """
+
+    def __init__(self, client, scheduler):
+        self._client = client
+        self.scheduler = scheduler
+        scheduled = client.with_options(max_retries=0) if hasattr(client, "with_options") else client
+        self.messages = ScheduledMessages(client.messages, scheduled.messages, scheduler)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
@@ -0,0 +1,130 @@
+import os
+import json
+import hashlib
+from difflib import SequenceMatcher
+from subtitles import Cue
+
+# Cues on each side of an edited cue that are re-translated with it, so the
+# new wording reads well in the sentence around it
+DEFAULT_CONTEXT_CUES = 1
+
+def text_hash(text):
+    # Whitespace and line breaks inside a cue do not change its translation
+    return hashlib.sha256(" ".join(text.split()).encode('utf-8')).hexdigest()[:16]
+
+def fingerprint_path(target_srt_file):
+    return f"{target_srt_file}.source.json"
+
+def save_fingerprint(target_srt_file, source_cues):
+    """
+    Record the source cues a translation was made from next to the target file
+
+    Only the number, timing and a hash of the text of every cue are kept,
+    which is enough to tell later which cues of an edited source changed.
+    """
+    path = fingerprint_path(target_srt_file)
+    fingerprint = {"cues": [[cue.index, cue.start, cue.end, text_hash(cue.text)] for cue in source_cues]}
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        json.dump(fingerprint, file, separators=(',', ':'))
+    os.replace(temporary_path, path)
+
+def load_fingerprint(target_srt_file):
+    """
+    Returns:
+        list: (index, start, end, text hash) per source cue, or None when the
+              translation has no fingerprint
+    """
+    path = fingerprint_path(target_srt_file)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as file:
+        return [tuple(entry) for entry in json.load(file)["cues"]]
+
+class SourceDiff:
+    """
+    Cue-aligned comparison of an edited source with the fingerprint of a translation
+
+    Cues are aligned by the hash of their text, so inserted, removed and
+    renumbered cues do not shift the rest. A cue whose text is unchanged
+    keeps its translation, with the new number and timing taken from the
+    source. Every other cue is translated again together with the context
+    cues around it.
+    """
+
+    def __init__(self, fingerprint, source_cues, target_cues, context=DEFAULT_CONTEXT_CUES):
+        # Target cues are found by the number and timing their source cue had when translated
+        targets = {(cue.index, cue.start, cue.end): cue.text for cue in target_cues}
+        matcher = SequenceMatcher(None, [entry[3] for entry in fingerprint],
+                                  [text_hash(cue.text) for cue in source_cues], autojunk=False)
+        self.source_cues = source_cues
+        # Source position -> existing translation
+        self.kept = {}
+        changed = set()
+        # Positions next to removed cues, whose sentences may have lost a part
+        removed_at = []
+        self.retimed = 0
+        self.renumbered = 0
+        self.removed = 0
+        self.missing = 0
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+            if tag != 'equal':
+                changed.update(range(new_start, new_end))
+                self.removed += max(0, (old_end - old_start) - (new_end - new_start))
+                if tag == 'delete':
+                    removed_at.append(new_start)
+                continue
+            for position, (index, start, end, _) in zip(range(new_start, new_end), fingerprint[old_start:old_end]):
+                text = targets.get((index, start, end))
+                if text is None:
+                    # The target cue was merged, split or retimed by hand
+                    self.missing += 1
+                    changed.add(position)
+                    continue
+                self.kept[position] = text
+                cue = source_cues[position]
+                self.retimed += (cue.start, cue.end) != (start, end)
+                self.renumbered += cue.index != index
+        self.changed = len(changed) - self.missing
+
+        # Source positions translated again: the changed cues and their neighbours
+        retranslate = set()
+        for position in changed:
+            retranslate.update(range(max(0, position - context), min(len(source_cues), position + context + 1)))
+        for position in removed_at:
+            retranslate.update(range(max(0, position - context), min(len(source_cues), position + context)))
+        self.retranslate = sorted(retranslate)
+        self.context = len(retranslate) - len(changed)
+
+    def is_current(self):
+        # The source is the one translated: nothing to translate or patch
+        return not (self.retranslate or self.removed or self.retimed or self.renumbered)
+
+    def retranslate_cues(self):
+        """
+        The source cues to translate again, numbered by their position
+
+        Source numbers are not necessarily unique after editing, positions are.
+        """
+        return [Cue(position + 1, self.source_cues[position].start, self.source_cues[position].end,
+                    self.source_cues[position].text) for position in self.retranslate]
+
+    def patch(self, translations):
+        """
+        Build the updated target cues
+
+        Args:
+            translations (dict): Position + 1 -> text for every cue of retranslate_cues()
+
+        Returns:
+            list: Cue objects with the numbers and timings of the edited source
+        """
+        # Context cues are kept translations too; their new translation wins
+        return [Cue(cue.index, cue.start, cue.end, translations.get(position + 1, self.kept.get(position)))
+                for position, cue in enumerate(self.source_cues)]
+
+    def summary(self):
+        return (f"Source changes: {self.changed} cue(s) edited or inserted, {self.removed} removed, "
+                f"{self.retimed} retimed, {self.renumbered} renumbered; {len(self.retranslate)} cue(s) to translate "
+                f"({self.context} for context, {self.missing} no longer in the target), "
+                f"{len(self.source_cues) - len(self.retranslate)} kept")
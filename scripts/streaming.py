@@ -0,0 +1,122 @@
+import os
+import re
+import json
+import time
+import threading
+from subtitles import Cue, TIMING_PATTERN, format_timestamp, parse_srt
+
+# One complete '"12": "text"' entry of a text-only response
+TEXT_ENTRY_PATTERN = re.compile(r'"(\d+)"\s*:\s*("(?:[^"\\]|\\.)*")\s*[,}]')
+
+# Seconds between live progress lines
+PROGRESS_INTERVAL = 2.0
+
+def partial_srt_path(target_srt_file):
+    # Still ends in .srt so it opens in subtitle editors while translation runs
+    base, extension = os.path.splitext(target_srt_file)
+    return f"{base}.partial{extension}"
+
+def complete_cues(text, cues):
+    """
+    Parse the cues in a streamed response prefix that can no longer change
+
+    An SRT cue is complete once the next cue's timing line has arrived; a
+    text-only entry is complete once its closing quote and separator have
+    arrived.
+
+    Args:
+        text (str): Response text received since the last complete cue
+        cues (list): Source Cue objects of the batch
+
+    Returns:
+        tuple: (translated cues, number of characters of text consumed)
+    """
+    timings = list(TIMING_PATTERN.finditer(text))
+    if timings:
+        if len(timings) < 2:
+            return [], 0
+        # Everything before the number line of the last cue is complete
+        last = timings[-1].start()
+        number_start = text.rfind('\n', 0, max(last - 1, 0)) + 1
+        if not text[number_start:last].strip().isdigit():
+            number_start = last
+        return parse_srt(text[:number_start]), number_start
+
+    sources = {str(cue.index): cue for cue in cues}
+    translated = []
+    consumed = 0
+    for match in TEXT_ENTRY_PATTERN.finditer(text):
+        source = sources.get(match.group(1))
+        consumed = match.end()
+        if source is None:
+            continue
+        try:
+            translated.append(Cue(source.index, source.start, source.end, json.loads(match.group(2)).strip()))
+        except json.JSONDecodeError:
+            continue
+    return translated, consumed
+
+def remaining_cues(text, cues):
+    """
+    Parse whatever is left of a finished streamed response
+    """
+    translated = parse_srt(text)
+    if translated:
+        return translated
+    # The separator lets the last text-only entry match
+    return complete_cues(text + ",", cues)[0]
+
+class OrderedCueWriter:
+    """
+    Append translated cues to a partial SRT file in source order
+
+    Batches finish out of order and cues inside a batch may be retried, so
+    cues are written only once every cue before them has been accepted.
+    Shared by all worker threads of a run.
+    """
+
+    def __init__(self, path, batches, label=""):
+        self.path = path
+        self.prefix = f"[{label}] " if label else ""
+        # Source order is cue number order, whichever batch a cue was put in
+        self._order = sorted(((batch_index, cue) for batch_index, cues in enumerate(batches) for cue in cues),
+                             key=lambda item: item[1].index)
+        self._accepted = {}
+        self._position = 0
+        self._started = time.monotonic()
+        self._last_report = self._started
+        self._lock = threading.Lock()
+        # Start from an empty file; resumed batches are accepted again
+        open(self.path, 'w', encoding='utf-8').close()
+
+    def accept(self, batch_index, cue_index, text):
+        with self._lock:
+            self._accepted.setdefault((batch_index, cue_index), text)
+            self._advance()
+
+    def accept_batch(self, batch_index, translation):
+        with self._lock:
+            for cue in parse_srt(translation):
+                self._accepted.setdefault((batch_index, cue.index), cue.text)
+            self._advance()
+
+    def _advance(self):
+        blocks = []
+        while self._position < len(self._order):
+            batch_index, cue = self._order[self._position]
+            text = self._accepted.get((batch_index, cue.index))
+            if text is None:
+                break
+            blocks.append(f"{cue.index}\n{format_timestamp(cue.start)} --> {format_timestamp(cue.end)}\n{text}\n\n")
+            self._position += 1
+        if not blocks:
+            return
+
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write("".join(blocks))
+
+        now = time.monotonic()
+        if now - self._last_report >= PROGRESS_INTERVAL or self._position == len(self._order):
+            self._last_report = now
+            rate = self._position / max(now - self._started, 1e-6)
+            print(f"{self.prefix}{self._position}/{len(self._order)} cues written to {self.path} ({rate:.1f} cues/s)")
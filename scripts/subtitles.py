@@ -0,0 +1,271 @@
+import os
+import re
+import json
+
+# A timing line, e.g. "00:00:01,234 --> 00:00:03,456"
+TIMING_PATTERN = re.compile(
+    r'^[ \t]*(\d+):(\d{2}):(\d{2})[,.](\d{1,3})[ \t]*-->[ \t]*(\d+):(\d{2}):(\d{2})[,.](\d{1,3})[^\n]*$',
+    re.MULTILINE
+)
+# The start of a block: an optional number line followed by the start of a timing line
+BLOCK_START_PATTERN = re.compile(r'^(?:[ \t]*\d+[ \t]*\n)?[ \t]*\d+:\d{2}:\d{2}[,.]\d{1,3}[ \t]*-->', re.MULTILINE)
+# A timing line exactly as format_srt writes it, which normalize_srt can copy unchanged
+CANONICAL_TIMING = re.compile(r'\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3}')
+
+# Endings after which a cue at a chunk boundary is taken to finish its sentence
+SENTENCE_ENDINGS = ('.', '?', '!', '…', '"', '”', ')')
+
+class Cue:
+    """
+    One subtitle block. Start and end are integer milliseconds.
+    """
+    __slots__ = ('index', 'start', 'end', 'text')
+
+    def __init__(self, index, start, end, text):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def __repr__(self):
+        return f"Cue({self.index}, {format_timestamp(self.start)} --> {format_timestamp(self.end)}, {self.text!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Cue):
+            return NotImplemented
+        return (self.index, self.start, self.end, self.text) == (other.index, other.start, other.end, other.text)
+
+def parse_timestamp(hours, minutes, seconds, millis):
+    # "5" and "50" in the millisecond field mean 500 ms, like "500"
+    if len(millis) < 3:
+        millis = millis.ljust(3, '0')
+    return int(hours) * 3600000 + int(minutes) * 60000 + int(seconds) * 1000 + int(millis)
+
+def format_timestamp(ms):
+    return '%02d:%02d:%02d,%03d' % (ms // 3600000, ms // 60000 % 60, ms // 1000 % 60, ms % 1000)
+
+def _blocks(srt_content):
+    """
+    Yield (number, timing match, text) for every block of srt_content
+
+    Timing lines are located with one regex scan and the text between two
+    timing lines is split into the previous block's text and the next
+    block's number (None when it is missing). The timing match refers to
+    the cleaned content, not to srt_content.
+    """
+    content = srt_content.lstrip('\ufeff')
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+
+    position = 0
+    previous = None
+    number = None
+    for match in TIMING_PATTERN.finditer(content):
+        text, next_number = _split_block(content[position:match.start()])
+        if previous is not None:
+            yield number, previous, text
+        number = next_number
+        previous = match
+        position = match.end()
+    if previous is not None:
+        yield number, previous, _split_block(content[position:], trailing_number=False)[0]
+
+def parse_srt(srt_content):
+    """
+    Parse SRT text into cues in a single pass
+
+    The parser is tolerant of the defects we see in transcripts and model
+    output: CRLF line endings, a byte order mark, missing or repeated blank
+    lines between blocks, "." instead of "," in timestamps and missing cue
+    numbers. Anything before the first timing line other than its number
+    is ignored.
+
+    Args:
+        srt_content (str): SRT text
+
+    Returns:
+        list: Cue objects in file order
+    """
+    cues = []
+    for number, match, text in _blocks(srt_content):
+        hours, minutes, seconds, millis, end_hours, end_minutes, end_seconds, end_millis = match.groups()
+        # parse_timestamp inlined; this loop runs once per cue
+        if len(millis) < 3:
+            millis = millis.ljust(3, '0')
+        if len(end_millis) < 3:
+            end_millis = end_millis.ljust(3, '0')
+        cues.append(Cue(int(number) if number is not None else len(cues) + 1,
+                        int(hours) * 3600000 + int(minutes) * 60000 + int(seconds) * 1000 + int(millis),
+                        int(end_hours) * 3600000 + int(end_minutes) * 60000 + int(end_seconds) * 1000 + int(end_millis),
+                        text))
+    return cues
+
+def _split_block(block, trailing_number=True):
+    """
+    Split the text between two timing lines into (cue text, next cue number)
+    """
+    block = block.strip()
+    number = None
+    if trailing_number:
+        head, _, last = block.rpartition('\n')
+        if last.isdigit():
+            number = last
+            block = head.rstrip()
+    # Fast path: one line of text, or lines without blank lines or trailing spaces
+    if '\n' in block and ('\n\n' in block or ' \n' in block or '\t\n' in block):
+        block = "\n".join(line.rstrip() for line in block.split('\n') if line.strip())
+    return block, number
+
+def block_starts(srt_content):
+    """
+    Offsets in srt_content where each block (its number, or its timing line) starts
+
+    Lets callers slice the text into groups of blocks without parsing the cues.
+    """
+    return [match.start() for match in BLOCK_START_PATTERN.finditer(srt_content)]
+
+def format_srt(cues, renumber=False):
+    """
+    Serialize cues as normalized SRT: one blank line between blocks and a
+    single trailing newline
+
+    Args:
+        cues (list): Cue objects
+        renumber (bool): Number the cues 1..n instead of keeping their index
+
+    Returns:
+        str: SRT text
+    """
+    if not cues:
+        return ""
+    blocks = []
+    for position, cue in enumerate(cues, 1):
+        number = position if renumber else cue.index
+        blocks.append(f"{number}\n{format_timestamp(cue.start)} --> {format_timestamp(cue.end)}\n{cue.text}")
+    return "\n\n".join(blocks) + "\n"
+
+def format_text_payload(cues):
+    """
+    Serialize only the text of cues as a JSON object keyed by cue number
+
+    Used by the text-only translation mode; timings stay local and are
+    reattached by parse_text_payload.
+    """
+    return json.dumps({str(cue.index): cue.text for cue in cues}, ensure_ascii=False, indent=0)
+
+def parse_text_payload(response_text, cues):
+    """
+    Rebuild cues from a JSON object of translated text keyed by cue number
+
+    Args:
+        response_text (str): Model output, possibly wrapped in extra text
+        cues (list): Source Cue objects whose timings are reattached
+
+    Returns:
+        list: Cue objects for every number present in the response with
+              string text; empty when the response is not valid JSON
+    """
+    start = response_text.find('{')
+    end = response_text.rfind('}')
+    if start == -1 or end < start:
+        return []
+    try:
+        translated = json.loads(response_text[start:end + 1])
+    except json.JSONDecodeError:
+        return []
+    if not isinstance(translated, dict):
+        return []
+
+    result = []
+    for cue in cues:
+        text = translated.get(str(cue.index))
+        if isinstance(text, str):
+            result.append(Cue(cue.index, cue.start, cue.end, text.strip()))
+    return result
+
+def stitch_srt(parts, max_merged_chars=200):
+    """
+    Join the SRTs of consecutive audio chunks into one list of cues
+
+    Timestamps are shifted by each chunk's offset and cues are renumbered.
+    When the last cue of a chunk does not end its sentence, it is merged with
+    the first cue of the next chunk so the sentence is not split in two.
+
+    Args:
+        parts (list): (offset in ms, SRT text) per chunk, in order
+        max_merged_chars (int): Longest text a merged cue may have
+
+    Returns:
+        list: Cue objects numbered 1..n
+    """
+    cues = []
+    for offset, srt_content in parts:
+        shifted = [Cue(0, cue.start + offset, cue.end + offset, cue.text) for cue in parse_srt(srt_content)]
+        if cues and shifted:
+            last, first = cues[-1], shifted[0]
+            merged_text = " ".join(f"{last.text} {first.text}".split())
+            if not last.text.rstrip().endswith(SENTENCE_ENDINGS) and len(merged_text) <= max_merged_chars:
+                cues[-1] = Cue(0, last.start, first.end, merged_text)
+                shifted.pop(0)
+            # The next chunk cannot start before the previous one ends
+            if shifted and shifted[0].start < cues[-1].end:
+                shifted[0].start = cues[-1].end
+                shifted[0].end = max(shifted[0].end, shifted[0].start)
+        cues += shifted
+    for number, cue in enumerate(cues, 1):
+        cue.index = number
+    return cues
+
+def normalize_srt(srt_content):
+    """
+    Return srt_content in normalized form, or stripped as-is if it has no cues
+
+    Gives the same text as format_srt(parse_srt(srt_content)) without
+    building cues: timing lines already in the written form are copied.
+    """
+    blocks = []
+    for number, match, text in _blocks(srt_content):
+        timing = match.group(0)
+        if not CANONICAL_TIMING.fullmatch(timing):
+            hours, minutes, seconds, millis, end_hours, end_minutes, end_seconds, end_millis = match.groups()
+            timing = (f"{format_timestamp(parse_timestamp(hours, minutes, seconds, millis))} --> "
+                      f"{format_timestamp(parse_timestamp(end_hours, end_minutes, end_seconds, end_millis))}")
+        if number is None:
+            number = len(blocks) + 1
+        elif number[0] == '0':
+            number = int(number)
+        blocks.append(f"{number}\n{timing}\n{text}")
+    if not blocks:
+        return srt_content.strip() + "\n"
+    return "\n\n".join(blocks) + "\n"
+
+def read_cues(srt_path):
+    with open(srt_path, 'r', encoding='utf-8') as file:
+        return parse_srt(file.read())
+
+def write_srt(srt_path, srt_content):
+    """
+    Write SRT text to srt_path in normalized form
+
+    The file is written under a temporary name and renamed into place, so an
+    interrupted write never leaves a partial file at srt_path.
+    """
+    temporary_path = f"{srt_path}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        file.write(normalize_srt(srt_content))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, srt_path)
+
+def normalize_line_breaks(srt_path):
+    with open(srt_path, 'r', encoding='utf-8') as file:
+        content = file.read()
+
+    fixed_content = normalize_srt(content)
+
+    # Leave files that are already normalized untouched
+    if fixed_content != content:
+        with open(srt_path, 'w', encoding='utf-8') as file:
+            file.write(fixed_content)
+
+    print(f"Normalized line breaks in: {srt_path}")
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import threading
+import contextlib
+
+# List prices in USD per million tokens; update when the pricing changes
+MODEL_PRICES = {
+    "claude-3-7-sonnet-20250219": {"input_tokens": 3.00, "output_tokens": 15.00,
+                                   "cache_creation_input_tokens": 3.75, "cache_read_input_tokens": 0.30},
+}
+# AssemblyAI list price in USD per hour of audio
+ASSEMBLYAI_PRICE_PER_HOUR = 0.37
+
+# cProfile and tracemalloc output of --profile, one directory per run
+PROFILE_DIR = os.path.join(".cache", "profile")
+# Functions listed per profiled block in the JSON Lines event
+PROFILE_TOP_FUNCTIONS = 10
+
+def message_cost(model, usage):
+    """
+    Estimated price of the tokens in usage (a Messages usage object or UsageStats)
+    """
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return 0.0
+    return sum((getattr(usage, field, None) or 0) * price for field, price in prices.items()) / 1e6
+
+def transcription_cost(audio_seconds):
+    return (audio_seconds or 0) / 3600 * ASSEMBLYAI_PRICE_PER_HOUR
+
+# Metric name, help text and the event fields that become labels, per event and field
+METRICS = {
+    "stage": {"seconds": ("stage_seconds_total", "Wall time of pipeline stages", ("stage", "status"))},
+    "download": {"bytes": ("transferred_bytes_total", "Bytes downloaded and uploaded", ("event",))},
+    "upload": {"bytes": ("transferred_bytes_total", "Bytes downloaded and uploaded", ("event",)),
+               "seconds": ("upload_seconds_total", "Wall time of uploads to AssemblyAI", ())},
+    "transcription": {"seconds": ("transcription_wait_seconds_total", "Time waited for AssemblyAI transcripts", ()),
+                      "audio_seconds": ("transcribed_audio_seconds_total", "Seconds of audio transcribed", ()),
+                      "cost": ("cost_dollars_total", "Estimated cost in USD", ("service",))},
+    "message": {"seconds": ("request_seconds_total", "Wall time of Messages requests", ("label",)),
+                "input_tokens": ("tokens_total", "Tokens used by Messages requests", ("label", "type")),
+                "output_tokens": ("tokens_total", "Tokens used by Messages requests", ("label", "type")),
+                "cache_creation_input_tokens": ("tokens_total", "Tokens used by Messages requests", ("label", "type")),
+                "cache_read_input_tokens": ("tokens_total", "Tokens used by Messages requests", ("label", "type")),
+                "cost": ("cost_dollars_total", "Estimated cost in USD", ("service",))},
+    "batch": {"seconds": ("batch_seconds_total", "Wall time of translated batches", ("label", "status")),
+              "retries": ("batch_retries_total", "Batch attempts after the first", ("label",))},
+    "translation": {"retried_cues": ("retried_cues_total", "Cues re-translated after failing validation", ("label",))},
+}
+# Events counted per metric labels in addition to their fields
+COUNTERS = {
+    "stage": ("stage_items_total", "Items handled by pipeline stages", ("stage", "status")),
+    "message": ("requests_total", "Messages requests", ("label",)),
+    "batch": ("batches_total", "Translated batches", ("label", "status")),
+}
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Telemetry:
+    """
+    Structured events of a run, written as JSON Lines as they happen
+
+    Every event is also summed into counters that close() writes as a
+    Prometheus textfile. With a profile directory, profile() blocks are run
+    under cProfile and tracemalloc. Safe to share between threads.
+    """
+
+    def __init__(self, path=None, prometheus_path=None, profile_dir=None):
+        self.path = path
+        self.prometheus_path = prometheus_path
+        self.profile_dir = profile_dir
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._profile_lock = threading.Lock()
+        self._profiles = 0
+        self._metrics = {}
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, 'a', encoding='utf-8')
+        if profile_dir:
+            import tracemalloc
+            os.makedirs(profile_dir, exist_ok=True)
+            tracemalloc.start()
+
+    def record(self, event, **fields):
+        """
+        Record one event, e.g. record("upload", bytes=1200000, seconds=3.2)
+        """
+        line = json.dumps({"time": round(time.time(), 3), "event": event, **fields}, ensure_ascii=False)
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line + "\n")
+                self._file.flush()
+            for field, (name, help_text, labels) in METRICS.get(event, {}).items():
+                if fields.get(field):
+                    self._add(name, help_text, labels, {"event": event, "type": field, **fields}, fields[field])
+            if event in COUNTERS:
+                self._add(*COUNTERS[event], fields, 1)
+
+    def _add(self, name, help_text, labels, fields, value):
+        key = tuple((label, str(fields.get(label, ""))) for label in labels)
+        metric = self._metrics.setdefault(name, (help_text, {}))
+        metric[1][key] = metric[1].get(key, 0) + value
+
+    @contextlib.contextmanager
+    def profile(self, name, **fields):
+        """
+        Run a block of local processing under cProfile and tracemalloc
+
+        Only one block is profiled at a time; blocks of other threads that
+        start meanwhile run unprofiled. Does nothing without a profile directory.
+        """
+        if not self.profile_dir or not self._profile_lock.acquire(blocking=False):
+            yield
+            return
+        import pstats
+        import cProfile
+        import tracemalloc
+        self._profiles += 1
+        base = os.path.join(self.profile_dir, f"{self._profiles:03d}-{name}")
+        profiler = cProfile.Profile()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        started = time.monotonic()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            seconds = time.monotonic() - started
+            memory_after, memory_peak = tracemalloc.get_traced_memory()
+            profiler.dump_stats(f"{base}.prof")
+            tracemalloc.take_snapshot().dump(f"{base}.tracemalloc")
+            self._profile_lock.release()
+
+            stats = pstats.Stats(profiler)
+            top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+            self.record("profile", name=name, seconds=round(seconds, 4), profile=f"{base}.prof",
+                        snapshot=f"{base}.tracemalloc", memory_growth_bytes=memory_after - memory_before,
+                        memory_peak_bytes=memory_peak,
+                        top=[{"function": f"{path}:{line}({function})", "calls": calls, "cumulative": round(cumulative, 4)}
+                             for (path, line, function), (_, calls, _, cumulative, _) in top],
+                        **fields)
+
+    def cost(self):
+        """
+        Estimated cost recorded so far
+
+        Returns:
+            dict: service -> USD
+        """
+        with self._lock:
+            values = self._metrics.get("cost_dollars_total", (None, {}))[1]
+            return {dict(key)["service"]: value for key, value in values.items()}
+
+    def summary(self):
+        cost = self.cost()
+        parts = ", ".join(f"{service} ${value:.2f}" for service, value in sorted(cost.items()))
+        return f"Estimated cost: ${sum(cost.values()):.2f}" + (f" ({parts})" if parts else "")
+
+    def write_prometheus(self):
+        """
+        Write the counters as a Prometheus textfile, e.g. for the node_exporter textfile collector
+        """
+        lines = []
+        with self._lock:
+            metrics = {name: (help_text, dict(values)) for name, (help_text, values) in self._metrics.items()}
+        metrics["run_started_timestamp_seconds"] = ("Start of the run", {(): self.started})
+        for name, (help_text, values) in sorted(metrics.items()):
+            full_name = f"ai_subtitles_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {'gauge' if name.endswith('timestamp_seconds') else 'counter'}")
+            for key, value in sorted(values.items()):
+                labels = ",".join(f'{label}="{escape_label(value_text)}"' for label, value_text in key if value_text)
+                value = round(value, 6)
+                lines.append(f"{full_name}{{{labels}}} {value}" if labels else f"{full_name} {value}")
+        temporary_path = f"{self.prometheus_path}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(temporary_path, self.prometheus_path)
+
+    def close(self):
+        if self.prometheus_path:
+            self.write_prometheus()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def profiled(telemetry, name, **fields):
+    # profile() of an optional Telemetry
+    return telemetry.profile(name, **fields) if telemetry is not None else contextlib.nullcontext()
@@ -1,42 +1,16 @@
 import sys
 import os
 from dotenv import load_dotenv
-import assemblyai as aai
-import re
+from subtitles import write_srt
+from transcription import transcribe, TranscriptionJobs, TRANSCRIPTION_JOBS_FILE
 
 # Load enviroment variables from .env file
 load_dotenv()
 
-def normalize_line_breaks(srt_path):
-    with open(srt_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    # Ensure exactly one blank line between subtitle blocks
-    fixed_content = re.sub(r'\n{2,}(?=\d+\n\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3})', '\n', content.strip()) + '\n'
-    
-    # Ensure each subtitle text ends with a single blank line before the next block
-    fixed_content = re.sub(r'([^\n])\n(\d+\n\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3})', r'\1\n\n\2', fixed_content)
-    
-    with open(srt_path, 'w', encoding='utf-8') as file:
-        file.write(fixed_content)
-    
-    print(f"Normalized line breaks in: {srt_path}")
-
 def setup_directories(output_dir):
     os.makedirs(output_dir, exist_ok=True)
     return output_dir
 
-def transcribe(media_file):
-    print(f"Transcribing {media_file}...")
-    transcriber = aai.Transcriber()
-    transcript = transcriber.transcribe(media_file)
-
-    srt_content = transcript.export_subtitles_srt()
-    
-    print("Transcription complete")
-
-    return srt_content
-
 def main():
     # python transcriebe.py [origin-media] [language]
     # [language] is optional, default is 'en'
@@ -69,20 +43,9 @@ def main():
         print(f"Media file {media_file} not found")
         return
 
-    assembly_api_key = os.getenv("ASSEMBLY_AI_API_KEY")
-
-    if assembly_api_key is None:
-        print("Assembly AI API Key not found in .env file")
-        return
+    srt_content = transcribe(media_file, TranscriptionJobs(os.path.join(root_dir, TRANSCRIPTION_JOBS_FILE)))
     
-    aai.settings.api_key = assembly_api_key
-
-    srt_content = transcribe(media_file)
-    
-    with open(output_file, 'w', encoding='utf-8') as file:
-        file.write(srt_content)
-
-    normalize_line_breaks(output_file)
+    write_srt(output_file, srt_content)
     
 
 if __name__ == "__main__":
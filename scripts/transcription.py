@@ -0,0 +1,185 @@
+import os
+import sys
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from audio import media_duration, detect_silences, plan_chunks, cut_audio, file_hash
+from subtitles import format_srt, stitch_srt, write_srt
+from telemetry import transcription_cost
+
+# Chunks transcribed at the same time by default
+DEFAULT_CHUNK_WORKERS = 4
+
+# Submitted AssemblyAI transcripts by hash of the uploaded file, until collected
+TRANSCRIPTION_JOBS_FILE = os.path.join(".cache", "transcription-jobs.json")
+
+class TranscriptionError(Exception):
+    pass
+
+class TranscriptionJobs:
+    """
+    Transcript IDs of submitted uploads, saved as soon as they are known
+
+    A re-run after the process was killed finds the ID of an upload that was
+    already submitted and waits for that transcript instead of paying again.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._jobs = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                self._jobs = json.load(file)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(self._jobs, file, indent=2)
+        os.replace(temporary_path, self.path)
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def put(self, key, transcript_id):
+        with self._lock:
+            self._jobs[key] = transcript_id
+            self._save()
+
+    def remove(self, key):
+        with self._lock:
+            if self._jobs.pop(key, None) is not None:
+                self._save()
+
+def load_assemblyai():
+    """
+    Import assemblyai and set the API key from ASSEMBLY_AI_API_KEY
+
+    Returns:
+        module: The configured assemblyai module
+    """
+    import assemblyai as aai
+
+    assembly_api_key = os.getenv("ASSEMBLY_AI_API_KEY")
+    if assembly_api_key is None:
+        print("Assembly AI API Key not found in .env file")
+        sys.exit(1)
+    aai.settings.api_key = assembly_api_key
+    # ASSEMBLY_AI_BASE_URL lets the scripts run against a local fake, e.g. http://127.0.0.1:8000/v2
+    base_url = os.getenv("ASSEMBLY_AI_BASE_URL")
+    if base_url:
+        aai.settings.base_url = base_url
+    return aai
+
+def submit_transcription(upload_file, jobs, telemetry=None):
+    """
+    Upload a file and start its transcription without waiting for it
+
+    Args:
+        upload_file (str): Audio file to transcribe
+        jobs (TranscriptionJobs): Saved transcript IDs
+        telemetry (Telemetry): Optional recorder of an "upload" event
+
+    Returns:
+        str: Job key for collect_transcription
+    """
+    key = file_hash(upload_file)
+    transcript_id = jobs.get(key)
+    if transcript_id:
+        print(f"Re-attaching to transcript {transcript_id} of {upload_file}")
+        return key
+
+    aai = load_assemblyai()
+    print(f"Uploading {upload_file}...")
+    started = time.monotonic()
+    transcript = aai.Transcriber().submit(upload_file)
+    seconds = time.monotonic() - started
+    size = os.path.getsize(upload_file)
+    print(f"Uploaded {size / 1e6:.1f} MB in {seconds:.1f}s, transcript {transcript.id}")
+    jobs.put(key, transcript.id)
+    if telemetry is not None:
+        telemetry.record("upload", file=os.path.basename(upload_file), transcript=transcript.id, bytes=size,
+                         seconds=round(seconds, 3))
+    return key
+
+def collect_transcription(key, jobs, telemetry=None):
+    """
+    Wait for a submitted transcript and return it as SRT
+
+    A failed transcript is forgotten, so the next run submits the file again.
+    With a telemetry, the wait (AssemblyAI queue and processing time), the
+    audio duration and the estimated cost are recorded as a "transcription" event.
+
+    Raises:
+        TranscriptionError: AssemblyAI reported an error
+    """
+    aai = load_assemblyai()
+    transcript_id = jobs.get(key)
+    started = time.monotonic()
+    transcript = aai.Transcript.get_by_id(transcript_id).wait_for_completion()
+    audio_seconds = getattr(transcript, "audio_duration", None) or 0
+    if telemetry is not None:
+        telemetry.record("transcription", transcript=transcript_id, status=str(transcript.status),
+                         seconds=round(time.monotonic() - started, 3), audio_seconds=audio_seconds,
+                         service="assemblyai", cost=round(transcription_cost(audio_seconds), 6))
+    if transcript.status == aai.TranscriptStatus.error:
+        jobs.remove(key)
+        raise TranscriptionError(f"Transcript {transcript_id} failed: {transcript.error}")
+
+    srt_content = transcript.export_subtitles_srt()
+    jobs.remove(key)
+    print(f"Transcript {transcript_id} complete")
+    return srt_content
+
+def transcribe(upload_file, jobs, telemetry=None):
+    return collect_transcription(submit_transcription(upload_file, jobs, telemetry), jobs, telemetry)
+
+def transcribe_chunked(media_file, transcribe_file, chunk_seconds, work_dir, workers=DEFAULT_CHUNK_WORKERS):
+    """
+    Transcribe a long recording as concurrent chunks cut at silences
+
+    Chunks and their SRTs are kept in work_dir under the hash of the media
+    file, so a re-run after a failure only transcribes the missing chunks.
+
+    Args:
+        media_file (str): Downloaded audio or video file
+        transcribe_file (callable): Takes an audio file path and returns its SRT text
+        chunk_seconds (float): Target chunk length in seconds
+        work_dir (str): Directory for chunk files
+        workers (int): Chunks transcribed at the same time
+
+    Returns:
+        str: SRT text of the whole recording with timestamps of the original
+    """
+    duration = media_duration(media_file)
+    if duration is None or duration <= chunk_seconds:
+        return transcribe_file(media_file)
+
+    chunks = plan_chunks(duration, detect_silences(media_file), chunk_seconds)
+    if len(chunks) == 1:
+        return transcribe_file(media_file)
+
+    chunk_dir = os.path.join(work_dir, file_hash(media_file, f"chunks {chunk_seconds}"))
+    print(f"Transcribing {media_file} as {len(chunks)} chunks of about {chunk_seconds / 60:.0f} minutes...")
+
+    def transcribe_chunk(number):
+        start, end = chunks[number]
+        srt_file = os.path.join(chunk_dir, f"{number:03d}.srt")
+        if os.path.exists(srt_file):
+            with open(srt_file, 'r', encoding='utf-8') as file:
+                return file.read()
+        chunk_file = cut_audio(media_file, start, end, os.path.join(chunk_dir, f"{number:03d}.ogg"))
+        srt_content = transcribe_file(chunk_file)
+        write_srt(srt_file, srt_content)
+        print(f"Chunk {number + 1}/{len(chunks)} transcribed ({start:.0f}s-{end:.0f}s)")
+        return srt_content
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        contents = list(executor.map(transcribe_chunk, range(len(chunks))))
+
+    parts = [(int(start * 1000 + 0.5), srt_content) for (start, _), srt_content in zip(chunks, contents)]
+    return format_srt(stitch_srt(parts), renumber=True)
@@ -0,0 +1,305 @@
+import os
+import sys
+import json
+import time
+import argparse
+from dotenv import load_dotenv
+from subtitles import Cue, format_srt, format_text_payload, parse_srt, write_srt
+from translation_config import load_translation_config, find_configured_languages
+from translation_cache import TranslationCache, CACHE_FILE
+from batching import DEFAULT_OUTPUT_BUDGET
+from validation import validate_cues
+from source_diff import save_fingerprint
+from glossary import Glossary
+from translator import (create_client, create_systerm_prompot, message_params, message_text, parse_translation,
+                        plan_batches, batch_key)
+
+# Load enviroment variables from .env file
+load_dotenv()
+
+# Submitted Message Batch jobs that have not been collected yet
+JOBS_FILE = os.path.join(".cache", "backlog-jobs.json")
+# Requests per Message Batch job; larger backlogs are split into several jobs
+MAX_REQUESTS_PER_JOB = 10000
+# Seconds between status checks with --wait
+POLL_INTERVAL = 60
+# Submissions of the same cues before they are reported instead of sent again
+MAX_ATTEMPTS = 4
+
+def load_jobs(jobs_file):
+    """
+    Returns:
+        dict: "jobs" lists the submitted jobs that have not been collected,
+              "requests" maps the custom_id of every unfinished request to
+              its language, batch key, cue numbers (all cues when absent)
+              and attempts
+    """
+    if not os.path.exists(jobs_file):
+        return {"jobs": [], "requests": {}}
+    with open(jobs_file, 'r', encoding='utf-8') as file:
+        state = json.load(file)
+    if isinstance(state, list):
+        # Written before attempts were kept: every job key is a whole batch sent once. Its job's languages
+        # are all scanned while the job is pending, so the first one stands in for the batch's own
+        return {"jobs": state, "requests": {key: {"lang": job["langs"][0], "batch": key, "attempts": 1}
+                                           for job in state for key in job["keys"]}}
+    return state
+
+def save_jobs(jobs_file, state):
+    os.makedirs(os.path.dirname(jobs_file), exist_ok=True)
+    temporary_path = f"{jobs_file}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        json.dump(state, file, indent=2)
+    os.replace(temporary_path, jobs_file)
+
+def accepted_key(key):
+    # Cache entry of the cues of a batch validated so far, while the others are sent again
+    return f"{key}:accepted"
+
+def request_cues(batch, request):
+    if "cues" not in request:
+        return batch["cues"]
+    numbers = set(request["cues"])
+    return [cue for cue in batch["cues"] if cue.index in numbers]
+
+def find_targets(root_dir, target_langs, output_budget, text_only=False):
+    """
+    List every English SRT whose translation is missing for a target language
+
+    Returns:
+        list: dicts with the target file and its batches, each batch carrying
+              the source cues, request payload, glossary note and cache key
+    """
+    source_dir = os.path.join(root_dir, "lang", "en")
+    source_files = sorted(name for name in os.listdir(source_dir) if name.endswith('.srt'))
+
+    targets = []
+    for target_lang in target_langs:
+        translation_config = load_translation_config(os.path.join(root_dir, "lang", target_lang, "config.yaml"))
+        # Batches carry only the glossary entries they use and share their cache keys with translate_srt
+        glossary = None
+        if translation_config.translation_mapping:
+            glossary = Glossary(translation_config.translation_mapping, translation_config.glossary_stems)
+        system_prompt = create_systerm_prompot(translation_config, text_only, include_mapping=glossary is None)
+        for source_file in source_files:
+            media_name = os.path.splitext(source_file)[0]
+            target_srt_file = os.path.join(root_dir, "lang", target_lang, f"{media_name}_{target_lang.upper()}.srt")
+            if os.path.exists(target_srt_file):
+                continue
+            with open(os.path.join(source_dir, source_file), 'r', encoding='utf-8') as file:
+                srt_content = file.read()
+            batches = []
+            for batch in plan_batches(srt_content, translation_config, output_budget, text_only):
+                note = None
+                if glossary is not None:
+                    note = glossary.format_note(glossary.find("\n".join(cue.text for cue in batch.cues)))
+                batches.append({
+                    "cues": batch.cues,
+                    "payload": format_text_payload(batch.cues) if text_only else batch.text,
+                    "note": note,
+                    "key": batch_key(batch.text, system_prompt, note),
+                })
+            targets.append({
+                "lang": target_lang,
+                "file": target_srt_file,
+                "system_prompt": system_prompt,
+                "batches": batches,
+            })
+    return targets
+
+def collect_job(client, job, requests, batches, cache):
+    """
+    Store the validated cues of a finished job in the translation cache
+
+    A batch is cached under its key once all its cues are valid. Until then
+    its valid cues are kept under accepted_key() and the others are queued
+    in requests to be sent again: on their own, or split in half when
+    nothing usable came back, as translate_cues does. Cues that were sent
+    MAX_ATTEMPTS times stay in requests without being queued again.
+
+    Args:
+        requests (dict): Unfinished requests by custom_id, updated in place
+        batches (dict): Batch key -> (target, batch) from find_targets
+
+    Returns:
+        tuple: (stored, rejected) result counts
+    """
+    stored = rejected = 0
+    for entry in client.messages.batches.results(job["id"]):
+        request = requests.get(entry.custom_id)
+        if request is None or request["batch"] not in batches:
+            rejected += 1
+            continue
+        key = request["batch"]
+        target, batch = batches[key]
+        cues = request_cues(batch, request)
+        accepted, missing = {}, cues
+        if entry.result.type == "succeeded":
+            message = entry.result.message
+            accepted, missing = validate_cues(cues, parse_translation(message_text(message), cues),
+                                              message.stop_reason)
+        del requests[entry.custom_id]
+
+        translations = {}
+        if len(cues) < len(batch["cues"]):
+            earlier = cache.get(accepted_key(key))
+            translations = {cue.index: cue.text for cue in parse_srt(earlier)} if earlier else {}
+        translations.update(accepted)
+        translated = [Cue(cue.index, cue.start, cue.end, translations[cue.index])
+                      for cue in batch["cues"] if cue.index in translations]
+        if not missing:
+            stored += 1
+            if len(translated) == len(batch["cues"]):
+                cache.put(key, format_srt(translated))
+            else:
+                cache.put(accepted_key(key), format_srt(translated))
+            continue
+
+        rejected += 1
+        if accepted:
+            cache.put(accepted_key(key), format_srt(translated))
+        if request["attempts"] < MAX_ATTEMPTS and not accepted and len(cues) > 1:
+            middle = len(cues) // 2
+            parts = [cues[:middle], cues[middle:]]
+        else:
+            parts = [missing]
+        for part in parts:
+            requests[batch_key(format_srt(part), target["system_prompt"], batch["note"])] = {
+                "lang": target["lang"], "batch": key, "cues": [cue.index for cue in part],
+                "attempts": request["attempts"]}
+    return stored, rejected
+
+def main():
+    # python translate-backlog.py [target-lang ...] [--all-configured] [--no-submit] [--wait]
+    parser = argparse.ArgumentParser(
+        description="Translate every lang/en/*.srt that is missing a translation using the Message Batches API")
+    parser.add_argument("target_langs", nargs="*", metavar="target-lang", help="Target language codes, e.g. hr sr")
+    parser.add_argument("--all-configured", action="store_true",
+                        help="Use every language that has a lang/<code>/config.yaml")
+    parser.add_argument("--no-submit", action="store_true",
+                        help="Only collect finished jobs and write completed SRT files")
+    parser.add_argument("--wait", action="store_true",
+                        help=f"Keep polling every {POLL_INTERVAL} seconds until all jobs have been collected")
+    parser.add_argument("--text-only", action="store_true",
+                        help="Send only the subtitle text and reattach the original timings locally")
+    parser.add_argument("--output-budget", type=int, default=DEFAULT_OUTPUT_BUDGET,
+                        help=f"Expected output tokens per batch (default: {DEFAULT_OUTPUT_BUDGET})")
+    args = parser.parse_args()
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    root_dir = os.path.abspath(os.path.join(script_dir, ".."))
+
+    target_langs = list(dict.fromkeys(args.target_langs))
+    if args.all_configured:
+        target_langs += [code for code in find_configured_languages(root_dir) if code not in target_langs]
+    if not target_langs:
+        parser.error("at least one target language or --all-configured is required")
+    if 'en' in target_langs:
+        print("Target language cannot be English")
+        return 1
+
+    jobs_file = os.path.join(root_dir, JOBS_FILE)
+    cache = TranslationCache(os.path.join(root_dir, CACHE_FILE))
+    client = create_client()
+
+    # Languages of earlier requests are scanned too, so their results can be validated and their attempts kept
+    state = load_jobs(jobs_file)
+    job_langs = [code for job in state["jobs"] for code in job["langs"] if code not in target_langs] + \
+        [request["lang"] for request in state["requests"].values() if request["lang"] not in target_langs]
+    targets = find_targets(root_dir, target_langs + list(dict.fromkeys(job_langs)), args.output_budget,
+                           args.text_only)
+    batches = {batch["key"]: (target, batch) for target in targets for batch in target["batches"]}
+
+    while True:
+        # Collect finished jobs into the cache
+        state = load_jobs(jobs_file)
+        requests = state["requests"]
+        remaining = []
+        for job in state["jobs"]:
+            status = client.messages.batches.retrieve(job["id"])
+            if status.processing_status != "ended":
+                counts = status.request_counts
+                print(f"Job {job['id']}: {status.processing_status} "
+                      f"({counts.succeeded} succeeded, {counts.processing} processing)")
+                remaining.append(job)
+                continue
+            stored, rejected = collect_job(client, job, requests, batches, cache)
+            print(f"Job {job['id']}: collected {stored} request(s), {rejected} failed or invalid")
+        # Requests of batches no target needs any more, e.g. written by translate-srt.py, are dropped
+        pending_keys = {key for job in remaining for key in job["keys"]}
+        for custom_id in [custom_id for custom_id, request in requests.items()
+                          if request["batch"] not in batches and custom_id not in pending_keys]:
+            del requests[custom_id]
+        state["jobs"] = remaining
+        save_jobs(jobs_file, state)
+
+        # Write every target whose batches are all available
+        requests_by_batch = {}
+        for custom_id, request in requests.items():
+            requests_by_batch.setdefault(request["batch"], []).append(custom_id)
+        to_submit = {}
+        failed = []
+        written = 0
+        for target in targets:
+            if os.path.exists(target["file"]):
+                continue
+            translations = [cache.get(batch["key"]) for batch in target["batches"]]
+            if all(translation is not None for translation in translations):
+                write_srt(target["file"], "\n".join(translations))
+                save_fingerprint(target["file"], [cue for batch in target["batches"] for cue in batch["cues"]])
+                print(f"[{target['lang']}] Written: {target['file']}")
+                written += 1
+                continue
+            if target["lang"] not in target_langs:
+                continue
+            for batch, translation in zip(target["batches"], translations):
+                if translation is not None:
+                    continue
+                if batch["key"] not in requests_by_batch:
+                    requests[batch["key"]] = {"lang": target["lang"], "batch": batch["key"], "attempts": 0}
+                    requests_by_batch[batch["key"]] = [batch["key"]]
+                for custom_id in requests_by_batch[batch["key"]]:
+                    request = requests[custom_id]
+                    if custom_id in pending_keys:
+                        continue
+                    if request["attempts"] >= MAX_ATTEMPTS:
+                        failed.append((target, request_cues(batch, request), request["attempts"]))
+                        continue
+                    payload = batch["payload"]
+                    if "cues" in request:
+                        cues = request_cues(batch, request)
+                        payload = format_text_payload(cues) if args.text_only else format_srt(cues)
+                    to_submit[custom_id] = message_params(payload, target["system_prompt"], batch["note"])
+
+        for target, cues, attempts in failed:
+            numbers = ", ".join(str(cue.index) for cue in cues)
+            print(f"[{target['lang']}] Cue(s) {numbers} of {target['file']} failed validation after {attempts} "
+                  f"attempt(s) and are not submitted again; translate the file with translate-srt.py instead")
+        incomplete = sum(1 for target in targets if not os.path.exists(target["file"]))
+        print(f"{written} file(s) written, {incomplete} waiting, {len(remaining)} job(s) in progress")
+
+        # Submit what is neither cached nor already part of a pending job
+        if to_submit and not args.no_submit:
+            keys = list(to_submit)
+            for start in range(0, len(keys), MAX_REQUESTS_PER_JOB):
+                chunk = keys[start:start + MAX_REQUESTS_PER_JOB]
+                job = client.messages.batches.create(
+                    requests=[{"custom_id": key, "params": to_submit[key]} for key in chunk]
+                )
+                remaining.append({"id": job.id, "created_at": time.time(), "langs": target_langs, "keys": chunk})
+                for key in chunk:
+                    requests[key]["attempts"] += 1
+                # Saved after every job so a crash cannot lead to paying twice
+                save_jobs(jobs_file, state)
+                print(f"Submitted job {job.id} with {len(chunk)} request(s)")
+
+        if not args.wait or not remaining:
+            break
+        time.sleep(POLL_INTERVAL)
+
+    print(cache.summary())
+    cache.close()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
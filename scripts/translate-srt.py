@@ -1,34 +1,23 @@
 import sys
 import os
+import time
 from dotenv import load_dotenv
-import yaml
-import re
-from anthropic import Anthropic
+from subtitles import normalize_line_breaks, parse_srt, write_srt
+import argparse
+from journal import BatchJournal
+from streaming import partial_srt_path
+from source_diff import save_fingerprint
+from translation_config import load_translation_config
+from translation_cache import TranslationCache, CACHE_FILE
+from bible import load_bible_index
+from translation_memory import build_translation_memory
+from batching import print_batch_plan, DEFAULT_OUTPUT_BUDGET
+from translator import translate_srt, plan_batches, TranslationError, DEFAULT_WORKERS
+from telemetry import Telemetry, PROFILE_DIR
 
 # Load enviroment variables from .env file
 load_dotenv()
 
-def split_srt_into_batches(srt_content, batch_size=200):
-    srt_content = srt_content.strip()
-    subtitles = re.split(r'\n(?=\d+\n\d{2}:\d{2}:\d{2},\d{3} -->)', srt_content)
-    batches = [subtitles[i:i + batch_size] for i in range(0, len(subtitles), batch_size)]
-    return ["\n".join(batch) + "\n" for batch in batches]
-
-def normalize_line_breaks(srt_path):
-    with open(srt_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    # Ensure exactly one blank line between subtitle blocks
-    fixed_content = re.sub(r'\n{2,}(?=\d+\n\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3})', '\n', content.strip()) + '\n'
-    
-    # Ensure each subtitle text ends with a single blank line before the next block
-    fixed_content = re.sub(r'([^\n])\n(\d+\n\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3})', r'\1\n\n\2', fixed_content)
-    
-    with open(srt_path, 'w', encoding='utf-8') as file:
-        file.write(fixed_content)
-    
-    print(f"Normalized line breaks in: {srt_path}")
-
 def setup_directories(output_dir):
     os.makedirs(output_dir, exist_ok=True)
     return output_dir
@@ -38,109 +27,41 @@ def read_srt(srt_file):
         srt_content = file.read()
     return srt_content
 
-def get_config_value(yaml_path, value_name):
-    if not yaml_path:
-        sys.exit("Error: No YAML configuration file path provided.")
-    if not os.path.exists(yaml_path):
-        sys.exit(f"Error: YAML configuration file '{yaml_path}' does not exist.")
-    try:
-        with open(yaml_path, 'r', encoding='utf-8') as file:
-            config = yaml.safe_load(file)
-    except Exception as e:
-        sys.exit(f"Error: Failed to load YAML file: {e}")
-    if not config or value_name not in config:
-        sys.exit(f"Error: '{value_name}' variable is missing in the YAML file.")
-    return config[value_name]
-
-def create_systerm_prompot(translation_config):
-    language = get_config_value(translation_config, "language")
-    translation_mapping = get_config_value(translation_config, "translation_mapping")
-    bible_verse_translation = get_config_value(translation_config, "bible_verse_translation")
-
-    mapping_text = ""
-    mapping_lines = []
-
-    # check if translation_mapping is array
-    if isinstance(translation_mapping, dict):
-        
-        for src, tgt in translation_mapping.items():
-            mapping_lines.append(f'   - "{src}" → "{tgt}"')
-        mapping_text = "\n".join(mapping_lines)
-
-    mapping_rule = f"""
-    2. **Translation Mapping:**
-        - For the following words or phrases, use the provided translations:
-        {mapping_text}
-    """ if len(mapping_lines) > 0 else ""
-
-    return f"""
-    You are SRT title translator. Translate to {language} language. Output only SRT format.
-
-    Key rules to follow:
-    1. **Bible verse Translations:**
-        - For every Bible verse encountered, use "{bible_verse_translation}" Bible translation.
-    
-    {mapping_rule}
-
-    Follow these instructions carefully to ensure that the translation is accurate and free of any extraneous commentary.
-    """
-
-def translate_batch(client, batch, system_prompt):
-    
-    message = client.messages.create(
-        model="claude-3-7-sonnet-20250219",
-        max_tokens=8192,
-        temperature=0,
-        system=system_prompt,
-        messages=[{"role": "user", "content": batch}]
-    )
-
-    translation_response = message.content
-    if isinstance(translation_response, list) and translation_response:
-        translation_response = translation_response[0]
-    if hasattr(translation_response, 'text'):
-        translation_response = translation_response.text
-
-    return translation_response
-
-def translate_srt(srt_content, translation_config):
-    system_prompt = create_systerm_prompot(translation_config)
-    
-    # Get the API key from the environment (.env file).
-    claude_api_key = os.environ.get("CLAUDE_API_KEY")
-    if not claude_api_key:
-        sys.exit("Error: CLAUDE_API_KEY not set in .env file.")
-    
-    client = Anthropic(api_key=claude_api_key)
-    
-    print(f"System prompt: {system_prompt}")
-    print("Translating SRT content...")
-    batches = split_srt_into_batches(srt_content)
-    
-    translated_batches = []
-    batch_count = len(batches)
-    batch_index = 0
-    for batch in batches:
-        batch_index += 1
-        print(f"Translating batch {batch_index} of {batch_count}...")
-        translation_response = translate_batch(client, batch, system_prompt)
-        translated_batches.append(translation_response)
-    
-    print("Translation complete")
-    return "\n".join(translated_batches)
-
 def main():
-    # python translate-srt.py [origin-srt] [target-lang]
-    if(len(sys.argv) != 3):
-        print("Usage: python translate-srt.py [origin-srt] [target-lang]")
-        return
-    
-    origin_srt_file = sys.argv[1]
+    # python translate-srt.py [origin-srt] [target-lang] [--workers N]
+    parser = argparse.ArgumentParser(description="Translate an English SRT file from lang/en")
+    parser.add_argument("origin_srt", help="SRT file name inside lang/en")
+    parser.add_argument("target_lang", help="Target language code, e.g. hr")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Number of batches translated concurrently (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always call the API instead of reusing cached batch translations")
+    parser.add_argument("--output-budget", type=int, default=DEFAULT_OUTPUT_BUDGET,
+                        help=f"Expected output tokens per batch (default: {DEFAULT_OUTPUT_BUDGET})")
+    parser.add_argument("--text-only", action="store_true",
+                        help="Send only the subtitle text and reattach the original timings locally")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream responses and append finished cues to <target>.partial.srt while translating")
+    parser.add_argument("--memory", action="store_true",
+                        help="Reuse approved translations of earlier videos from lang/en and lang/<target-lang>")
+    parser.add_argument("--no-bible", action="store_true",
+                        help="Do not use lang/en/bible.tsv and lang/<target-lang>/bible.tsv for quoted verses")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the batch plan without calling the translation API")
+    parser.add_argument("--telemetry", metavar="FILE",
+                        help="Append timing, token usage and cost of every batch and request to FILE as JSON Lines")
+    parser.add_argument("--prometheus", metavar="FILE",
+                        help="Write the run's counters to FILE in the Prometheus textfile format")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Profile local processing with cProfile and tracemalloc into {PROFILE_DIR}/")
+    args = parser.parse_args()
+
+    origin_srt_file = args.origin_srt
     # check if it finishes with .srt if not add it
     if not origin_srt_file.endswith('.srt'):
         origin_srt_file += '.srt'
     
-    target_lang = sys.argv[2]
+    target_lang = args.target_lang
 
     # Determine the root directory (parent of the 'scripts' folder)
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -167,18 +88,51 @@ def main():
         return
     
     # load translation configuration
-    translation_config = os.path.join(root_dir, "lang", target_lang, "config.yaml")
-    if not os.path.exists(translation_config):
-        print(f"Translation configuration file {translation_config} not found")
+    translation_config_file = os.path.join(root_dir, "lang", target_lang, "config.yaml")
+    if not os.path.exists(translation_config_file):
+        print(f"Translation configuration file {translation_config_file} not found")
         return
+    translation_config = load_translation_config(translation_config_file)
 
     srt_content = read_srt(srt_source_file)
-    srt_translated = translate_srt(srt_content, translation_config)
 
-    with open(output_file, 'w', encoding='utf-8') as file:
-        file.write(srt_translated)
+    if args.dry_run:
+        batches = plan_batches(srt_content, translation_config, args.output_budget, args.text_only)
+        print_batch_plan(batches, args.output_budget)
+        return
 
-    normalize_line_breaks(output_file)
+    cache = None if args.no_cache else TranslationCache(os.path.join(root_dir, CACHE_FILE))
+    journal = BatchJournal(output_file)
+    stream_path = partial_srt_path(output_file) if args.stream else None
+    memory = build_translation_memory(root_dir, target_lang) if args.memory else None
+    bible = None if args.no_bible else load_bible_index(root_dir, target_lang,
+                                                        translation_config.bible_verse_translation)
+    telemetry = None
+    if args.telemetry or args.prometheus or args.profile:
+        profile_dir = os.path.join(root_dir, PROFILE_DIR, time.strftime("%Y%m%d-%H%M%S")) if args.profile else None
+        telemetry = Telemetry(args.telemetry, args.prometheus, profile_dir)
+
+    try:
+        srt_translated = translate_srt(srt_content, translation_config, workers=args.workers, cache=cache,
+                                       output_budget=args.output_budget, journal=journal,
+                                       text_only=args.text_only, stream_path=stream_path, memory=memory,
+                                       bible=bible, telemetry=telemetry)
+    except TranslationError as e:
+        sys.exit(f"Error: {e}")
+    finally:
+        if cache is not None:
+            print(cache.summary())
+            cache.close()
+        if telemetry is not None:
+            print(telemetry.summary())
+            telemetry.close()
+
+    write_srt(output_file, srt_translated)
+    # Lets update-translations.py re-translate only the cues of a later source edit
+    save_fingerprint(output_file, parse_srt(srt_content))
+    journal.remove()
+    if stream_path and os.path.exists(stream_path):
+        os.remove(stream_path)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
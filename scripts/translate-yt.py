@@ -1,325 +1,349 @@
 import os
 import sys
-import yt_dlp
 from dotenv import load_dotenv
-import assemblyai as aai
-import re
-from anthropic import Anthropic
-import yaml
+from subtitles import parse_srt, write_srt
+import time
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from journal import BatchJournal
+from media_index import MediaIndex, download_audio, video_id_from_url
+from pipeline import Pipeline, Stage
+from streaming import partial_srt_path
+from source_diff import save_fingerprint
+from translation_config import load_translation_config, find_configured_languages
+from translation_cache import TranslationCache, CACHE_FILE
+from audio import compress_audio, AUDIO_CACHE_DIR
+from transcription import (transcribe, transcribe_chunked, submit_transcription, collect_transcription,
+                           TranscriptionJobs, TRANSCRIPTION_JOBS_FILE, DEFAULT_CHUNK_WORKERS)
+from bible import load_bible_index
+from translation_memory import MemoryStore
+from batching import print_batch_plan, DEFAULT_OUTPUT_BUDGET
+from translator import translate_srt, plan_batches, create_client, DEFAULT_WORKERS
+from telemetry import Telemetry, PROFILE_DIR
 
 # Load enviroment variables from .env file
 load_dotenv()
 
-def split_srt_into_batches(srt_content, batch_size=200):
-    srt_content = srt_content.strip()
-    subtitles = re.split(r'\n(?=\d+\n\d{2}:\d{2}:\d{2},\d{3} -->)', srt_content)
-    batches = [subtitles[i:i + batch_size] for i in range(0, len(subtitles), batch_size)]
-    return ["\n".join(batch) + "\n" for batch in batches]
-
-def get_config_value(yaml_path, value_name):
-    if not yaml_path:
-        sys.exit("Error: No YAML configuration file path provided.")
-    if not os.path.exists(yaml_path):
-        sys.exit(f"Error: YAML configuration file '{yaml_path}' does not exist.")
-    try:
-        with open(yaml_path, 'r', encoding='utf-8') as file:
-            config = yaml.safe_load(file)
-    except Exception as e:
-        sys.exit(f"Error: Failed to load YAML file: {e}")
-    if not config or value_name not in config:
-        sys.exit(f"Error: '{value_name}' variable is missing in the YAML file.")
-    return config[value_name]
+# Default number of videos in each pipeline stage at the same time
+DEFAULT_DOWNLOAD_WORKERS = 2
+DEFAULT_UPLOAD_WORKERS = 2
+# Transcribe workers mostly wait for AssemblyAI, so many of them are cheap
+DEFAULT_TRANSCRIBE_WORKERS = 8
+DEFAULT_TRANSLATE_WORKERS = 2
 
 def read_srt(srt_file):
     with open(srt_file, 'r', encoding='utf-8') as file:
         srt_content = file.read()
     return srt_content
 
-def normalize_line_breaks(srt_path):
-    with open(srt_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    # Ensure exactly one blank line between subtitle blocks
-    fixed_content = re.sub(r'\n{2,}(?=\d+\n\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3})', '\n', content.strip()) + '\n'
-    
-    # Ensure each subtitle text ends with a single blank line before the next block
-    fixed_content = re.sub(r'([^\n])\n(\d+\n\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3})', r'\1\n\n\2', fixed_content)
-    
-    with open(srt_path, 'w', encoding='utf-8') as file:
-        file.write(fixed_content)
-    
-    print(f"Normalized line breaks in: {srt_path}")
-
-def create_systerm_prompot(translation_config):
-    language = get_config_value(translation_config, "language")
-    translation_mapping = get_config_value(translation_config, "translation_mapping")
-    bible_verse_translation = get_config_value(translation_config, "bible_verse_translation")
-
-    mapping_text = ""
-    mapping_lines = []
-
-    # check if translation_mapping is array
-    if isinstance(translation_mapping, dict):
-        
-        for src, tgt in translation_mapping.items():
-            mapping_lines.append(f'   - "{src}" → "{tgt}"')
-        mapping_text = "\n".join(mapping_lines)
-
-    mapping_rule = f"""
-    - **Translation Mapping:**
-        - For the following words or phrases, use the provided translations:
-        {mapping_text}
-    """ if len(mapping_lines) > 0 else ""
-
-    speaker_gender = get_config_value(translation_config, "speaker_gender")
-    gender_clause = ""
-    if speaker_gender:
-        gender_clause = f"""
-    - **Voice**
-        - The speaker is {speaker_gender}. Translate accordingly.
-        """
-
-    additional_settings = get_config_value(translation_config, "additional_settings")
-    if additional_settings and isinstance(additional_settings, list) and len(additional_settings) > 0:
-        additional_clause = f"""
-        - **Additional Settings:**
-            - {"\n            - ".join(additional_settings)}
-        """
-
-    return f"""
-    You are SRT title translator. Translate to {language} language. Output only SRT format.
-
-    Key rules to follow:
-    - **Bible verse Translations:**
-        - For every Bible verse encountered, use "{bible_verse_translation}" Bible translation.
-    
-    {mapping_rule}
-
-    {gender_clause}
-
-    {additional_clause}
-
-    Follow these instructions carefully to ensure that the translation is accurate and free of any extraneous commentary.
-    """
+def setup_directories(output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir
 
-def translate_batch(client, batch, system_prompt):
-    
-    message = client.messages.create(
-        model="claude-3-7-sonnet-20250219",
-        max_tokens=8192,
-        temperature=0,
-        system=system_prompt,
-        messages=[{"role": "user", "content": batch}]
-    )
+def translate_language(root_dir, media_name, source_srt_content, target_lang, client, cache, memories, telemetry,
+                       args):
+    output_target_lang_dir = os.path.join(root_dir, "lang", target_lang)
 
-    translation_response = message.content
-    if isinstance(translation_response, list) and translation_response:
-        translation_response = translation_response[0]
-    if hasattr(translation_response, 'text'):
-        translation_response = translation_response.text
+    # load translation configuration
+    translation_config_file = os.path.join(output_target_lang_dir, "config.yaml")
+    if not os.path.exists(translation_config_file):
+        print(f"Translation configuration file {translation_config_file} not found")
+        return None
+    translation_config = load_translation_config(translation_config_file)
 
-    return translation_response
+    target_srt_file = os.path.join(output_target_lang_dir, f"{media_name}_{target_lang.upper()}.srt")
+    # check if output file already exists
+    if os.path.exists(target_srt_file):
+        print(f"Output file {target_srt_file} already exists")
+        return target_srt_file
 
+    # Finished batches are journaled next to the target file so a re-run can resume
+    journal = BatchJournal(target_srt_file)
+    stream_path = partial_srt_path(target_srt_file) if args.stream else None
 
-def get_output_filename(url, output_dir):
+    bible = None if args.no_bible else load_bible_index(root_dir, target_lang,
+                                                        translation_config.bible_verse_translation)
+
+    # Translate the SRT file
+    target_srt_content = translate_srt(source_srt_content, translation_config, workers=args.workers, client=client,
+                                       label=target_lang, cache=cache, output_budget=args.output_budget, journal=journal,
+                                       text_only=args.text_only, stream_path=stream_path,
+                                       memory=memories.get(target_lang) if memories is not None else None,
+                                       bible=bible, telemetry=telemetry)
+
+    write_srt(target_srt_file, target_srt_content)
+    # Lets update-translations.py re-translate only the cues of a later source edit
+    save_fingerprint(target_srt_file, parse_srt(source_srt_content))
+    journal.remove()
+    if stream_path and os.path.exists(stream_path):
+        os.remove(stream_path)
+    return target_srt_file
+
+def is_collection_url(url):
     """
-    Get the expected filename without downloading
-    
-    Args:
-        url (str): YouTube URL
-        output_dir (str): Directory where file would be saved
-        
-    Returns:
-        str: Expected filename path (without extension)
+    Whether url points to a playlist or channel rather than a single video
     """
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'noplaylist': True,
-        'skip_download': True,
-    }
-    
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url, download=False)
-        title = info['title']
-        sanitized_title = ydl.prepare_filename(info).split(os.path.sep)[-1].split('.')[0]
-        return sanitized_title
-
-def download_audio(url, output_dir):
+    parsed = urlparse(url)
+    query = parse_qs(parsed.query)
+    if 'v' in query or parsed.netloc.endswith('youtu.be'):
+        # A video opened from a playlist is still a single video ('noplaylist')
+        return False
+    return 'list' in query or parsed.path.startswith(('/playlist', '/@', '/channel/', '/c/', '/user/'))
+
+def expand_urls(urls, depth=0):
     """
-    Download audio from a YouTube URL if it doesn't already exist
-    
+    Replace playlist and channel URLs by the URLs of their videos
+
     Args:
-        url (str): YouTube URL to download audio from
-        output_dir (str): Directory to save the audio file
-        
+        urls (list): Video, playlist or channel URLs
+        depth (int): Recursion depth; channels list their tabs as playlists
+
     Returns:
-        str or None: Path to the file (either existing or newly downloaded),
-                     or None if an error occurred
+        list: Video URLs in playlist order without duplicates
     """
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # First check if file already exists (as .mp3)
-    try:
-        base_filename = get_output_filename(url, output_dir)
-        mp3_path = os.path.join(output_dir, f"{base_filename}.mp3")
-        webm_path = os.path.join(output_dir, f"{base_filename}.webm")
-        
-        if os.path.exists(mp3_path):
-            print(f"File already exists as MP3: {mp3_path}")
-            print("Skipping download...")
-            return mp3_path
-        elif os.path.exists(webm_path):
-            print(f"File already exists as WebM: {webm_path}")
-            print("Skipping download...")
-            return webm_path
-    except Exception as e:
-        print(f"Error checking file existence: {str(e)}")
-        # Continue with download attempt if we can't check properly
-    
-    print(f"Downloading audio from: {url}")
-    output_template = os.path.join(output_dir, '%(title)s.%(ext)s')
-    
-    # Configure yt-dlp options for WebM download without conversion
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'outtmpl': output_template,
-        'quiet': False,
-        'no_warnings': False
-    }
-    
-    # Download the audio file
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            filename = ydl.prepare_filename(info)
-            print(f"Audio downloaded successfully: {filename}")
-            return filename
-    except Exception as e:
-        print(f"Error downloading audio: {str(e)}")
+    videos = []
+    for url in urls:
+        if not is_collection_url(url) or depth > 2:
+            videos.append(url)
+            continue
+        print(f"Listing videos in {url}...")
+        import yt_dlp
+        with yt_dlp.YoutubeDL({'extract_flat': 'in_playlist', 'quiet': True}) as ydl:
+            info = ydl.extract_info(url, download=False)
+        entries = [entry for entry in info.get('entries') or [] if entry]
+        entry_urls = [entry.get('url') or f"https://www.youtube.com/watch?v={entry['id']}" for entry in entries]
+        videos += expand_urls(entry_urls, depth + 1)
+    return list(dict.fromkeys(videos))
+
+def read_url_argument(url_argument):
+    """
+    Return the URLs given on the command line: a URL, or a file with one URL per line
+    """
+    if os.path.isfile(url_argument):
+        with open(url_argument, 'r', encoding='utf-8') as file:
+            return [line.strip() for line in file if line.strip() and not line.strip().startswith('#')]
+    return [url_argument]
+
+def download_stage(url, content_dir, index, telemetry):
+    cached = index.media_file(video_id_from_url(url)) is not None
+    video_id, media_file = download_audio(url, content_dir, index)
+    if not media_file:
+        print(f"Download failed for {url}.")
         return None
+    print(f"File path: {media_file}")
+    if telemetry is not None:
+        telemetry.record("download", url=url, video=video_id, cached=cached,
+                         bytes=0 if cached else os.path.getsize(media_file))
+    return video_id, media_file
 
-def setup_directories(output_dir):
-    os.makedirs(output_dir, exist_ok=True)
-    return output_dir
+def upload_stage(downloaded, output_source_lang_dir, index, jobs, telemetry, args, audio_cache_dir):
+    video_id, media_file = downloaded
+    media_name = os.path.basename(media_file)
+    media_name = os.path.splitext(media_name)[0]
+
+    source_lang_srt_file = (video_id and index.transcript(video_id, "en")) or \
+        os.path.join(output_source_lang_dir, f"{media_name}.srt")
 
-def transcribe(media_file):
-    assembly_api_key = os.getenv("ASSEMBLY_AI_API_KEY")
+    key = None
+    if os.path.exists(source_lang_srt_file):
+        print(f"Output file {source_lang_srt_file} already exists")
+        print("Skipping transcription...")
+    elif not args.chunk_minutes:
+        # Only submit here; waiting for the transcript happens in the next stage
+        upload_file = compress_audio(media_file, audio_cache_dir) if args.compress_audio else media_file
+        key = submit_transcription(upload_file, jobs, telemetry)
+    return video_id, media_file, media_name, source_lang_srt_file, key
+
+def transcribe_stage(submitted, index, jobs, telemetry, args, audio_cache_dir):
+    video_id, media_file, media_name, source_lang_srt_file, key = submitted
+
+    if not os.path.exists(source_lang_srt_file):
+        if args.chunk_minutes:
+            # Chunks are cut as mono 16 kHz Opus already, so they are not compressed again
+            source_srt_content = transcribe_chunked(media_file,
+                                                    lambda chunk_file: transcribe(chunk_file, jobs, telemetry),
+                                                    args.chunk_minutes * 60, audio_cache_dir, args.chunk_workers)
+        else:
+            source_srt_content = collect_transcription(key, jobs, telemetry)
+
+        write_srt(source_lang_srt_file, source_srt_content)
 
-    if assembly_api_key is None:
-        print("Assembly AI API Key not found in .env file")
-        sys.exit(1)
-    
-    aai.settings.api_key = assembly_api_key
+        print(f"Transcription saved to: {source_lang_srt_file}")
 
-    print(f"Transcribing {media_file}...")
-    transcriber = aai.Transcriber()
-    transcript = transcriber.transcribe(media_file)
+    if video_id:
+        index.add_transcript(video_id, "en", source_lang_srt_file)
+    return video_id, media_name, source_lang_srt_file
 
-    srt_content = transcript.export_subtitles_srt()
-    
-    print("Transcription complete")
+def translate_stage(transcribed, root_dir, target_langs, get_client, cache, memories, index, telemetry, args):
+    video_id, media_name, source_lang_srt_file = transcribed
 
-    return srt_content
+    # The source SRT is read once and every language shares one client (and connection pool)
+    source_srt_content = read_srt(source_lang_srt_file)
 
-def translate_srt(srt_content, translation_config):
-    system_prompt = create_systerm_prompot(translation_config)
-    
-    # Get the API key from the environment (.env file).
-    claude_api_key = os.environ.get("CLAUDE_API_KEY")
-    if not claude_api_key:
-        sys.exit("Error: CLAUDE_API_KEY not set in .env file.")
-    
-    client = Anthropic(api_key=claude_api_key)
-    
-    print(f"System prompt: {system_prompt}")
-    print("Translating SRT content...")
-    batches = split_srt_into_batches(srt_content)
-    
-    translated_batches = []
-    batch_count = len(batches)
-    batch_index = 0
-    for batch in batches:
-        batch_index += 1
-        print(f"Translating batch {batch_index} of {batch_count}...")
-        translation_response = translate_batch(client, batch, system_prompt)
-        translated_batches.append(translation_response)
-    
-    print("Translation complete")
-    return "\n".join(translated_batches)
+    if args.dry_run:
+        for target_lang in target_langs:
+            translation_config_file = os.path.join(root_dir, "lang", target_lang, "config.yaml")
+            if not os.path.exists(translation_config_file):
+                print(f"Translation configuration file {translation_config_file} not found")
+                continue
+            translation_config = load_translation_config(translation_config_file)
+            batches = plan_batches(source_srt_content, translation_config, args.output_budget, args.text_only)
+            print_batch_plan(batches, args.output_budget, label=f"{media_name} {target_lang}")
+        return media_name
+
+    client = get_client()
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=len(target_langs)) as executor:
+        futures = {
+            executor.submit(translate_language, root_dir, media_name, source_srt_content,
+                            target_lang, client, cache, memories, telemetry, args): target_lang
+            for target_lang in target_langs
+        }
+        for future in as_completed(futures):
+            target_lang = futures[future]
+            try:
+                target_srt_file = future.result()
+            except (Exception, SystemExit) as e:
+                # A bad config exits and an unexpected error raises; neither may stop the other languages
+                print(f"[{target_lang}] Error: {e}")
+                failed.append(target_lang)
+                continue
+            if target_srt_file:
+                print(f"[{target_lang}] Output: {target_srt_file}")
+                if video_id:
+                    index.add_transcript(video_id, target_lang, target_srt_file)
+            else:
+                failed.append(target_lang)
+
+    if failed:
+        print(f"Translation of {media_name} failed for: {', '.join(sorted(failed))}")
+        return None
+    return media_name
 
 def main():
     # The assumption is that source language is English
-    if len(sys.argv) < 3:
-        print("Usage: python download-audio.py <youtube-url> <target-lang>")
-        sys.exit(1)
-    
-    url = sys.argv[1]
-    target_lang = sys.argv[2]
-
-    if(target_lang == 'en'):
-        print("Target language cannot be English")
-        return 1
-    
+    parser = argparse.ArgumentParser(description="Download, transcribe and translate YouTube videos")
+    parser.add_argument("url", help="YouTube video, playlist or channel URL, or a file with one URL per line")
+    parser.add_argument("target_langs", nargs="*", metavar="target-lang",
+                        help="Target language codes, e.g. hr sr")
+    parser.add_argument("--all-configured", action="store_true",
+                        help="Translate to every language that has a lang/<code>/config.yaml")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Number of batches translated concurrently per language (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--download-workers", type=int, default=DEFAULT_DOWNLOAD_WORKERS,
+                        help=f"Videos downloaded at the same time (default: {DEFAULT_DOWNLOAD_WORKERS})")
+    parser.add_argument("--upload-workers", type=int, default=DEFAULT_UPLOAD_WORKERS,
+                        help=f"Videos uploaded to AssemblyAI at the same time (default: {DEFAULT_UPLOAD_WORKERS})")
+    parser.add_argument("--transcribe-workers", type=int, default=DEFAULT_TRANSCRIBE_WORKERS,
+                        help=f"Transcripts waited for at the same time (default: {DEFAULT_TRANSCRIBE_WORKERS})")
+    parser.add_argument("--translate-workers", type=int, default=DEFAULT_TRANSLATE_WORKERS,
+                        help=f"Videos translated at the same time (default: {DEFAULT_TRANSLATE_WORKERS})")
+    parser.add_argument("--compress-audio", action="store_true",
+                        help="Upload mono 16 kHz Opus made with ffmpeg instead of the downloaded audio")
+    parser.add_argument("--chunk-minutes", type=float, default=0,
+                        help="Transcribe recordings longer than this as concurrent chunks cut at silences (default: off)")
+    parser.add_argument("--chunk-workers", type=int, default=DEFAULT_CHUNK_WORKERS,
+                        help=f"Chunks of one recording transcribed at the same time (default: {DEFAULT_CHUNK_WORKERS})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always call the API instead of reusing cached batch translations")
+    parser.add_argument("--output-budget", type=int, default=DEFAULT_OUTPUT_BUDGET,
+                        help=f"Expected output tokens per batch (default: {DEFAULT_OUTPUT_BUDGET})")
+    parser.add_argument("--text-only", action="store_true",
+                        help="Send only the subtitle text and reattach the original timings locally")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream responses and append finished cues to <target>.partial.srt while translating")
+    parser.add_argument("--memory", action="store_true",
+                        help="Reuse approved translations of earlier videos from lang/en and lang/<target-lang>")
+    parser.add_argument("--no-bible", action="store_true",
+                        help="Do not use lang/en/bible.tsv and lang/<target-lang>/bible.tsv for quoted verses")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the batch plan without calling the translation API")
+    parser.add_argument("--telemetry", metavar="FILE",
+                        help="Append timing, bytes, token usage and cost of every stage and batch to FILE as JSON Lines")
+    parser.add_argument("--prometheus", metavar="FILE",
+                        help="Write the run's counters to FILE in the Prometheus textfile format")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Profile local processing with cProfile and tracemalloc into {PROFILE_DIR}/")
+    args = parser.parse_args()
+
     # Get script directory and construct path to content directory
     script_dir = os.path.dirname(os.path.abspath(__file__))
     root_dir = os.path.abspath(os.path.join(script_dir, ".."))
-    content_dir = os.path.join(root_dir, "content")
-    setup_directories(content_dir)
 
-    output_source_lang_dir = os.path.join(root_dir, "lang", "en")
-    setup_directories(output_source_lang_dir)
+    target_langs = list(dict.fromkeys(args.target_langs))
+    if args.all_configured:
+        target_langs += [code for code in find_configured_languages(root_dir) if code not in target_langs]
 
-    output_target_lang_dir = os.path.join(root_dir, "lang", target_lang)
-    
-    # Download the audio file
-    media_file = download_audio(url, content_dir)
-    
-    media_name = os.path.basename(media_file)
-    media_name = os.path.splitext(media_name)[0]
+    if not target_langs:
+        parser.error("at least one target language or --all-configured is required")
 
-    if not media_file:
-        print("Download failed.")
+    if 'en' in target_langs:
+        print("Target language cannot be English")
         return 1
-    
-    print(f"File path: {media_file}")
-
-    source_lang_srt_file = os.path.join(output_source_lang_dir, f"{media_name}.srt")
-
-    if os.path.exists(source_lang_srt_file):
-        print(f"Output file {source_lang_srt_file} already exists")
-        print("Skipping transcription...")
-    else:
-        # Transcribe the audio file
-        source_srt_content = transcribe(media_file)
 
-        with open(source_lang_srt_file, 'w', encoding='utf-8') as file:
-            file.write(source_srt_content)
-    
-        print(f"Transcription saved to: {source_lang_srt_file}")
-    
-        normalize_line_breaks(source_lang_srt_file)
-
-    # load translation configuration
-    translation_config = os.path.join(root_dir, "lang", target_lang, "config.yaml")
-    if not os.path.exists(translation_config):
-        print(f"Translation configuration file {translation_config} not found")
-        return
-
-    target_srt_file = os.path.join(output_target_lang_dir, f"{media_name}_{target_lang.upper()}.srt")
-    # check if output file already exists
-    if os.path.exists(target_srt_file):
-        print(f"Output file {target_srt_file} already exists")
-        return
-
-    # Translate the SRT file
-    source_srt_content = read_srt(source_lang_srt_file)
-    target_srt_content = translate_srt(source_srt_content, translation_config)
+    content_dir = os.path.join(root_dir, "content")
+    setup_directories(content_dir)
 
-    with open(target_srt_file, 'w', encoding='utf-8') as file:
-        file.write(target_srt_content)
+    output_source_lang_dir = os.path.join(root_dir, "lang", "en")
+    setup_directories(output_source_lang_dir)
 
-    normalize_line_breaks(target_srt_file)
+    # Known video IDs are resolved from the index without asking YouTube again
+    index = MediaIndex(root_dir)
+
+    urls = expand_urls(read_url_argument(args.url))
+    if len(urls) > 1:
+        print(f"Processing {len(urls)} videos")
+
+    # One client and cache are shared by every video; the client is created on first use
+    clients = []
+    client_lock = threading.Lock()
+    def get_client():
+        with client_lock:
+            if not clients:
+                clients.append(create_client())
+            return clients[0]
+    cache = None if args.no_cache or args.dry_run else TranslationCache(os.path.join(root_dir, CACHE_FILE))
+    # Each language's memory is built once and shared by every video
+    memories = MemoryStore(root_dir) if args.memory else None
+
+    telemetry = None
+    if args.telemetry or args.prometheus or args.profile:
+        profile_dir = os.path.join(root_dir, PROFILE_DIR, time.strftime("%Y%m%d-%H%M%S")) if args.profile else None
+        telemetry = Telemetry(args.telemetry, args.prometheus, profile_dir)
+
+    # Submitted transcripts survive a killed run; the next run waits for them instead of uploading again
+    jobs = TranscriptionJobs(os.path.join(root_dir, TRANSCRIPTION_JOBS_FILE))
+    audio_cache_dir = os.path.join(root_dir, AUDIO_CACHE_DIR)
+
+    pipeline = Pipeline([
+        Stage("download", lambda url: download_stage(url, content_dir, index, telemetry), args.download_workers),
+        Stage("upload", lambda downloaded: upload_stage(downloaded, output_source_lang_dir, index, jobs, telemetry,
+                                                         args, audio_cache_dir), args.upload_workers),
+        Stage("transcribe", lambda submitted: transcribe_stage(submitted, index, jobs, telemetry, args,
+                                                               audio_cache_dir), args.transcribe_workers),
+        Stage("translate", lambda transcribed: translate_stage(transcribed, root_dir, target_langs, get_client,
+                                                               cache, memories, index, telemetry, args),
+              args.translate_workers),
+    ], telemetry)
+    finished = pipeline.run(urls)
+
+    if cache is not None:
+        print(cache.summary())
+        cache.close()
+
+    if len(urls) > 1:
+        print(pipeline.summary(len(urls)))
+    if clients and hasattr(clients[0], "scheduler"):
+        print(clients[0].scheduler.summary())
+
+    if telemetry is not None:
+        print(telemetry.summary())
+        telemetry.close()
+
+    return 0 if len(finished) == len(urls) else 1
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
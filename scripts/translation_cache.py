@@ -0,0 +1,113 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Location of the cache relative to the repository root
+CACHE_FILE = os.path.join(".cache", "translations.sqlite3")
+
+# Entries not used for this many days are removed when the cache is opened
+DEFAULT_MAX_AGE_DAYS = 180
+# The least recently used entries above this count are removed when the cache is opened
+DEFAULT_MAX_ENTRIES = 50000
+
+def cache_key(batch, system_prompt, model, temperature):
+    """
+    Content address of a translation request
+
+    Args:
+        batch (str): SRT batch sent to the model
+        system_prompt (str): Rendered system prompt
+        model (str): Model name
+        temperature (float): Sampling temperature
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for part in (model, str(temperature), system_prompt, batch):
+        data = part.encode('utf-8')
+        # Length prefix keeps ("ab", "c") and ("a", "bc") apart
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+class TranslationCache:
+    """
+    SQLite cache of batch translations keyed by cache_key
+
+    One instance can be shared by all worker threads.
+    """
+
+    def __init__(self, path, max_age_days=DEFAULT_MAX_AGE_DAYS, max_entries=DEFAULT_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                translation TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS translations_used_at ON translations (used_at)")
+        self._connection.commit()
+        self.evict(max_age_days, max_entries)
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT translation FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._connection.execute("UPDATE translations SET used_at = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+            return row[0]
+
+    def put(self, key, translation):
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO translations (key, translation, created_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, translation, now, now)
+            )
+            self._connection.commit()
+
+    def evict(self, max_age_days=None, max_entries=None):
+        """
+        Remove entries unused for max_age_days and keep at most max_entries
+
+        Returns:
+            int: Number of removed entries
+        """
+        removed = 0
+        with self._lock:
+            if max_age_days is not None:
+                cutoff = time.time() - max_age_days * 86400
+                removed += self._connection.execute(
+                    "DELETE FROM translations WHERE used_at < ?", (cutoff,)
+                ).rowcount
+            if max_entries is not None:
+                removed += self._connection.execute(
+                    "DELETE FROM translations WHERE key NOT IN "
+                    "(SELECT key FROM translations ORDER BY used_at DESC LIMIT ?)", (max_entries,)
+                ).rowcount
+            self._connection.commit()
+        return removed
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0
+        return f"Translation cache: {self.hits} hit(s), {self.misses} miss(es) ({rate:.0f}% hit rate)"
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,91 @@
+import os
+import sys
+
+class TranslationConfig:
+    """
+    Settings from lang/<code>/config.yaml, loaded and validated once
+    """
+    __slots__ = ('path', 'language', 'bible_verse_translation', 'translation_mapping',
+                 'speaker_gender', 'additional_settings', 'glossary_stems')
+
+    def __init__(self, path, language, bible_verse_translation, translation_mapping=None,
+                 speaker_gender=None, additional_settings=None, glossary_stems=None):
+        self.path = path
+        self.language = language
+        self.bible_verse_translation = bible_verse_translation
+        self.translation_mapping = translation_mapping or {}
+        self.speaker_gender = speaker_gender
+        self.additional_settings = additional_settings or []
+        self.glossary_stems = glossary_stems or {}
+
+def load_translation_config(yaml_path):
+    """
+    Load and validate a translation config.yaml
+
+    Exits with an error message when the file is missing, cannot be parsed,
+    lacks a required value or has a value of the wrong type.
+
+    Args:
+        yaml_path (str): Path to config.yaml
+
+    Returns:
+        TranslationConfig
+    """
+    if not yaml_path:
+        sys.exit("Error: No YAML configuration file path provided.")
+    if not os.path.exists(yaml_path):
+        sys.exit(f"Error: YAML configuration file '{yaml_path}' does not exist.")
+
+    # Imported here so that runs with nothing to translate never load it
+    import yaml
+    try:
+        with open(yaml_path, 'r', encoding='utf-8') as file:
+            config = yaml.safe_load(file)
+    except Exception as e:
+        sys.exit(f"Error: Failed to load YAML file: {e}")
+    if not isinstance(config, dict):
+        sys.exit(f"Error: YAML configuration file '{yaml_path}' is empty or not a mapping.")
+
+    for value_name in ("language", "bible_verse_translation"):
+        if not config.get(value_name):
+            sys.exit(f"Error: '{value_name}' variable is missing in the YAML file.")
+
+    translation_mapping = config.get("translation_mapping")
+    if translation_mapping is not None and not isinstance(translation_mapping, dict):
+        sys.exit("Error: 'translation_mapping' in the YAML file must be a mapping of source to target phrases.")
+
+    additional_settings = config.get("additional_settings")
+    if additional_settings is not None and not isinstance(additional_settings, list):
+        sys.exit("Error: 'additional_settings' in the YAML file must be a list.")
+
+    glossary_stems = config.get("glossary_stems")
+    if glossary_stems is not None and not isinstance(glossary_stems, dict):
+        sys.exit("Error: 'glossary_stems' in the YAML file must be a mapping of target phrases to stems.")
+
+    return TranslationConfig(
+        path=yaml_path,
+        language=config["language"],
+        bible_verse_translation=config["bible_verse_translation"],
+        translation_mapping={str(src): str(tgt) for src, tgt in (translation_mapping or {}).items()},
+        speaker_gender=config.get("speaker_gender"),
+        additional_settings=[str(setting) for setting in (additional_settings or [])],
+        # A single stem may be given as a string instead of a list
+        glossary_stems={str(target): [str(stem) for stem in (stems if isinstance(stems, list) else [stems])]
+                        for target, stems in (glossary_stems or {}).items()},
+    )
+
+def find_configured_languages(root_dir):
+    """
+    Find every target language that has a lang/<code>/config.yaml
+
+    Args:
+        root_dir (str): Repository root directory
+
+    Returns:
+        list: Sorted language codes
+    """
+    lang_dir = os.path.join(root_dir, "lang")
+    return sorted(
+        code for code in os.listdir(lang_dir)
+        if code != 'en' and os.path.isfile(os.path.join(lang_dir, code, "config.yaml"))
+    )
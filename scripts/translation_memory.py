@@ -0,0 +1,216 @@
+import os
+import re
+import threading
+from difflib import SequenceMatcher
+from subtitles import SENTENCE_ENDINGS, read_cues
+
+WORD_PATTERN = re.compile(r"\w+")
+QUOTES = str.maketrans({'‘': "'", '’': "'", '“': '"', '”': '"'})
+
+# Smallest similarity (0-1) for a stored segment to be offered as a suggestion
+NEAR_THRESHOLD = 0.75
+# Suggestions passed to the model per cue
+MAX_SUGGESTIONS = 2
+# Candidates compared character by character per lookup
+MAX_CANDIDATES = 8
+# Word pairs found in more segments than this ("of the") are too common to narrow the search
+MAX_POSTINGS = 2000
+
+def normalize_segment(text):
+    return " ".join(text.translate(QUOTES).casefold().split())
+
+def segment_ngrams(normalized):
+    words = WORD_PATTERN.findall(normalized)
+    if len(words) < 2:
+        return set(words)
+    return {f"{first} {second}" for first, second in zip(words, words[1:])}
+
+def complete_sentences(cues):
+    """
+    Flag the cues that hold whole sentences: the cue ends a sentence and so
+    does the cue before it. Only those are safe to translate out of context.
+    """
+    flags = []
+    previous_ends = True
+    for cue in cues:
+        ends = cue.text.rstrip().endswith(SENTENCE_ENDINGS)
+        flags.append(previous_ends and ends)
+        previous_ends = ends
+    return flags
+
+class MemoryStats:
+    """
+    Share of cues served from translation memory in a run
+    """
+
+    def __init__(self, cue_count, exact, suggested):
+        self.cue_count = cue_count
+        self.exact = exact
+        self.suggested = suggested
+
+    def summary(self):
+        share = self.exact / self.cue_count * 100 if self.cue_count else 0
+        return (f"Translation memory: {self.exact} of {self.cue_count} cue(s) ({share:.1f}%) filled from memory, "
+                f"{self.suggested} sent with suggestions")
+
+class TranslationMemory:
+    """
+    Approved translations of single cues for one target language
+
+    Exact matches are found with a dictionary of normalized source text;
+    near matches with an inverted index of word pairs, so a lookup only
+    compares the few segments that share wording with the cue.
+    """
+
+    def __init__(self):
+        self.sources = []
+        self.source_texts = []
+        self.targets = []
+        self.complete = []
+        self._exact = {}
+        self._postings = {}
+
+    def __len__(self):
+        return len(self.sources)
+
+    def add(self, source, target, complete):
+        normalized = normalize_segment(source)
+        if not normalized or not target.strip():
+            return
+        segment_id = len(self.sources)
+        self.sources.append(normalized)
+        self.source_texts.append(" ".join(source.split()))
+        self.targets.append(target)
+        self.complete.append(complete)
+        # A translation of a whole sentence wins over one made in a longer context
+        if complete or normalized not in self._exact:
+            self._exact[normalized] = segment_id
+        for ngram in segment_ngrams(normalized):
+            self._postings.setdefault(ngram, []).append(segment_id)
+
+    def exact(self, text):
+        """
+        Return the stored translation of a whole sentence identical to text, or None
+        """
+        segment_id = self._exact.get(normalize_segment(text))
+        if segment_id is None or not self.complete[segment_id]:
+            return None
+        return self.targets[segment_id]
+
+    def similar(self, text, limit=MAX_SUGGESTIONS, threshold=NEAR_THRESHOLD):
+        """
+        Find stored segments similar to text
+
+        Returns:
+            list: (score, source, target) tuples, best first
+        """
+        normalized = normalize_segment(text)
+        counts = {}
+        for ngram in segment_ngrams(normalized):
+            postings = self._postings.get(ngram)
+            if not postings or len(postings) > MAX_POSTINGS:
+                continue
+            for segment_id in postings:
+                counts[segment_id] = counts.get(segment_id, 0) + 1
+        candidates = sorted(counts, key=counts.get, reverse=True)[:MAX_CANDIDATES]
+
+        matches = []
+        seen = set()
+        for segment_id in candidates:
+            source = self.sources[segment_id]
+            if source in seen:
+                continue
+            seen.add(source)
+            score = SequenceMatcher(None, normalized, source, autojunk=False).ratio()
+            if score >= threshold:
+                matches.append((score, self.source_texts[segment_id], self.targets[segment_id]))
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return matches[:limit]
+
+    def lookup(self, cues):
+        """
+        Split cues into those filled from memory and suggestions for the rest
+
+        Returns:
+            tuple: (dict cue index -> translation for exact whole-sentence
+                    hits, dict cue index -> list of (score, source, target))
+        """
+        filled = {}
+        suggestions = {}
+        for cue, complete in zip(cues, complete_sentences(cues)):
+            translation = self.exact(cue.text) if complete else None
+            if translation is not None:
+                filled[cue.index] = translation
+                continue
+            matches = self.similar(cue.text)
+            if matches:
+                suggestions[cue.index] = matches
+        return filled, suggestions
+
+def build_translation_memory(root_dir, target_lang):
+    """
+    Build the memory of target_lang from finished translations
+
+    Every lang/<target_lang>/<name>_<LANG>.srt next to a lang/en/<name>.srt is
+    taken as approved. Cues are paired by number and timing, so cues that
+    were merged or re-timed during proofreading are left out.
+
+    Args:
+        root_dir (str): Repository root directory
+        target_lang (str): Target language code
+
+    Returns:
+        TranslationMemory
+    """
+    memory = TranslationMemory()
+    source_dir = os.path.join(root_dir, "lang", "en")
+    target_dir = os.path.join(root_dir, "lang", target_lang)
+    suffix = f"_{target_lang.upper()}.srt"
+    if not os.path.isdir(source_dir) or not os.path.isdir(target_dir):
+        return memory
+
+    for name in sorted(os.listdir(target_dir)):
+        if not name.endswith(suffix):
+            continue
+        source_file = os.path.join(source_dir, f"{name[:-len(suffix)]}.srt")
+        if not os.path.exists(source_file):
+            continue
+        source_cues = read_cues(source_file)
+        targets = {(cue.index, cue.start, cue.end): cue.text for cue in read_cues(os.path.join(target_dir, name))}
+        for cue, complete in zip(source_cues, complete_sentences(source_cues)):
+            target = targets.get((cue.index, cue.start, cue.end))
+            if target is not None:
+                memory.add(cue.text, target, complete)
+    return memory
+
+class MemoryStore:
+    """
+    Translation memories built on first use, one per language, shared by threads
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self._memories = {}
+        self._lock = threading.Lock()
+
+    def get(self, target_lang):
+        with self._lock:
+            if target_lang not in self._memories:
+                memory = build_translation_memory(self.root_dir, target_lang)
+                print(f"[{target_lang}] Translation memory: {len(memory)} segment(s)")
+                self._memories[target_lang] = memory
+            return self._memories[target_lang]
+
+def format_suggestions(cues, suggestions):
+    """
+    Render the suggestions of a batch as a note for the model, or None
+    """
+    lines = []
+    for cue in cues:
+        for _, source, target in suggestions.get(cue.index, []):
+            lines.append(f'{cue.index}: "{source}" → "{" ".join(target.split())}"')
+    if not lines:
+        return None
+    return ("Approved translations of similar subtitles from earlier videos, by subtitle number. "
+            "Reuse their wording where the meaning is the same; do not copy them into the output:\n"
+            + "\n".join(lines))
@@ -0,0 +1,608 @@
+import os
+import sys
+import time
+import threading
+from translation_cache import cache_key
+from subtitles import Cue, block_starts, parse_srt, format_srt, format_text_payload, parse_text_payload
+from validation import ValidationStats, validate_cues
+from streaming import OrderedCueWriter, complete_cues, remaining_cues
+from batching import pack_cues, estimate_tokens, DEFAULT_OUTPUT_BUDGET
+from glossary import Glossary, ComplianceStats
+from translation_memory import MemoryStats, format_suggestions
+from telemetry import message_cost, profiled
+from scheduler import RequestScheduler, ScheduledClient, is_retryable
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+MODEL = "claude-3-7-sonnet-20250219"
+MAX_TOKENS = 8192
+TEMPERATURE = 0
+
+# Number of batches sent to Claude at the same time
+DEFAULT_WORKERS = 4
+# How many times a failed batch is attempted before giving up
+DEFAULT_ATTEMPTS = 3
+# How many times a batch may be narrowed down to the cues that failed validation
+MAX_RETRY_DEPTH = 8
+
+class TranslationError(Exception):
+    pass
+
+def split_srt_into_batches(srt_content, batch_size=200):
+    # Slices the source text at block boundaries; the cues are not parsed or re-formatted
+    starts = block_starts(srt_content)
+    return [srt_content[starts[i]:starts[i + batch_size] if i + batch_size < len(starts) else None].strip() + "\n"
+            for i in range(0, len(starts), batch_size)]
+
+def create_systerm_prompot(translation_config, text_only=False, include_mapping=True):
+    language = translation_config.language
+    translation_mapping = translation_config.translation_mapping
+    bible_verse_translation = translation_config.bible_verse_translation
+
+    mapping_text = ""
+    mapping_lines = []
+
+    # check if translation_mapping is array
+    # Without the mapping the prompt stays the same for every batch; the terms
+    # a batch uses are then sent with the batch (see Glossary)
+    if include_mapping and isinstance(translation_mapping, dict):
+
+        for src, tgt in translation_mapping.items():
+            mapping_lines.append(f'   - "{src}" → "{tgt}"')
+        mapping_text = "\n".join(mapping_lines)
+
+    mapping_rule = f"""
+    - **Translation Mapping:**
+        - For the following words or phrases, use the provided translations:
+        {mapping_text}
+    """ if len(mapping_lines) > 0 else ""
+
+    speaker_gender = translation_config.speaker_gender
+    gender_clause = ""
+    if speaker_gender:
+        gender_clause = f"""
+    - **Voice**
+        - The speaker is {speaker_gender}. Translate accordingly.
+        """
+
+    additional_settings = translation_config.additional_settings
+    additional_clause = ""
+    if additional_settings and isinstance(additional_settings, list) and len(additional_settings) > 0:
+        additional_text = "\n            - ".join(additional_settings)
+        additional_clause = f"""
+        - **Additional Settings:**
+            - {additional_text}
+        """
+
+    if text_only:
+        output_rule = ("The input is a JSON object that maps subtitle numbers to subtitle text. "
+                       "Output only a JSON object with exactly the same numbers mapped to the translated text. "
+                       "Do not merge, split, add or drop subtitles.")
+    else:
+        output_rule = "Output only SRT format."
+
+    return f"""
+    You are SRT title translator. Translate to {language} language. {output_rule}
+
+    Key rules to follow:
+    - **Bible verse Translations:**
+        - For every Bible verse encountered, use "{bible_verse_translation}" Bible translation.
+
+    {mapping_rule}
+
+    {gender_clause}
+
+    {additional_clause}
+
+    Follow these instructions carefully to ensure that the translation is accurate and free of any extraneous commentary.
+    """
+
+def create_client():
+    # Imported here so that helpers like split_srt_into_batches work without the SDK
+    from anthropic import Anthropic
+
+    # Get the API key from the environment (.env file).
+    claude_api_key = os.environ.get("CLAUDE_API_KEY")
+    if not claude_api_key:
+        sys.exit("Error: CLAUDE_API_KEY not set in .env file.")
+
+    # CLAUDE_BASE_URL lets the scripts run against a local fake Messages endpoint
+    base_url = os.environ.get("CLAUDE_BASE_URL") or None
+
+    # Every translation request of the process goes through one scheduler that
+    # paces them to the account's rate limits and retries 429 and 529 errors
+    return ScheduledClient(Anthropic(api_key=claude_api_key, base_url=base_url), RequestScheduler.from_environment())
+
+class UsageStats:
+    """
+    Token usage summed over every Messages response of a run, including
+    prompt cache reads and writes. Shared by all worker threads.
+
+    With a Telemetry, every response is also recorded as a "message" event.
+    """
+
+    FIELDS = ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')
+
+    def __init__(self, telemetry=None, label=""):
+        self.telemetry = telemetry
+        self.label = label
+        self.requests = 0
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+        self._lock = threading.Lock()
+
+    def record(self, usage, seconds=None, stop_reason=None):
+        with self._lock:
+            self.requests += 1
+            for field in self.FIELDS:
+                # Cache fields are None when the prompt was too short to cache
+                setattr(self, field, getattr(self, field) + (getattr(usage, field, None) or 0))
+        if self.telemetry is not None:
+            tokens = {field: getattr(usage, field, None) or 0 for field in self.FIELDS}
+            self.telemetry.record("message", label=self.label, seconds=round(seconds or 0, 3), stop_reason=stop_reason,
+                                  service="anthropic", cost=round(message_cost(MODEL, usage), 6), **tokens)
+
+    def cost(self):
+        return message_cost(MODEL, self)
+
+    def summary(self):
+        return (f"Usage: {self.requests} request(s), {self.input_tokens} input / {self.output_tokens} output tokens, "
+                f"prompt cache {self.cache_creation_input_tokens} written / {self.cache_read_input_tokens} read, "
+                f"~${self.cost():.2f}")
+
+def system_blocks(system_prompt):
+    # The system prompt is identical for every batch of a language, so it is
+    # marked as a cacheable prefix; later batches read it from the prompt cache
+    return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+
+def message_params(batch, system_prompt, note=None):
+    # Parameters of one translation request, shared with the Message Batches API
+    content = batch
+    if note:
+        # Kept apart from the batch so the SRT block the model translates stays untouched
+        content = [{"type": "text", "text": note}, {"type": "text", "text": batch}]
+    return {
+        "model": MODEL,
+        "max_tokens": MAX_TOKENS,
+        "temperature": TEMPERATURE,
+        "system": system_blocks(system_prompt),
+        "messages": [{"role": "user", "content": content}],
+    }
+
+def batch_key(batch, system_prompt, note=None):
+    return cache_key(f"{note}\n\n{batch}" if note else batch, system_prompt, MODEL, TEMPERATURE)
+
+def create_message(client, batch, system_prompt, usage=None, note=None):
+    started = time.monotonic()
+    message = client.messages.create(**message_params(batch, system_prompt, note))
+    if usage is not None:
+        usage.record(message.usage, time.monotonic() - started, message.stop_reason)
+    return message
+
+def message_text(message):
+    translation_response = message.content
+    if isinstance(translation_response, list) and translation_response:
+        translation_response = translation_response[0]
+    if hasattr(translation_response, 'text'):
+        translation_response = translation_response.text
+
+    return translation_response
+
+def translate_batch(client, batch, system_prompt):
+    return message_text(create_message(client, batch, system_prompt))
+
+def parse_translation(response_text, cues):
+    """
+    Parse a response in either payload format into cues
+
+    Text-only responses contain no timing lines, so they are recognised by
+    the SRT parser finding nothing.
+    """
+    translated = parse_srt(response_text)
+    if translated:
+        return translated
+    return parse_text_payload(response_text, cues)
+
+def stream_cues(client, cues, payload, system_prompt, on_cue, usage=None, note=None):
+    """
+    Stream one request and hand over every validated cue as soon as it is complete
+
+    A connection that drops after the stream is open only loses the cue that
+    was in flight: the cues received so far are returned and the caller
+    retries the rest. Errors opening the stream, and errors that are not
+    temporary, are raised like those of create_message.
+
+    Returns:
+        tuple: (accepted, missing, stop_reason, message usage or None)
+    """
+    accepted = {}
+
+    def accept(translated):
+        valid, _ = validate_cues(cues, translated, None)
+        for index, text in valid.items():
+            if index not in accepted:
+                accepted[index] = text
+                on_cue(index, text)
+
+    buffer = ""
+    started = time.monotonic()
+    with client.messages.stream(**message_params(payload, system_prompt, note)) as stream:
+        try:
+            for chunk in stream.text_stream:
+                buffer += chunk
+                translated, consumed = complete_cues(buffer, cues)
+                if consumed:
+                    accept(translated)
+                    buffer = buffer[consumed:]
+            message = stream.get_final_message()
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            print(f"Stream interrupted after {len(accepted)} of {len(cues)} cue(s): {e}")
+            return accepted, [cue for cue in cues if cue.index not in accepted], "error", None
+
+    if usage is not None:
+        usage.record(message.usage, time.monotonic() - started, message.stop_reason)
+    translated = remaining_cues(buffer, cues)
+    # The last SRT cue of a response cut off at max_tokens may be incomplete
+    if message.stop_reason == "max_tokens" and parse_srt(buffer):
+        translated = translated[:-1]
+    accept(translated)
+    return accepted, [cue for cue in cues if cue.index not in accepted], message.stop_reason, message.usage
+
+def translate_cues(client, cues, system_prompt, stats, usage=None, text_only=False, on_cue=None, depth=0, note=None):
+    """
+    Translate cues and re-request only the ones that fail validation
+
+    Cues that come back missing, renumbered, retimed or cut off are sent
+    again on their own. When nothing usable comes back the cues are split
+    in half and each half is translated separately.
+
+    Args:
+        client: Anthropic client
+        cues (list): Source Cue objects
+        system_prompt (str): Rendered system prompt
+        stats (ValidationStats): Counters for retried cues and extra tokens
+        usage (UsageStats): Optional token usage accumulator
+        text_only (bool): Send only cue text as JSON and keep timings local
+        on_cue (callable): When given, the response is streamed and
+            on_cue(index, text) is called for every validated cue as it arrives
+        depth (int): Number of retries that led to this call
+        note (str): Optional text sent ahead of the cues, e.g. translation memory suggestions
+
+    Returns:
+        dict: Cue index -> translated text for every cue in cues
+    """
+    payload = format_text_payload(cues) if text_only else format_srt(cues)
+    if on_cue is None:
+        message = create_message(client, payload, system_prompt, usage, note)
+        stop_reason, message_usage = message.stop_reason, message.usage
+        accepted, missing = validate_cues(cues, parse_translation(message_text(message), cues), stop_reason)
+    else:
+        accepted, missing, stop_reason, message_usage = stream_cues(client, cues, payload, system_prompt, on_cue, usage,
+                                                                    note)
+    if depth > 0 and message_usage is not None:
+        stats.record_retry(message_usage)
+
+    if not missing:
+        return accepted
+
+    if depth >= MAX_RETRY_DEPTH:
+        numbers = ", ".join(str(cue.index) for cue in missing)
+        raise TranslationError(f"Cue(s) {numbers} failed validation after {depth} retries.")
+
+    stats.record_invalid(len(missing), stop_reason == "max_tokens")
+    if len(missing) == len(cues) and len(cues) > 1:
+        middle = len(cues) // 2
+        parts = [cues[:middle], cues[middle:]]
+    else:
+        parts = [missing]
+    for part in parts:
+        accepted.update(translate_cues(client, part, system_prompt, stats, usage, text_only, on_cue, depth + 1, note))
+    return accepted
+
+def translate_validated_batch(client, batch, system_prompt, stats, usage=None, text_only=False, on_cue=None, note=None):
+    """
+    Translate one SRT batch and return it with the source numbering and timings
+    """
+    cues = parse_srt(batch)
+    accepted = translate_cues(client, cues, system_prompt, stats, usage, text_only, on_cue, note=note)
+    return format_srt([Cue(cue.index, cue.start, cue.end, accepted[cue.index]) for cue in cues])
+
+def translate_batches(client, batches, system_prompt, workers=DEFAULT_WORKERS, attempts=DEFAULT_ATTEMPTS, label="", cache=None,
+                      journal=None, stats=None, usage=None, text_only=False, writer=None, notes=None, telemetry=None):
+    """
+    Translate batches concurrently and return the translations in source order
+
+    Args:
+        client: Anthropic client (shared by all worker threads)
+        batches (list): SRT batch texts in source order, e.g. PackedBatch.text from pack_cues
+        system_prompt (str): Rendered system prompt
+        workers (int): Number of batches translated at the same time
+        attempts (int): How many times a failing batch is tried
+        label (str): Prefix for progress messages, e.g. the target language
+        cache (TranslationCache): Optional cache consulted before calling the API
+        journal (BatchJournal): Optional journal of finished batches to resume from and append to
+        stats (ValidationStats): Counters for cues re-translated after failing validation
+        usage (UsageStats): Optional token usage accumulator
+        text_only (bool): Send only cue text and rebuild the SRT from the source timings
+        writer (OrderedCueWriter): When given, responses are streamed and cues
+            are appended to the writer's partial file as they arrive
+        notes (list): Optional text sent ahead of each batch, or None per batch
+        telemetry (Telemetry): Optional recorder of a "batch" event per attempt
+
+    Returns:
+        tuple: (translations, errors) where translations is a list with one
+               entry per batch (None for batches that failed) and errors maps
+               the batch index to the last exception raised for it
+    """
+    batch_count = len(batches)
+    translations = [None] * batch_count
+    errors = {}
+    pending = list(range(batch_count))
+    workers = max(1, workers)
+    prefix = f"[{label}] " if label else ""
+    if stats is None:
+        stats = ValidationStats()
+
+    if notes is None:
+        notes = [None] * batch_count
+    keys = [batch_key(batch, system_prompt, note) for batch, note in zip(batches, notes)]
+
+    if journal is not None:
+        journaled = journal.load()
+        for index in pending:
+            translations[index] = journaled.get(keys[index])
+        pending = [index for index in pending if translations[index] is None]
+        if len(pending) < batch_count:
+            print(f"{prefix}Resuming: {batch_count - len(pending)} of {batch_count} batch(es) found in {journal.path}")
+        if telemetry is not None:
+            for index in range(batch_count):
+                if index not in pending:
+                    telemetry.record("batch", label=label, batch=index + 1, status="journal")
+
+    if cache is not None:
+        for index in pending:
+            translations[index] = cache.get(keys[index])
+        served = [index for index in pending if translations[index] is not None]
+        pending = [index for index in pending if translations[index] is None]
+        if served:
+            print(f"{prefix}{len(served)} of {batch_count} batch(es) served from cache")
+        if telemetry is not None:
+            for index in served:
+                telemetry.record("batch", label=label, batch=index + 1, status="cache")
+        if journal is not None:
+            for index in served:
+                journal.record(index + 1, keys[index], translations[index])
+
+    if writer is not None:
+        for index in range(batch_count):
+            if translations[index] is not None:
+                writer.accept_batch(index, translations[index])
+
+    def translate(index, attempt):
+        started = time.monotonic()
+        status = "error"
+        try:
+            translation = translate_validated_batch(client, batches[index], system_prompt, stats, usage, text_only,
+                                                    partial(writer.accept, index) if writer is not None else None,
+                                                    notes[index])
+            status = "ok"
+            return translation
+        finally:
+            if telemetry is not None:
+                telemetry.record("batch", label=label, batch=index + 1, attempt=attempt, retries=attempt - 1,
+                                 seconds=round(time.monotonic() - started, 3), characters=len(batches[index]),
+                                 status=status)
+
+    for attempt in range(1, attempts + 1):
+        if not pending:
+            break
+        if attempt > 1:
+            print(f"{prefix}Retrying {len(pending)} failed batch(es), attempt {attempt} of {attempts}...")
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            futures = {executor.submit(translate, index, attempt): index for index in pending}
+            failed = []
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    translations[index] = future.result()
+                except Exception as e:
+                    errors[index] = e
+                    failed.append(index)
+                    print(f"{prefix}Batch {index + 1} of {batch_count} failed: {e}")
+                    continue
+                errors.pop(index, None)
+                # Record the batch before anything else so a crash cannot lose it
+                if journal is not None:
+                    journal.record(index + 1, keys[index], translations[index])
+                if cache is not None:
+                    cache.put(keys[index], translations[index])
+                if writer is not None:
+                    writer.accept_batch(index, translations[index])
+                done = sum(1 for translation in translations if translation is not None)
+                print(f"{prefix}Translated batch {index + 1} of {batch_count} ({done}/{batch_count} done)")
+
+        pending = sorted(failed)
+
+    return translations, errors
+
+def enforce_glossary(client, glossary, source_cues, translated_cues, system_prompt, stats, usage=None,
+                     text_only=False):
+    """
+    Re-translate the cues whose translation misses a mapped term
+
+    Only the flagged cues are sent again, with an instruction naming the
+    missing terms. A new translation replaces the old one in translated_cues
+    only when it passes the check.
+
+    Returns:
+        ComplianceStats
+    """
+    checked, flagged = glossary.check(source_cues, translated_cues)
+    remaining = dict(flagged)
+    if flagged:
+        retry_cues = [cue for cue in source_cues if cue.index in flagged]
+        try:
+            accepted = translate_cues(client, retry_cues, system_prompt, stats, usage, text_only,
+                                      note=glossary.format_instruction(flagged))
+        except TranslationError as e:
+            print(f"Glossary re-translation failed: {e}")
+            accepted = {}
+        retried = [Cue(cue.index, cue.start, cue.end, accepted[cue.index]) for cue in retry_cues
+                   if cue.index in accepted]
+        _, still_flagged = glossary.check(retry_cues, retried)
+        for cue in translated_cues:
+            if cue.index in accepted and cue.index not in still_flagged:
+                cue.text = accepted[cue.index]
+                del remaining[cue.index]
+    return ComplianceStats(checked, flagged, len(flagged) - len(remaining), remaining)
+
+def store_corrections(translations, translated_cues, fixed, batches, system_prompt, notes, cache, journal):
+    """
+    Replace the cached and journaled translations of the batches with cues fixed after translating
+
+    Without this a run served from the cache or the journal would find the
+    same misses again and pay for the same re-translations.
+
+    Args:
+        translations (list): Batch translations as returned by translate_batches; updated in place
+        translated_cues (list): The cues of all batches with the fixed text
+        fixed (set): Indexes of the cues whose text was fixed
+    """
+    texts = {cue.index: cue.text for cue in translated_cues if cue.index in fixed}
+    for position, translation in enumerate(translations):
+        cues = parse_srt(translation)
+        if not any(cue.index in texts for cue in cues):
+            continue
+        for cue in cues:
+            cue.text = texts.get(cue.index, cue.text)
+        translations[position] = format_srt(cues)
+        key = batch_key(batches[position], system_prompt, notes[position])
+        if cache is not None:
+            cache.put(key, translations[position])
+        if journal is not None:
+            # The last line of a key wins when the journal is loaded
+            journal.record(position + 1, key, translations[position])
+
+def plan_batches(srt_content, translation_config, output_budget=DEFAULT_OUTPUT_BUDGET, text_only=False):
+    """
+    Pack the cues of srt_content into batches sized for the target language
+
+    Returns:
+        list: PackedBatch objects in source order
+    """
+    return pack_cues(parse_srt(srt_content), translation_config.language, output_budget, text_only)
+
+def translate_srt(srt_content, translation_config, workers=DEFAULT_WORKERS, client=None, label="", cache=None,
+                  output_budget=DEFAULT_OUTPUT_BUDGET, journal=None, text_only=False, stream_path=None, memory=None,
+                  bible=None, telemetry=None):
+    # Each batch only carries the glossary entries that occur in it
+    glossary = None
+    if translation_config.translation_mapping:
+        glossary = Glossary(translation_config.translation_mapping, translation_config.glossary_stems)
+    system_prompt = create_systerm_prompot(translation_config, text_only, include_mapping=glossary is None)
+
+    # A client can be passed in so several languages share one connection pool and rate limit scheduler
+    own_client = client is None
+    if own_client:
+        client = create_client()
+
+    prefix = f"[{label}] " if label else ""
+    print(f"{prefix}System prompt: {system_prompt}")
+    print(f"{prefix}Translating SRT content...")
+    started = time.monotonic()
+    # Local work before the first request: lookups, packing and notes
+    with profiled(telemetry, "prepare", label=label):
+        cues = parse_srt(srt_content)
+
+        # Cues that are a whole Bible verse get the canonical text; other quotes are given to the model as fixed text
+        filled, verses = bible.lookup(cues) if bible is not None else ({}, {})
+        if bible is not None:
+            print(f"{prefix}Bible: {len(filled)} cue(s) filled with {bible.translation_name}, "
+                  f"{len(verses)} sent with fixed verse text")
+
+        # Whole sentences translated before are filled in locally; near matches become suggestions
+        suggestions = {}
+        if memory is not None:
+            remembered, suggestions = memory.lookup([cue for cue in cues if cue.index not in filled])
+            filled.update(remembered)
+            print(f"{prefix}{MemoryStats(len(cues), len(remembered), len(suggestions)).summary()}")
+
+        plan = pack_cues([cue for cue in cues if cue.index not in filled], translation_config.language, output_budget,
+                         text_only)
+        batches = [batch.text for batch in plan]
+        notes = []
+        used_terms = set()
+        glossary_tokens = 0
+        for batch in plan:
+            glossary_note = None
+            if glossary is not None:
+                terms = glossary.find("\n".join(cue.text for cue in batch.cues))
+                used_terms |= terms
+                glossary_note = glossary.format_note(terms)
+                glossary_tokens += estimate_tokens(glossary_note or "")
+            parts = [glossary_note,
+                     bible.format_note(batch.cues, verses) if bible is not None else None,
+                     format_suggestions(batch.cues, suggestions)]
+            notes.append("\n\n".join(part for part in parts if part) or None)
+        if glossary is not None:
+            mapping_tokens = estimate_tokens(create_systerm_prompot(translation_config, text_only)) - \
+                estimate_tokens(system_prompt)
+            print(f"{prefix}Glossary: {len(used_terms)} of {len(glossary)} term(s) used, "
+                  f"~{mapping_tokens * len(plan) - glossary_tokens} prompt tokens saved over {len(plan)} batch(es)")
+        filled_cues = [Cue(cue.index, cue.start, cue.end, filled[cue.index]) for cue in cues if cue.index in filled]
+
+    # Streaming appends cues in source order to stream_path while batches are translated
+    writer = None
+    if stream_path:
+        writer = OrderedCueWriter(stream_path, [batch.cues for batch in plan] + [filled_cues], label)
+        writer.accept_batch(len(plan), format_srt(filled_cues))
+        print(f"{prefix}Streaming cues to {stream_path}")
+
+    print(f"{prefix}Translating {len(batches)} batches with {workers} worker(s)...")
+    stats = ValidationStats()
+    usage = UsageStats(telemetry, label)
+    translated_batches, errors = translate_batches(client, batches, system_prompt, workers=workers, label=label, cache=cache,
+                                                      journal=journal, stats=stats, usage=usage, text_only=text_only,
+                                                      writer=writer, notes=notes, telemetry=telemetry)
+
+    def record_translation(status):
+        if telemetry is not None:
+            telemetry.record("translation", label=label, status=status, cues=len(cues), filled=len(filled_cues),
+                             batches=len(batches), seconds=round(time.monotonic() - started, 3),
+                             requests=usage.requests, retried_cues=stats.retried_cues,
+                             truncated_responses=stats.truncated_responses, cost=round(usage.cost(), 6))
+
+    if errors:
+        print(f"{prefix}{stats.summary()}")
+        print(f"{prefix}{usage.summary()}")
+        record_translation("error")
+        failed = ", ".join(str(index + 1) for index in sorted(errors))
+        message = f"Translation failed for batch(es) {failed} of {len(batches)}."
+        if journal is not None:
+            message += f" Finished batches are kept in {journal.path}; re-run to resume."
+        raise TranslationError(message)
+
+    with profiled(telemetry, "parse", label=label):
+        translated_cues = [cue for batch in translated_batches for cue in parse_srt(batch)]
+    if glossary is not None:
+        # Cues filled from the Bible or the memory are canonical and not checked
+        source_cues = [cue for cue in cues if cue.index not in filled]
+        compliance = enforce_glossary(client, glossary, source_cues, translated_cues, system_prompt, stats, usage,
+                                      text_only)
+        print(f"{prefix}{compliance.summary(glossary)}")
+        fixed = set(compliance.flagged) - set(compliance.remaining)
+        if fixed and (cache is not None or journal is not None):
+            store_corrections(translated_batches, translated_cues, fixed, batches, system_prompt, notes, cache, journal)
+
+    print(f"{prefix}{stats.summary()}")
+    print(f"{prefix}{usage.summary()}")
+    if own_client and hasattr(client, "scheduler"):
+        print(f"{prefix}{client.scheduler.summary()}")
+    print(f"{prefix}Translation complete")
+    with profiled(telemetry, "assemble", label=label):
+        srt_translated = format_srt(sorted(filled_cues + translated_cues, key=lambda cue: cue.index))
+    record_translation("ok")
+    return srt_translated
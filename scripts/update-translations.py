@@ -0,0 +1,143 @@
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+from subtitles import normalize_line_breaks, format_srt, parse_srt, read_cues, write_srt
+from translation_config import load_translation_config, find_configured_languages
+from translation_cache import TranslationCache, CACHE_FILE
+from source_diff import SourceDiff, load_fingerprint, save_fingerprint, DEFAULT_CONTEXT_CUES
+from bible import load_bible_index
+from batching import DEFAULT_OUTPUT_BUDGET
+from translator import translate_srt, create_client, TranslationError, DEFAULT_WORKERS
+
+# Load enviroment variables from .env file
+load_dotenv()
+
+def update_language(root_dir, media_name, source_cues, target_lang, get_client, cache, args):
+    """
+    Patch one translation to an edited source
+
+    Returns:
+        bool: False when the translation could not be updated
+    """
+    prefix = f"[{target_lang}] "
+    target_srt_file = os.path.join(root_dir, "lang", target_lang, f"{media_name}_{target_lang.upper()}.srt")
+    if not os.path.exists(target_srt_file):
+        print(f"{prefix}{target_srt_file} not found; translate it with translate-srt.py")
+        return False
+
+    if args.record:
+        save_fingerprint(target_srt_file, source_cues)
+        print(f"{prefix}Recorded the current source as the source of {target_srt_file}")
+        return True
+
+    fingerprint = load_fingerprint(target_srt_file)
+    if fingerprint is None:
+        print(f"{prefix}No source fingerprint for {target_srt_file}. It was translated before fingerprints were "
+              f"recorded; if it matches the current source, run again with --record")
+        return False
+
+    diff = SourceDiff(fingerprint, source_cues, read_cues(target_srt_file), args.context)
+    if diff.is_current():
+        print(f"{prefix}{target_srt_file} is up to date")
+        return True
+    print(f"{prefix}{diff.summary()}")
+    if args.dry_run:
+        return True
+
+    translations = {}
+    retranslate_cues = diff.retranslate_cues()
+    if retranslate_cues:
+        translation_config = load_translation_config(os.path.join(root_dir, "lang", target_lang, "config.yaml"))
+        bible = None if args.no_bible else load_bible_index(root_dir, target_lang,
+                                                            translation_config.bible_verse_translation)
+        try:
+            srt_translated = translate_srt(format_srt(retranslate_cues), translation_config, workers=args.workers,
+                                           client=get_client(), label=target_lang, cache=cache,
+                                           output_budget=args.output_budget, text_only=args.text_only, bible=bible)
+        except TranslationError as e:
+            print(f"{prefix}Update failed: {e}")
+            return False
+        translations = {cue.index: cue.text for cue in parse_srt(srt_translated)}
+    else:
+        # Retiming, renumbering and removed cues are patched without calling the API
+        print(f"{prefix}No text changes, updating the target locally")
+
+    write_srt(target_srt_file, format_srt(diff.patch(translations)))
+    save_fingerprint(target_srt_file, source_cues)
+    print(f"{prefix}Updated: {target_srt_file}")
+    return True
+
+def main():
+    # python update-translations.py [origin-srt] [target-lang ...] [--context N]
+    parser = argparse.ArgumentParser(
+        description="Update the translations of an edited English SRT, re-translating only the changed cues")
+    parser.add_argument("origin_srt", help="SRT file name inside lang/en")
+    parser.add_argument("target_langs", nargs="*", metavar="target-lang",
+                        help="Target language codes, e.g. hr sr (default: every translated language)")
+    parser.add_argument("--context", type=int, default=DEFAULT_CONTEXT_CUES,
+                        help=f"Cues on each side of a change translated with it (default: {DEFAULT_CONTEXT_CUES})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Number of batches translated concurrently (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always call the API instead of reusing cached batch translations")
+    parser.add_argument("--output-budget", type=int, default=DEFAULT_OUTPUT_BUDGET,
+                        help=f"Expected output tokens per batch (default: {DEFAULT_OUTPUT_BUDGET})")
+    parser.add_argument("--text-only", action="store_true",
+                        help="Send only the subtitle text and reattach the original timings locally")
+    parser.add_argument("--no-bible", action="store_true",
+                        help="Do not use lang/en/bible.tsv and lang/<target-lang>/bible.tsv for quoted verses")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the changes found without calling the API or writing anything")
+    parser.add_argument("--record", action="store_true",
+                        help="Record the current source as the source of existing translations, without updating them")
+    args = parser.parse_args()
+
+    origin_srt_file = args.origin_srt
+    if not origin_srt_file.endswith('.srt'):
+        origin_srt_file += '.srt'
+    media_name = os.path.splitext(origin_srt_file)[0]
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    root_dir = os.path.abspath(os.path.join(script_dir, ".."))
+
+    source_file = os.path.join(root_dir, "lang", "en", origin_srt_file)
+    if not os.path.exists(source_file):
+        print(f"File {source_file} not found")
+        return 1
+    normalize_line_breaks(source_file)
+    source_cues = read_cues(source_file)
+
+    target_langs = list(dict.fromkeys(args.target_langs))
+    if not target_langs:
+        target_langs = [code for code in find_configured_languages(root_dir) if os.path.exists(
+            os.path.join(root_dir, "lang", code, f"{media_name}_{code.upper()}.srt"))]
+        if not target_langs:
+            print(f"No translations of {origin_srt_file} found")
+            return 1
+    if 'en' in target_langs:
+        print("Target language cannot be English")
+        return 1
+
+    # One client is shared by every language and only created when something needs translating
+    clients = []
+    def get_client():
+        if not clients:
+            clients.append(create_client())
+        return clients[0]
+    cache = None if args.no_cache or args.dry_run or args.record else TranslationCache(
+        os.path.join(root_dir, CACHE_FILE))
+
+    try:
+        updated = [update_language(root_dir, media_name, source_cues, target_lang, get_client, cache, args)
+                   for target_lang in target_langs]
+    finally:
+        if cache is not None:
+            print(cache.summary())
+            cache.close()
+    if clients and hasattr(clients[0], "scheduler"):
+        print(clients[0].scheduler.summary())
+    return 0 if all(updated) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import threading
+
+class ValidationStats:
+    """
+    Per-run counters for cues that had to be translated again
+
+    Shared by all worker threads of a run.
+    """
+
+    def __init__(self):
+        self.invalid_batches = 0
+        self.truncated_responses = 0
+        self.retried_cues = 0
+        self.retry_requests = 0
+        self.extra_input_tokens = 0
+        self.extra_output_tokens = 0
+        self._lock = threading.Lock()
+
+    def record_invalid(self, missing_count, truncated):
+        with self._lock:
+            self.invalid_batches += 1
+            self.retried_cues += missing_count
+            if truncated:
+                self.truncated_responses += 1
+
+    def record_retry(self, usage):
+        with self._lock:
+            self.retry_requests += 1
+            self.extra_input_tokens += usage.input_tokens
+            self.extra_output_tokens += usage.output_tokens
+
+    def summary(self):
+        return (f"Validation: {self.invalid_batches} invalid response(s) "
+                f"({self.truncated_responses} truncated), {self.retried_cues} cue(s) retried "
+                f"in {self.retry_requests} extra request(s) costing "
+                f"{self.extra_input_tokens} input / {self.extra_output_tokens} output tokens")
+
+def validate_cues(source_cues, translated_cues, stop_reason):
+    """
+    Compare a translated batch with its source batch
+
+    A translated cue is accepted when its number belongs to the batch, its
+    timestamps match the source cue and it has text. When the response was
+    cut off at max_tokens the last cue is rejected as well, since it may be
+    incomplete.
+
+    Args:
+        source_cues (list): Cue objects that were sent
+        translated_cues (list): Cue objects parsed from the response
+        stop_reason (str): stop_reason of the Messages response
+
+    Returns:
+        tuple: (accepted, missing) where accepted maps the cue index to the
+               translated text and missing lists the source cues to retry
+    """
+    sources = {cue.index: cue for cue in source_cues}
+    if stop_reason == "max_tokens" and translated_cues:
+        translated_cues = translated_cues[:-1]
+
+    accepted = {}
+    for cue in translated_cues:
+        source = sources.get(cue.index)
+        if source is None or cue.index in accepted:
+            continue
+        if cue.start != source.start or cue.end != source.end:
+            continue
+        if not cue.text.strip() and source.text.strip():
+            continue
+        accepted[cue.index] = cue.text
+
+    missing = [cue for cue in source_cues if cue.index not in accepted]
+    return accepted, missing
@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import shutil
+import subprocess
+import urllib.request
+
+import pytest
+
+from subtitles import parse_srt
+from fake_services import FakeMessagesServer, synthetic_srt
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+# MAX_ATTEMPTS of translate-backlog.py
+MAX_ATTEMPTS = 4
+
+
+def call(url, data=None):
+    request = urllib.request.Request(url, json.dumps(data).encode("utf-8") if data is not None else None,
+                                     {"content-type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return response.read().decode("utf-8")
+
+
+def batch_request(custom_id, payload):
+    return {"custom_id": custom_id, "params": {"model": "fake", "max_tokens": 100,
+                                               "messages": [{"role": "user", "content": payload}]}}
+
+
+def test_fake_batch_endpoints():
+    payloads = {f"key{number}": synthetic_srt(5, seed=number) for number in range(4)}
+    with FakeMessagesServer(truncate_every=2, batch_seconds=60) as server:
+        created = json.loads(call(f"{server.url}/v1/messages/batches",
+                                  {"requests": [batch_request(key, payload) for key, payload in payloads.items()]}))
+        assert created["processing_status"] == "in_progress"
+        assert created["request_counts"]["processing"] == 4
+
+        server.batch_seconds = 0
+        status = json.loads(call(f"{server.url}/v1/messages/batches/{created['id']}"))
+        assert status["processing_status"] == "ended"
+        assert status["request_counts"]["succeeded"] == 4
+
+        results = [json.loads(line) for line in call(status["results_url"]).splitlines()]
+        messages = {result["custom_id"]: result["result"]["message"] for result in results}
+        assert [messages[key]["stop_reason"] for key in payloads] == ["end_turn", "max_tokens"] * 2
+        assert messages["key0"]["content"][0]["text"] == payloads["key0"]
+        assert server.counters()["batch_requests"] == 4
+        assert server.truncated_results == {"key1": 1, "key3": 1}
+
+
+@pytest.fixture
+def backlog_tree(tmp_path):
+    for module in ("anthropic", "dotenv", "yaml"):
+        pytest.importorskip(module)
+    shutil.copytree(SCRIPTS_DIR, tmp_path / "scripts", ignore=shutil.ignore_patterns("__pycache__"))
+    os.makedirs(tmp_path / "lang" / "en")
+    os.makedirs(tmp_path / "lang" / "hr")
+    (tmp_path / "lang" / "hr" / "config.yaml").write_text('language: "Croatian"\nbible_verse_translation: "Šarić"\n',
+                                                          encoding="utf-8")
+    sources = {}
+    for number, name in enumerate(("First talk", "Second talk")):
+        sources[name] = synthetic_srt(200, seed=number)
+        (tmp_path / "lang" / "en" / f"{name}.srt").write_text(sources[name], encoding="utf-8")
+    return tmp_path, sources
+
+
+def backlog(root_dir, server, *options, returncode=0):
+    env = dict(os.environ, CLAUDE_API_KEY="fake", CLAUDE_BASE_URL=server.url)
+    process = subprocess.run([sys.executable, os.path.join(root_dir, "scripts", "translate-backlog.py"), "hr",
+                              "--output-budget", "1000", *options], cwd=root_dir, env=env, capture_output=True,
+                             text=True, timeout=60)
+    if returncode is not None:
+        assert process.returncode == returncode, process.stdout + process.stderr
+    return process
+
+
+def run_backlog(root_dir, server, returncode=0):
+    backlog(root_dir, server, returncode=returncode)
+    return server.counters()["batch_requests"]
+
+
+def load_state(root_dir):
+    return json.loads((root_dir / ".cache" / "backlog-jobs.json").read_text(encoding="utf-8"))
+
+
+def test_backlog_submits_once_and_resubmits_only_invalid_cues(backlog_tree):
+    root_dir, sources = backlog_tree
+    targets = {name: root_dir / "lang" / "hr" / f"{name}_HR.srt" for name in sources}
+    with FakeMessagesServer(truncate_every=3, batch_seconds=3600) as server:
+        submitted = run_backlog(root_dir, server)
+        assert submitted > 2
+        # The jobs are still processing: nothing is written or submitted again
+        assert run_backlog(root_dir, server) == submitted
+        assert not any(target.exists() for target in targets.values())
+
+        server.batch_seconds = 0
+        for _ in range(10):
+            run_backlog(root_dir, server)
+            if all(target.exists() for target in targets.values()):
+                break
+        assert all(target.exists() for target in targets.values())
+        # Only the cues missing from cut-off results were paid for again
+        counters = server.counters()
+        assert counters["cut_cues"]
+        assert counters["batch_cues"] == sum(len(parse_srt(source)) for source in sources.values()) + \
+            counters["cut_cues"]
+
+        # Everything is written: another run neither submits nor rewrites anything
+        written = {name: target.read_text(encoding="utf-8") for name, target in targets.items()}
+        modified = {name: target.stat().st_mtime_ns for name, target in targets.items()}
+        total = server.counters()["batch_requests"]
+        assert run_backlog(root_dir, server) == total
+        assert {name: target.stat().st_mtime_ns for name, target in targets.items()} == modified
+
+    # The fake answers with the source itself, so a correct assembly reproduces it
+    assert written == sources
+    assert load_state(root_dir) == {"jobs": [], "requests": {}}
+
+
+def test_backlog_stops_resubmitting_cues_that_keep_failing(backlog_tree):
+    root_dir, sources = backlog_tree
+    targets = [root_dir / "lang" / "hr" / f"{name}_HR.srt" for name in sources]
+    with FakeMessagesServer(truncate_every=1) as server:
+        submitted = run_backlog(root_dir, server)
+        for _ in range(10):
+            if not load_state(root_dir)["jobs"]:
+                break
+            run_backlog(root_dir, server, returncode=None)
+        state = load_state(root_dir)
+        assert not state["jobs"]
+        # Every cut-off result lost its last cue, which was given up on after MAX_ATTEMPTS
+        assert state["requests"]
+        assert all(request["attempts"] == MAX_ATTEMPTS for request in state["requests"].values())
+        assert max(server.submissions.values()) <= MAX_ATTEMPTS
+        assert server.counters()["batch_requests"] > submitted
+
+        # The failed cues are reported, not submitted again, so --wait has nothing to wait for
+        total = server.counters()["batch_requests"]
+        process = backlog(root_dir, server, "--wait", returncode=1)
+        assert "are not submitted again" in process.stdout
+        assert server.counters()["batch_requests"] == total
+    assert not any(target.exists() for target in targets)
+
+
+def test_backlog_cache_keys_match_translate_srt(backlog_tree):
+    root_dir, sources = backlog_tree
+    # A glossary moves the mapping from the system prompt into per-batch notes
+    (root_dir / "lang" / "hr" / "config.yaml").write_text(
+        'language: "Croatian"\nbible_verse_translation: "Šarić"\ntranslation_mapping:\n  doctrine: "doctrine"\n',
+        encoding="utf-8")
+    target = root_dir / "lang" / "hr" / "First talk_HR.srt"
+    with FakeMessagesServer() as server:
+        run_backlog(root_dir, server)
+        run_backlog(root_dir, server)
+        assert target.exists()
+
+        # translate-srt.py finds every batch the backlog stored and calls the API for none of them
+        target.unlink()
+        env = dict(os.environ, CLAUDE_API_KEY="fake", CLAUDE_BASE_URL=server.url)
+        process = subprocess.run([sys.executable, os.path.join(root_dir, "scripts", "translate-srt.py"),
+                                  "First talk", "hr", "--output-budget", "1000", "--no-bible"],
+                                 cwd=root_dir, env=env, capture_output=True, text=True)
+        assert process.returncode == 0, process.stderr
+        assert server.counters()["requests"] == 0
+    assert target.read_text(encoding="utf-8") == sources["First talk"]
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+import audio
+import transcription
+from audio import plan_chunks
+from subtitles import Cue, format_srt, parse_srt
+
+# Local cues of each chunk as (start ms, end ms, text), as a transcriber would return them
+CHUNK_CUES = [
+    # Ends mid-sentence, so its last cue is merged with the first cue of the next chunk
+    [(0, 2000, "Hello there."), (588000, 590500, "And the sentence")],
+    [(0, 1500, "continues here."), (603000, 605500, "Ends well.")],
+    # Starts before the previous chunk's last cue ends
+    [(0, 2000, "Overlap."), (5000, 7000, "Bye.")],
+]
+
+
+def test_plan_chunks_cuts_in_the_nearest_silence():
+    silences = [(100, 102), (590, 592), (1195, 1197)]
+    assert plan_chunks(1500, silences, 600) == [(0.0, 591.0), (591.0, 1196.0), (1196.0, 1500)]
+
+
+def test_plan_chunks_without_silence_cuts_at_the_target_and_avoids_a_sliver():
+    assert plan_chunks(1300, [], 600) == [(0.0, 600.0), (600.0, 1300)]
+    # 700 s is within the search distance of 600, so it stays one chunk
+    assert plan_chunks(700, [], 600) == [(0.0, 700)]
+
+
+@pytest.fixture
+def media_file(tmp_path, monkeypatch):
+    path = tmp_path / "talk.webm"
+    path.write_bytes(b"fake media")
+    monkeypatch.setattr(transcription, "media_duration", lambda media: 1500.0)
+    monkeypatch.setattr(transcription, "detect_silences", lambda media: [(590, 592), (1195, 1197)])
+
+    # ffmpeg is not needed: the cut just writes its output file
+    def run_ffmpeg(command, check=False):
+        with open(command[-1], 'w', encoding='utf-8') as file:
+            file.write(" ".join(command))
+
+    monkeypatch.setattr(audio.subprocess, "run", run_ffmpeg)
+    return str(path)
+
+
+class FakeTranscriber:
+    def __init__(self):
+        self.files = []
+
+    def __call__(self, audio_file):
+        self.files.append(os.path.basename(audio_file))
+        number = int(os.path.splitext(os.path.basename(audio_file))[0])
+        return format_srt([Cue(index, start, end, text)
+                           for index, (start, end, text) in enumerate(CHUNK_CUES[number], 1)])
+
+
+def test_chunks_are_shifted_merged_clamped_and_renumbered(media_file, tmp_path):
+    transcriber = FakeTranscriber()
+    srt_content = transcription.transcribe_chunked(media_file, transcriber, 600, str(tmp_path / "chunks"), workers=3)
+
+    assert sorted(transcriber.files) == ["000.ogg", "001.ogg", "002.ogg"]
+    assert parse_srt(srt_content) == [
+        Cue(1, 0, 2000, "Hello there."),
+        # Shifted by the 591 s offset of chunk 2 and merged across the cut
+        Cue(2, 588000, 592500, "And the sentence continues here."),
+        Cue(3, 1194000, 1196500, "Ends well."),
+        # Clamped to start where the previous cue ends
+        Cue(4, 1196500, 1198000, "Overlap."),
+        Cue(5, 1201000, 1203000, "Bye."),
+    ]
+
+
+def test_rerun_reuses_transcribed_chunks(media_file, tmp_path):
+    work_dir = str(tmp_path / "chunks")
+    first = transcription.transcribe_chunked(media_file, FakeTranscriber(), 600, work_dir)
+    transcriber = FakeTranscriber()
+    assert transcription.transcribe_chunked(media_file, transcriber, 600, work_dir) == first
+    assert transcriber.files == []
+
+
+def test_short_recording_is_transcribed_whole(media_file):
+    transcriber = lambda audio_file: f"whole {os.path.basename(audio_file)}"
+    assert transcription.transcribe_chunked(media_file, transcriber, 3600, "unused") == "whole talk.webm"
@@ -0,0 +1,25 @@
+from glossary import Glossary
+from subtitles import Cue
+
+MAPPING = {"personality of God": "osobnost Boga", "God": "Bog", "Holy Spirit": "Duh Sveti"}
+
+
+def test_multi_word_term_is_found_across_repeated_whitespace():
+    glossary = Glossary(MAPPING)
+    assert glossary.find("the personality of  God is") == {"personality of God", "God"}
+    assert glossary.find("the personality\nof \t God is") == {"personality of God", "God"}
+    assert glossary.find("the  Holy   Spirit") == {"Holy Spirit"}
+
+
+def test_terms_only_match_whole_words():
+    glossary = Glossary(MAPPING)
+    assert glossary.find("Godhead and the ungodly") == set()
+
+
+def test_check_does_not_flag_a_term_split_by_a_double_space():
+    glossary = Glossary(MAPPING)
+    source = [Cue(1, 0, 1000, "the personality of  God")]
+    target = [Cue(1, 0, 1000, "osobnost  Boga")]
+    assert glossary.check(source, target) == (1, {})
+    _, flagged = glossary.check(source, [Cue(1, 0, 1000, "karakter Gospoda")])
+    assert flagged == {1: ["personality of God", "God"]}
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+from journal import BatchJournal
+from subtitles import Cue, format_srt, parse_srt
+from translation_cache import TranslationCache
+from translation_config import TranslationConfig
+from translator import translate_srt
+
+
+class EchoMessages:
+    """
+    Answers with the batch itself; only a re-translation with an instruction renders "God" as "Bog"
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **params):
+        self.calls += 1
+        content = params["messages"][-1]["content"]
+        batch = content if isinstance(content, str) else content[-1]["text"]
+        instructed = not isinstance(content, str) and "must be translated" in content[0]["text"]
+        cues = parse_srt(batch)
+        if instructed:
+            cues = [Cue(cue.index, cue.start, cue.end, cue.text.replace("God", "Bog")) for cue in cues]
+        usage = SimpleNamespace(input_tokens=10, output_tokens=10)
+        return SimpleNamespace(content=[SimpleNamespace(text=format_srt(cues))], stop_reason="end_turn", usage=usage)
+
+
+SOURCE = format_srt([Cue(1, 0, 1000, "In the beginning"), Cue(2, 1000, 2000, "God created the heaven."),
+                     Cue(3, 2000, 3000, "And the earth.")])
+CONFIG = TranslationConfig(path=None, language="Croatian", bible_verse_translation="Šarić",
+                           translation_mapping={"God": "Bog"})
+
+
+def translate(tmp_path, cache=None):
+    client = SimpleNamespace(messages=EchoMessages())
+    journal = BatchJournal(str(tmp_path / "target_HR.srt"))
+    translated = translate_srt(SOURCE, CONFIG, workers=1, client=client, cache=cache, journal=journal)
+    return translated, client.messages.calls
+
+
+def test_glossary_fixes_are_stored_in_the_cache(tmp_path):
+    cache = TranslationCache(str(tmp_path / "translations.sqlite3"))
+    first, calls = translate(tmp_path, cache)
+    assert calls == 2
+    assert parse_srt(first)[1].text == "Bog created the heaven."
+
+    BatchJournal(str(tmp_path / "target_HR.srt")).remove()
+    second, calls = translate(tmp_path, cache)
+    cache.close()
+    assert calls == 0
+    assert second == first
+
+
+def test_glossary_fixes_are_stored_in_the_journal(tmp_path):
+    first, calls = translate(tmp_path)
+    assert calls == 2
+    second, calls = translate(tmp_path)
+    assert calls == 0
+    assert second == first
@@ -0,0 +1,120 @@
+import json
+import time
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+import scheduler
+from fake_services import FakeMessagesServer, synthetic_srt
+from scheduler import RequestScheduler, ScheduledMessages, estimate_request, MAX_ATTEMPTS
+
+PARAMS = {"model": "fake", "max_tokens": 1000, "system": [{"type": "text", "text": "Translate. " * 100}],
+          "messages": [{"role": "user", "content": "1\n00:00:01,000 --> 00:00:02,000\nHello\n"}]}
+
+
+class RawResponse:
+    def __init__(self, message, headers):
+        self.message = message
+        self.headers = headers
+
+    def parse(self):
+        return self.message
+
+
+class RawMessages:
+    def __init__(self, response):
+        self.response = response
+
+    def create(self, **params):
+        return self.response
+
+
+def test_usage_reported_in_headers_is_charged_once():
+    limit = 60000
+    scheduler = RequestScheduler(input_tokens_per_minute=limit)
+    estimated_input, _ = estimate_request(PARAMS)
+    used = estimated_input * 3
+    # The server has charged the actual usage by the time it answers
+    message = SimpleNamespace(usage=SimpleNamespace(input_tokens=used, output_tokens=10))
+    headers = {"anthropic-ratelimit-input-tokens-limit": str(limit),
+               "anthropic-ratelimit-input-tokens-remaining": str(limit - used)}
+    scheduled = SimpleNamespace(with_raw_response=RawMessages(RawResponse(message, headers)))
+
+    ScheduledMessages(None, scheduled, scheduler).create(**PARAMS)
+    assert scheduler.buckets["input-tokens"].tokens == pytest.approx(limit - used, abs=50)
+
+
+class APIStatusError(Exception):
+    # The parts of the SDK's error that the scheduler reads
+    def __init__(self, status_code, headers):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers)
+
+
+def sender(server, params, attempts):
+    # One Messages request per call, recording when each attempt started and ended
+    def send():
+        request = urllib.request.Request(f"{server.url}/v1/messages", json.dumps(params).encode("utf-8"),
+                                         {"content-type": "application/json"})
+        started = time.monotonic()
+        try:
+            with urllib.request.urlopen(request) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise APIStatusError(e.code, e.headers) from None
+        finally:
+            attempts.append((started, time.monotonic()))
+    return send
+
+
+class VirtualClock:
+    # Sleeps move the scheduler's clock forward instead of waiting
+    def __init__(self):
+        self.offset = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return time.monotonic() + self.offset
+
+    def time(self):
+        return time.time() + self.offset
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.offset += seconds
+
+
+def test_rate_limited_request_is_retried_after_retry_after():
+    params = {**PARAMS, "messages": [{"role": "user", "content": synthetic_srt(3)}]}
+    attempts = []
+    with FakeMessagesServer(latency=0, rate_limit_every=2, retry_after=1) as server:
+        requests = RequestScheduler()
+        for _ in range(2):
+            message = requests.call(sender(server, params, attempts), estimate_request(params))
+            assert message["content"][0]["text"] == synthetic_srt(3)
+        counters = server.counters()
+    assert (counters["requests"], counters["rate_limited"], counters["completed"]) == (3, 1, 2)
+    assert requests.retries == {"429": 1}
+    # The second request got the 429; its retry was not sent before retry-after had passed
+    assert attempts[2][0] - attempts[1][1] >= 1.0
+
+
+def test_rate_limit_error_is_raised_after_max_attempts(monkeypatch):
+    clock = VirtualClock()
+    monkeypatch.setattr(scheduler, "time", clock)
+    params = {**PARAMS, "messages": [{"role": "user", "content": synthetic_srt(3)}]}
+    attempts = []
+    with FakeMessagesServer(latency=0, rate_limit_every=1, retry_after=2) as server:
+        requests = RequestScheduler()
+        with pytest.raises(APIStatusError) as raised:
+            requests.call(sender(server, params, attempts), estimate_request(params))
+        counters = server.counters()
+    assert raised.value.status_code == 429
+    assert (counters["requests"], counters["rate_limited"]) == (MAX_ATTEMPTS, MAX_ATTEMPTS)
+    assert len(attempts) == MAX_ATTEMPTS
+    # Every retry waited out the retry-after; the last error is raised without waiting
+    assert len(clock.sleeps) == MAX_ATTEMPTS - 1
+    assert all(seconds >= 2 for seconds in clock.sleeps)
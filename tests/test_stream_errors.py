@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+
+from subtitles import format_srt
+from fake_services import synthetic_cues
+from translator import translate_cues
+from validation import ValidationStats
+
+
+class AuthenticationError(Exception):
+    status_code = 401
+
+
+class FakeStream:
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+
+    @property
+    def text_stream(self):
+        yield from self.chunks
+        if self.error is not None:
+            raise self.error
+
+    def get_final_message(self):
+        return SimpleNamespace(stop_reason="end_turn", usage=SimpleNamespace(input_tokens=1, output_tokens=1))
+
+
+class FakeStreamManager:
+    def __init__(self, open_error=None, stream=None):
+        self.open_error = open_error
+        self.stream = stream
+
+    def __enter__(self):
+        if self.open_error is not None:
+            raise self.open_error
+        return self.stream
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeMessages:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def stream(self, **params):
+        self.calls += 1
+        return self.responses.pop(0)
+
+    def create(self, **params):
+        self.calls += 1
+        raise AuthenticationError("invalid x-api-key")
+
+
+def client_with(*responses):
+    return SimpleNamespace(messages=FakeMessages(responses))
+
+
+def test_error_opening_the_stream_is_raised_without_splitting_the_batch():
+    cues = synthetic_cues(400)
+    client = client_with(*[FakeStreamManager(open_error=AuthenticationError("invalid x-api-key"))] * 100)
+    with pytest.raises(AuthenticationError):
+        translate_cues(client, cues, "prompt", ValidationStats(), on_cue=lambda index, text: None)
+    assert client.messages.calls == 1
+
+
+def test_plain_request_error_is_raised_once():
+    client = client_with()
+    with pytest.raises(AuthenticationError):
+        translate_cues(client, synthetic_cues(400), "prompt", ValidationStats())
+    assert client.messages.calls == 1
+
+
+def test_non_retryable_error_while_reading_is_raised():
+    cues = synthetic_cues(10)
+    client = client_with(FakeStreamManager(stream=FakeStream([format_srt(cues[:3])], AuthenticationError("bad"))))
+    with pytest.raises(AuthenticationError):
+        translate_cues(client, cues, "prompt", ValidationStats(), on_cue=lambda index, text: None)
+
+
+def test_dropped_connection_only_retries_the_missing_cues():
+    cues = synthetic_cues(10)
+    received = {}
+    client = client_with(
+        FakeStreamManager(stream=FakeStream([format_srt(cues[:4]) + "\n"], ConnectionResetError("reset"))),
+        FakeStreamManager(stream=FakeStream([format_srt(cues[3:])])),
+    )
+    accepted = translate_cues(client, cues, "prompt", ValidationStats(),
+                              on_cue=lambda index, text: received.setdefault(index, text))
+    assert client.messages.calls == 2
+    assert accepted == {cue.index: cue.text for cue in cues}
+    assert received == accepted